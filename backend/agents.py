@@ -47,6 +47,7 @@ Web_Crawler = Single_Agent(
     tools=[WeatherTool, WebSearchTool, YoutubePlay, UserLocation, TimezoneCurrentTime, CodesmithTool, YTSummarize],
     verbose=True,
     output_file="outputs/web_crawler.txt",
+    max_concurrency=3,  # most requested agent; brain.py can have several lookups in flight
 )
 
 System_Automator = Single_Agent(
@@ -1,10 +1,12 @@
 import base64
 import mimetypes
 import os
-from google import genai
 from google.genai import types
 from unisonai import BaseTool, Field
 from ui.UI import create_image_widget
+from unisonai.llms.ratelimit import limiter, estimate_tokens, Priority
+from unisonai.llms.clients import clients
+from unisonai.llms.resilience import resilience
 
 def save_binary_file(file_name, data):
     f = open(file_name, "wb")
@@ -20,9 +22,7 @@ class GenerateImageTool(BaseTool):
     ]
 
     def _run(self, prompt: str):
-        client = genai.Client(
-            api_key=os.environ.get("GEMINI_API_KEY"),
-        )
+        client = clients.get("google-genai", os.environ.get("GEMINI_API_KEY"))
 
         model = "gemini-2.0-flash-preview-image-generation"
         contents = [
@@ -42,27 +42,29 @@ class GenerateImageTool(BaseTool):
         )
 
         file_index = 0
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            if (
-                chunk.candidates is None
-                or chunk.candidates[0].content is None
-                or chunk.candidates[0].content.parts is None
-            ):
-                continue
-            if chunk.candidates[0].content.parts[0].inline_data and chunk.candidates[0].content.parts[0].inline_data.data:
-                file_name = f"outputs/image"
-                file_index += 1
-                inline_data = chunk.candidates[0].content.parts[0].inline_data
-                data_buffer = inline_data.data
-                file_extension = mimetypes.guess_extension(inline_data.mime_type)
-                save_binary_file(f"{file_name}{file_extension}", data_buffer)
-                create_image_widget(f"{file_name}{file_extension}")
-            else:
-                print(chunk.text)
+        with limiter.acquire(model, tokens=estimate_tokens(prompt) + 1290, priority=Priority.INTERACTIVE):
+            # Retried while the stream fails before its first chunk
+            for chunk in resilience.stream(f"gemini:{model}", lambda: client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
+            )):
+                if (
+                    chunk.candidates is None
+                    or chunk.candidates[0].content is None
+                    or chunk.candidates[0].content.parts is None
+                ):
+                    continue
+                if chunk.candidates[0].content.parts[0].inline_data and chunk.candidates[0].content.parts[0].inline_data.data:
+                    file_name = f"outputs/image"
+                    file_index += 1
+                    inline_data = chunk.candidates[0].content.parts[0].inline_data
+                    data_buffer = inline_data.data
+                    file_extension = mimetypes.guess_extension(inline_data.mime_type)
+                    save_binary_file(f"{file_name}{file_extension}", data_buffer)
+                    create_image_widget(f"{file_name}{file_extension}")
+                else:
+                    print(chunk.text)
         return "Image generated in 'outputs/image' successfully generated and opened on screen"
 
 if __name__ == "__main__":
@@ -1,4 +1,3 @@
-import google.generativeai as genai
 from os import environ
 from dotenv import load_dotenv
 from rich import print
@@ -11,9 +10,14 @@ import asyncio
 from functools import lru_cache
 import logging
 import os
+from unisonai.llms.ratelimit import limiter, estimate_tokens, Priority
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.resilience import resilience
+from unisonai.llms.context_cache import context_cache
 
 load_dotenv()
-genai.configure(api_key=environ['GEMINI_API_KEY'])
+clients.configure_gemini(environ['GEMINI_API_KEY'])
 
 with open("backend\\prompts\\codesmith.md", "r", encoding="utf-8") as f:
     SYSTEM_PROMPT = f.read()
@@ -62,12 +66,10 @@ class Codesmith:
         self.system_prompt = SYSTEM_PROMPT + system_prompt_addition
 
         self.messages: List[Dict] = []
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash-lite-preview-06-17",
-            generation_config=self.generation_config,
-            safety_settings=self.safety_settings,
-            system_instruction=self.system_prompt
-        )
+        self.model_name = "gemini-2.5-flash-lite-preview-06-17"
+        # Shared across Codesmith instances (CodesmithTool builds one per call)
+        self.model = clients.gemini_model(self.model_name, self.system_prompt,
+                                          self.generation_config, self.safety_settings)
 
     @lru_cache(maxsize=50)
     async def execute_code(self, response_text: str) -> Tuple[str, bool, bool]:
@@ -154,27 +156,34 @@ except ImportError as e:
         try:
             self.messages.append({"parts": [{"text": prompt}], "role": "user"})
             
-            # Retry mechanism for response generation
+            async def ask():
+                reserved = estimate_tokens(self.system_prompt) + estimate_tokens(self.messages) + self.generation_config["max_output_tokens"]
+                async with limiter.acquire_async(self.model_name, tokens=reserved, priority=Priority.INTERACTIVE):
+                    started = t()
+                    response = await asyncio.to_thread(
+                        context_cache.gemini_generate, self.model, self.model_name, self.system_prompt, self.messages,
+                        generation_config=self.generation_config, safety_settings=self.safety_settings)
+                ledger.record("gemini", self.model_name, response=response,
+                              prompt=[self.system_prompt, self.messages], latency=t() - started)
+                return response
+
+            # Transient API errors are retried by the shared resilience layer; here we only
+            # re-ask with a more explicit prompt when the safety filters blocked the reply
             for attempt in range(3):
-                try:
-                    response = await asyncio.to_thread(self.model.generate_content, self.messages)
-                    
-                    # Check if the response was blocked by safety filters
-                    if not hasattr(response, 'candidates') or not response.candidates or not response.candidates[0].content or not response.candidates[0].content.parts:
-                        print("Response was blocked by safety filters. Retrying with modified prompt...")
-                        # Try with a more explicit instruction to follow your guidelines
-                        modified_prompt = f"Please help me perform this task using Python code: {prompt}. Remember to only use the functions from Functions.Automations."
-                        self.messages[-1] = {"parts": [{"text": modified_prompt}], "role": "user"}
-                        continue
-                    
-                    # Successfully got a response
-                    if response.text:
-                        break
-                except Exception as gen_error:
-                    print(f"Generation attempt {attempt + 1} failed: {gen_error}")
-                    if attempt == 2:
-                        raise
-            
+                response = await resilience.acall(f"gemini:{self.model_name}", ask)
+
+                # Check if the response was blocked by safety filters
+                if not hasattr(response, 'candidates') or not response.candidates or not response.candidates[0].content or not response.candidates[0].content.parts:
+                    print("Response was blocked by safety filters. Retrying with modified prompt...")
+                    # Try with a more explicit instruction to follow your guidelines
+                    modified_prompt = f"Please help me perform this task using Python code: {prompt}. Remember to only use the functions from Functions.Automations."
+                    self.messages[-1] = {"parts": [{"text": modified_prompt}], "role": "user"}
+                    continue
+
+                # Successfully got a response
+                if response.text:
+                    break
+
             # If we still don't have a valid response after retries
             if not hasattr(response, 'text') or not response.text:
                 return "The AI was unable to generate a suitable response. This might be due to safety filters or API limitations.", False
@@ -1,10 +1,14 @@
 import os
 import re
+import time
 from dotenv import load_dotenv
 from youtube_transcript_api import YouTubeTranscriptApi
-import google.generativeai as genai
 from mtranslate import translate
 from unisonai import BaseTool, Field
+from unisonai.llms.ratelimit import limiter, estimate_tokens, Priority
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.resilience import resilience
 
 # Attempt to import UI function, but don't fail if it's not there
 try:
@@ -25,7 +29,7 @@ if not GEMINI_API_KEY:
 
 ytt_api = YouTubeTranscriptApi()
 
-genai.configure(api_key=GEMINI_API_KEY)
+clients.configure_gemini(GEMINI_API_KEY)
 
 def extract_video_id(youtube_url):
     """Extract video ID from different formats of YouTube URLs."""
@@ -71,8 +75,19 @@ def generate_summary(transcript):
             "Please provide a concise summary (maximum 250 words) of the following video transcript, "
             "focusing on the main points and key takeaways. Present the summary in clear, easy-to-understand paragraphs: "
         )
-        model = genai.GenerativeModel("gemini-2.5-flash-lite") # Using a standard, robust model
-        response = model.generate_content(prompt + transcript)
+        model_name = "gemini-2.5-flash-lite"
+        model = clients.gemini_model(model_name) # Using a standard, robust model
+
+        def ask():
+            # Summaries are background work: interactive turns get served first
+            with limiter.acquire(model_name, tokens=estimate_tokens(prompt + transcript) + 400, priority=Priority.BACKGROUND):
+                started = time.perf_counter()
+                response = model.generate_content(prompt + transcript)
+            ledger.record("gemini", model_name, response=response, prompt=prompt + transcript,
+                          latency=time.perf_counter() - started)
+            return response
+
+        response = resilience.call(f"gemini:{model_name}", ask)
         return response.text
     except Exception as e:
         print(f"Error generating summary: {e}")
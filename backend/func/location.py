@@ -5,6 +5,10 @@ class UserLocation(BaseTool):
     name = "UserLocation"
     description = "Get the user's general location (city, region, country, lat/lon) based on IP"
     params = []  # no params needed from the user
+    cache_ttl = 3600  # IP-based location rarely changes within a session
+    disk_cache = True
+    timeout = 8
+    retries = 2
 
     def _run(self):
         try:
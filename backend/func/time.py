@@ -8,6 +8,7 @@ class TimezoneCurrentTime(BaseTool):
     params = [
         Field("timezone", "IANA timezone string, e.g. 'Asia/Kolkata'")
     ]
+    timeout = 2
 
     def _run(self, timezone: str):
         try:
@@ -8,6 +8,11 @@ class WeatherTool(BaseTool):
     name = "Weather Tool"
     description = "Get the current weather for a given city."
     params = [Field("city", "The city to check weather for")]
+    # Not cached: each call draws the weather widget, which a cached result would skip
+    timeout = 15
+    retries = 1
+    side_effects = True  # draws the weather widget
+    max_concurrency = 4
 
     async def _run(self, city: str):
         return await self.weather(city)
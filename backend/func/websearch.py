@@ -8,10 +8,18 @@ except:
     print("No UI available")
 
 
+SEARCH_FAILED = "Failed to retrieve search results"
+
+
 class WebSearchTool(BaseTool):
     name = "Web Search"
     description = "Use this tool for any Researching and Search on the internet for any information of any website on any Topic."
     params = [Field("query", "The query to search for")]
+    # Not cached: each call shows the image and results widgets, which a cached result would skip
+    timeout = 30
+    retries = 1
+    side_effects = True  # a timed-out search may still show its widgets
+    max_concurrency = 2  # keeps parallel agent steps from tripping search rate limits
 
     def _run(self, query: str):
         return self.websearch(query)
@@ -37,11 +45,11 @@ class WebSearchTool(BaseTool):
                         output+=f"TITLE:\n{result.get('title', 'No Title Found')}\n\nBODY:\n{result.get('body', 'No Body Found')}\n\n"
                 else:
                     print("No results from DuckDuckGo")
-                    return "Failed to retrieve search results"
+                    return SEARCH_FAILED
 
             except Exception as e:
                 print(f"Error using DuckDuckGo Search: {e}")
-                return "Failed to retrieve search results"
+                return SEARCH_FAILED
         print(output)
         try:
             ImageUI(query=query)
@@ -1,6 +1,8 @@
 import os
 import time
+import re
 import hashlib
+import threading
 import pyautogui
 import base64
 import requests
@@ -9,16 +11,67 @@ import numpy as np
 from PIL import Image
 
 from unisonai import BaseTool, Field
+from unisonai.llms.ratelimit import limiter, estimate_tokens, Priority
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.resilience import resilience
+
+try:
+    import mss  # Optional: per-monitor capture on multi-display setups
+except ImportError:
+    mss = None
+
+# Optional CPU-only text recognizers for the local OCR path, in order of preference
+try:
+    from rapidocr_onnxruntime import RapidOCR
+except ImportError:
+    RapidOCR = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+
+VISION_MODEL = "gemini-1.5-flash-latest"
+VISION_MODES = ("screen", "camera", "screen+camera", "monitors", "burst")
+OCR_MODE = "ocr"
+
+# Prompts that only ask for the text on screen ("read the text in this window", "what does the
+# screen say?") are answered by local OCR instead of Gemini. The whole prompt must be the request:
+# anything asked about the text ("... and fix the bug", "is it formatted correctly?") goes to Gemini.
+_TEXT_SOURCE = (r"(?:(?:the|my|this|that|current|active|focused|open|whole|entire) )*"
+                r"(?:screen|window|page|app|application|dialog|popup|tab|document|display|image|screenshot)")
+TEXT_EXTRACTION_PATTERN = re.compile(
+    r"^\s*(?:(?:please|hey|jarvis|can you|could you|would you)[ ,]+)*(?:"
+    r"(?:read|extract|transcribe|copy|ocr|dump)(?: out)?(?: me)?(?: (?:all|every|everything|of|the|that|this))*"
+    r"(?: (?:text|words|writing|content|contents|lines))?(?: (?:on|in|from|of) " + _TEXT_SOURCE + r")?"
+    r"|(?:read|extract|transcribe|copy|ocr) " + _TEXT_SOURCE +
+    r"|what(?:'s| is) (?:written|the text) (?:on|in) " + _TEXT_SOURCE +
+    r"|what text is (?:on|in) " + _TEXT_SOURCE +
+    r"|what does " + _TEXT_SOURCE + r" say"
+    r")(?: for me)?(?:[ ,]+please)?\s*[.?!]*\s*$",
+    re.IGNORECASE,
+)
+WINDOW_PATTERN = re.compile(r"\b(window|app|application|dialog|popup|tab)\b", re.IGNORECASE)
 
 
 class VisionSystem:
     """Manages system state for vision tools, including API calls, caching, and hardware like the camera."""
-    def __init__(self):
+    def __init__(self, model_name: str = VISION_MODEL):
         self.last_api_call_time = 0
         self.min_call_interval = 3.0
         self.cache = {}
         self.cache_duration = 60
         self.camera = None  # Will hold the camera object
+        self.camera_lock = threading.Lock()
+        self.model_name = model_name
+        # Enforce min_call_interval through the shared limiter: one call per interval, no bursts
+        limiter.set_budget(self.model_name, rpm=60.0 / self.min_call_interval, burst=1)
+        self._model = None  # Long-lived Gemini vision client, built on first use
+        self._model_lock = threading.Lock()
+        self._ocr_engine = None
+        self._ocr_lock = threading.Lock()
 
     def __del__(self):
         """Ensure the camera is released when the object is destroyed."""
@@ -27,6 +80,19 @@ class VisionSystem:
             self.camera.release()
             cv2.destroyAllWindows()
 
+    def get_model(self):
+        """Returns the shared Gemini vision model, configuring the SDK only once per process."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    api_key = os.environ.get("GEMINI_API_KEY")
+                    if not api_key:
+                        raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+                    clients.configure_gemini(api_key)
+                    self._model = clients.gemini_model(self.model_name)
+        return self._model
+
     def initialize_camera(self):
         """Initializes the camera object. Fast because it only runs once."""
         if self.camera is None:
@@ -38,95 +104,279 @@ class VisionSystem:
             # Allow camera to warm up
             time.sleep(1)
 
+    def get_ocr_engine(self):
+        """Returns the local OCR engine ('rapidocr' instance or 'tesseract'), or None if neither is installed."""
+        if self._ocr_engine is None:
+            with self._ocr_lock:
+                if self._ocr_engine is None:
+                    if RapidOCR is not None:
+                        self._ocr_engine = RapidOCR()
+                    elif pytesseract is not None:
+                        self._ocr_engine = "tesseract"
+        return self._ocr_engine
+
+    def active_window_region(self):
+        """Returns (left, top, width, height) of the focused window, or None when it cannot be determined."""
+        try:
+            window = pyautogui.getActiveWindow()
+        except Exception:
+            return None
+        if window is None or window.width <= 0 or window.height <= 0:
+            return None
+        return (max(0, window.left), max(0, window.top), window.width, window.height)
+
+    def capture_screen(self, region=None) -> Image.Image:
+        """Captures the primary screen (or a (left, top, width, height) region) as an in-memory image."""
+        return pyautogui.screenshot(region=region)
+
+    def capture_monitors(self) -> list[Image.Image]:
+        """Captures every attached monitor separately. Falls back to the primary screen without mss."""
+        if mss is None:
+            return [self.capture_screen()]
+        with mss.mss() as sct:
+            # monitors[0] is the combined virtual screen; the rest are the physical displays
+            return [
+                Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+                for shot in (sct.grab(monitor) for monitor in sct.monitors[1:])
+            ]
+
+    def capture_camera_frame(self) -> Image.Image:
+        """Reads a single webcam frame and returns it as an in-memory RGB image."""
+        self.initialize_camera() # Ensures camera is ready
+
+        with self.camera_lock:
+            ret, frame = self.camera.read()
+        if not ret:
+            raise RuntimeError("Failed to capture image from camera.")
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def capture_camera_burst(self, count: int = 3, interval: float = 0.3) -> list[Image.Image]:
+        """Captures `count` webcam frames spaced `interval` seconds apart."""
+        frames = []
+        for i in range(max(1, count)):
+            if i:
+                time.sleep(interval)
+            frames.append(self.capture_camera_frame())
+        return frames
+
     def take_screenshot(self, filename="Assistant/Images/capture.jpg"):
         """Captures the screen and saves it."""
-        screenshot = pyautogui.screenshot()
+        screenshot = self.capture_screen()
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         screenshot.save(filename, quality=80, optimize=True)
         print(f"Screenshot saved to {filename}")
 
     def capture_from_camera(self, filename="Assistant/Images/camera_capture.jpg"):
         """Captures a frame from the webcam and saves it."""
-        self.initialize_camera() # Ensures camera is ready
-        
-        ret, frame = self.camera.read()
-        if not ret:
-            raise RuntimeError("Failed to capture image from camera.")
-
+        frame = self.capture_camera_frame()
         os.makedirs(os.path.dirname(filename), exist_ok=True)
-        cv2.imwrite(filename, frame)
+        frame.save(filename)
         print(f"Camera image saved to {filename}")
 
+    def capture(self, mode: str, burst_count: int = 3) -> list[tuple[str, Image.Image]]:
+        """
+        Captures the frames for a vision mode as (label, image) pairs.
+
+        Raises IOError/RuntimeError for camera failures and ValueError for unknown modes.
+        """
+        if mode == "screen":
+            return [("screen", self.capture_screen())]
+        if mode == "camera":
+            return [("camera", self.capture_camera_frame())]
+        if mode == "screen+camera":
+            return [("screen", self.capture_screen()), ("camera", self.capture_camera_frame())]
+        if mode == "monitors":
+            return [(f"monitor {i + 1}", shot) for i, shot in enumerate(self.capture_monitors())]
+        if mode == "burst":
+            return [(f"camera frame {i + 1}", frame) for i, frame in enumerate(self.capture_camera_burst(burst_count))]
+        raise ValueError(f"Unknown vision mode '{mode}'")
+
 
 vision_system = VisionSystem()
 
 
-def GeminiVision(prompt, image_path):
-    """Sends an image and prompt to the Google Gemini API for analysis."""
-    try:
-        print("Using Google Gemini for image analysis...")
+def _format_analysis(result_text: str, max_chars: int = 550) -> str:
+    """Normalises a raw model answer into the bullet-point SCREEN ANALYSIS block."""
+    result_text = "\n".join([
+        line for line in result_text.split('\n')
+        if not line.strip().endswith('?')
+        and "sorry" not in line.lower()
+        and "apologize" not in line.lower()
+    ])
 
-        import google.generativeai as genai
+    lines = result_text.split('\n')
+    formatted_lines = []
+    for line in lines:
+        if line.strip() and not line.strip().startswith('•'):
+            formatted_lines.append(f"• {line.strip()}")
+        elif line.strip():
+            formatted_lines.append(line.strip())
 
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
+    final_result = f"SCREEN ANALYSIS:\n" + "\n".join(formatted_lines)
+    if len(final_result) > max_chars + 50:
+        final_result = final_result[:max_chars] + "..."
+
+    return final_result
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash-latest')
-        image = Image.open(image_path)
 
-        enhanced_prompt = f"""Analyze this image and answer: {prompt}
+def GeminiVisionBatch(prompt: str, images: list[tuple[str, Image.Image]]) -> str:
+    """
+    Sends several labelled images to Gemini in a single request with one prompt.
+
+    `images` is a list of (label, PIL image) pairs, e.g. [("screen", ...), ("camera", ...)].
+    """
+    try:
+        print(f"Using Google Gemini for analysis of {len(images)} image(s)...")
+        model = vision_system.get_model()
+
+        if len(images) == 1:
+            enhanced_prompt = f"Analyze this image and answer: {prompt}"
+        else:
+            labels = ", ".join(label for label, _ in images)
+            enhanced_prompt = (
+                f"Analyze these {len(images)} images ({labels}) together and answer: {prompt}\n"
+                "Refer to each image by its label when the distinction matters."
+            )
+        max_chars = 400 * len(images)
+        enhanced_prompt += f"""
 
 KEY INSTRUCTIONS:
 • Use bullet points without periods
 • DO NOT apologize or use phrases like "I'm sorry"
 • DO NOT ask questions
-• Maximum 400 characters
+• Maximum {max_chars} characters
 • Be direct and factual"""
 
-        response = model.generate_content(
-            [enhanced_prompt, image],
-            generation_config={
-                "temperature": 0.1,
-                "max_output_tokens": 200,
-            }
-        )
+        contents = [enhanced_prompt]
+        for label, image in images:
+            if len(images) > 1:
+                contents.append(f"Image ({label}):")
+            contents.append(image)
+
+        # Gemini bills ~258 tokens per image tile; reserve that plus the prompt and output
+        reserved = 258 * len(images) + estimate_tokens(enhanced_prompt) + 200 * len(images)
+
+        def ask():
+            with limiter.acquire(vision_system.model_name, tokens=reserved, priority=Priority.INTERACTIVE):
+                started = time.perf_counter()
+                response = model.generate_content(
+                    contents,
+                    generation_config={
+                        "temperature": 0.1,
+                        "max_output_tokens": 200 * len(images),
+                    }
+                )
+            ledger.record("gemini", vision_system.model_name, response=response, prompt=enhanced_prompt,
+                          latency=time.perf_counter() - started)
+            return response
+
+        response = resilience.call(f"gemini:{vision_system.model_name}", ask)
 
         if not response.text:
             raise ValueError("Empty response from Gemini")
 
-        result_text = response.text.strip()
-        result_text = "\n".join([
-            line for line in result_text.split('\n')
-            if not line.strip().endswith('?')
-            and "sorry" not in line.lower()
-            and "apologize" not in line.lower()
-        ])
+        return _format_analysis(response.text.strip(), max_chars=550 * len(images))
+
+    except Exception as e:
+        print(f"Gemini Vision error: {str(e)}")
+        return f"SCREEN ANALYSIS:\n• Unable to analyze image due to technical limitations"
 
-        lines = result_text.split('\n')
-        formatted_lines = []
-        for line in lines:
-            if line.strip() and not line.strip().startswith('•'):
-                formatted_lines.append(f"• {line.strip()}")
-            elif line.strip():
-                formatted_lines.append(line.strip())
 
-        final_result = f"SCREEN ANALYSIS:\n" + "\n".join(formatted_lines)
-        if len(final_result) > 600:
-            final_result = final_result[:550] + "..."
+def LocalOCR(image: Image.Image, offset: tuple = (0, 0)) -> list[dict] | None:
+    """
+    Recognizes text in an in-memory image on the CPU.
+
+    Returns text lines in reading order as dicts with 'text', 'x', 'y', 'width', 'height'
+    (screen coordinates, shifted by `offset`) and 'confidence', or None if no OCR engine is installed.
+    """
+    engine = vision_system.get_ocr_engine()
+    if engine is None:
+        return None
+
+    ox, oy = offset
+    lines = []
+    if engine == "tesseract":
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        grouped = {}
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            grouped.setdefault(key, []).append(i)
+        for indices in grouped.values():
+            left = min(data["left"][i] for i in indices)
+            top = min(data["top"][i] for i in indices)
+            right = max(data["left"][i] + data["width"][i] for i in indices)
+            bottom = max(data["top"][i] + data["height"][i] for i in indices)
+            confidences = [float(data["conf"][i]) for i in indices]
+            lines.append({
+                "text": " ".join(data["text"][i] for i in indices),
+                "x": left + ox, "y": top + oy,
+                "width": right - left, "height": bottom - top,
+                "confidence": sum(confidences) / len(confidences) / 100.0,
+            })
+    else:
+        result, _ = engine(np.array(image.convert("RGB")))
+        for box, text, score in result or []:
+            xs = [point[0] for point in box]
+            ys = [point[1] for point in box]
+            lines.append({
+                "text": text,
+                "x": int(min(xs)) + ox, "y": int(min(ys)) + oy,
+                "width": int(max(xs) - min(xs)), "height": int(max(ys) - min(ys)),
+                "confidence": float(score),
+            })
+
+    # Reading order: rows (bucketed by half a line height) top to bottom, then left to right
+    row_height = max(8, int(np.median([line["height"] for line in lines]) / 2)) if lines else 8
+    lines.sort(key=lambda line: (line["y"] // row_height, line["x"]))
+    return lines
+
+
+def ScreenOCR(active_window: bool = False) -> str | None:
+    """
+    Reads the text on the screen (or only the focused window) with local OCR.
+
+    Returns the full text with positions, or None when OCR is unavailable or found nothing,
+    so the caller can fall back to the model path.
+    """
+    region = vision_system.active_window_region() if active_window else None
+    image = vision_system.capture_screen(region)
+    lines = LocalOCR(image, offset=region[:2] if region else (0, 0))
+    if not lines:
+        return None
+
+    source = "ACTIVE WINDOW" if region else "SCREEN"
+    body = "\n".join(f"[{line['x']},{line['y']}] {line['text']}" for line in lines)
+    return f"{source} TEXT (OCR, [x,y] = top-left position):\n{body}"
+
+
+def is_text_extraction_prompt(prompt: str) -> bool:
+    """True when the prompt is only a request for the text on screen, with nothing asked about it."""
+    return bool(TEXT_EXTRACTION_PATTERN.search(prompt or ""))
 
-        return final_result
 
+def GeminiVision(prompt, image_path):
+    """Sends an image and prompt to the Google Gemini API for analysis."""
+    try:
+        image = Image.open(image_path)
     except Exception as e:
         print(f"Gemini Vision error: {str(e)}")
         return f"SCREEN ANALYSIS:\n• Unable to analyze image due to technical limitations"
+    return GeminiVisionBatch(prompt, [("image", image)])
 
 
 def Vision(prompt: str, mode: str = "screen") -> str:
-    """Orchestrator function to capture an image from screen or camera and analyze it."""
+    """
+    Orchestrator function to capture frames from the screen and/or camera and analyze them.
+
+    Modes: 'screen', 'camera', 'screen+camera', 'monitors' (every display) and
+    'burst' (several camera frames). Multi-frame modes are sent as a single request.
+    'ocr' reads screen text locally; 'screen' prompts that only ask for text are routed
+    there automatically, falling back to Gemini when no OCR engine is available.
+    """
     current_time = time.time()
-    mode = mode.lower()
+    mode = mode.lower().strip()
 
     try:
         cache_key = hashlib.md5(f"{prompt}:{mode}".encode()).hexdigest()
@@ -136,23 +386,24 @@ def Vision(prompt: str, mode: str = "screen") -> str:
                 print("Returning cached vision result...")
                 return cached_result
 
-        image_path = ""
-        capture_dir = "Assistant/Images"
-        os.makedirs(capture_dir, exist_ok=True)
-        
-        if mode == "screen":
-            image_path = os.path.join(capture_dir, "screenshot_capture.jpg")
-            vision_system.take_screenshot(image_path)
-        elif mode == "camera":
-            try:
-                image_path = os.path.join(capture_dir, "camera_capture.jpg")
-                vision_system.capture_from_camera(image_path)
-            except (IOError, RuntimeError) as e:
-                 return f"CAMERA ERROR:\n• {str(e)}"
-        else:
-            return f"INVALID MODE: Please use 'screen' or 'camera'."
+        if mode == OCR_MODE or (mode == "screen" and is_text_extraction_prompt(prompt)):
+            result = ScreenOCR(active_window=bool(WINDOW_PATTERN.search(prompt)))
+            if result:
+                vision_system.cache[cache_key] = (current_time, result)
+                print(f"OCR complete. Result length: {len(result)}")
+                return result
+            print("Local OCR unavailable or found no text, falling back to Gemini...")
+            mode = "screen"
+
+        if mode not in VISION_MODES:
+            return f"INVALID MODE: Please use one of {', '.join(repr(m) for m in VISION_MODES + (OCR_MODE,))}."
+
+        try:
+            images = vision_system.capture(mode)
+        except (IOError, RuntimeError) as e:
+            return f"CAMERA ERROR:\n• {str(e)}"
 
-        result = GeminiVision(prompt, image_path)
+        result = GeminiVisionBatch(prompt, images)
         vision_system.last_api_call_time = current_time
 
         if not isinstance(result, str) or len(result.strip()) < 10:
@@ -171,11 +422,14 @@ class VisionTool(BaseTool):
     description = (
         "Captures the user's screen or takes a picture with the webcam for analysis. "
         "Use mode='screen' for UI content, reading text on the screen, or summarizing visual elements on the desktop. "
-        "Use mode='camera' for analyzing the user's real-world environment and objects nearby."
+        "Use mode='camera' for analyzing the user's real-world environment and objects nearby. "
+        "Use mode='screen+camera' when the question needs both views, mode='monitors' to look at every display, "
+        "and mode='burst' for several camera frames (e.g. motion or gestures). "
+        "Use mode='ocr' to read all the text on the screen quickly and in full."
     )
     params = [
         Field("prompt", "The user's question or goal for the image analysis."),
-        Field("mode", "The input source. A choice between 'screen' and 'camera'.", default_value="screen")
+        Field("mode", "The input source. One of 'screen', 'camera', 'screen+camera', 'monitors', 'burst' or 'ocr'.", default_value="screen")
     ]
 
     def _run(self, prompt: str, mode:str) -> str:
@@ -191,8 +445,8 @@ if __name__ == "__main__":
             if user_prompt.lower() == "exit":
                 break
             
-            mode_input = input("Enter mode ('screen' or 'camera'): ").lower().strip()
-            if mode_input not in ["screen", "camera"]:
+            mode_input = input(f"Enter mode ({', '.join(VISION_MODES + (OCR_MODE,))}): ").lower().strip()
+            if mode_input not in VISION_MODES + (OCR_MODE,):
                 print("Invalid mode. Defaulting to 'screen'.")
                 mode_input = "screen"
 
@@ -0,0 +1,137 @@
+"""
+Micro-benchmark of the per-step overhead of unisonai.agent.Agent outside the LLM call itself.
+
+The LLM is a local stand-in that answers instantly with a tool call (and finally pass_result),
+so the numbers show only what the agent does around each call: reading and writing history,
+rendering the role prompt and re-initializing the LLM.
+
+    python benchmarks/agent_step.py [--steps 30] [--history 400] [--runs 10]
+
+"legacy" replays the previous behaviour (history file parsed, prompt rendered, LLM reset and
+re-initialized, and the journal written synchronously on every step); "in-memory" is the
+current Agent, which loads history once, renders the prompt once and checkpoints in the
+background every `checkpoint_every` steps.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from unisonai import Agent, BaseTool, Field
+from unisonai.prompts.agent import AGENT_PROMPT
+from unisonai.prompts.manager import MANAGER_PROMPT
+
+
+class EchoTool(BaseTool):
+    name = "echo"
+    description = "Returns its input."
+    params = [Field("text", "The text to echo.")]
+
+    def _run(self, text):
+        return text
+
+
+class ScriptedLLM:
+    """Answers with `steps - 1` echo tool calls, then pass_result. No network, no tokens."""
+
+    USER = "user"
+    MODEL = "assistant"
+
+    def __init__(self, messages=[], system_prompt=None, steps=30, **kwargs):
+        self.messages = messages
+        self.system_prompt = system_prompt
+        self.steps = getattr(self, "steps", steps)
+        self.calls = 0
+
+    def reset(self):
+        self.messages = []
+        self.system_prompt = None
+
+    def add_message(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+    def run(self, prompt, save_messages=True):
+        self.calls += 1
+        if self.calls < self.steps:
+            reply = ('```yaml\nthoughts: step\nname: echo\nparams: >\n    {"text": "%s"}\n```' % ("x" * 200))
+        else:
+            reply = '```yaml\nthoughts: done\nname: pass_result\nparams: >\n    {"result": "ok"}\n```'
+        if save_messages:
+            self.messages.append({"role": "user", "content": prompt})
+            self.messages.append({"role": "assistant", "content": reply})
+        return reply
+
+
+class LegacyAgent(Agent):
+    """The old step loop: full history load, prompt render and LLM re-init, synchronous write."""
+
+    def _configure_llm(self, task):
+        self._legacy_task = task
+
+    def _after_step(self):
+        journal = self._get_journal()
+        journal.sync(self.llm.messages)
+        messages = journal.load()
+        calls = self.llm.calls
+        self.llm.reset()
+        template = MANAGER_PROMPT if self.ask_user else AGENT_PROMPT
+        system_prompt = template.format(
+            members=self.members, shared_instruction=self.shared_instruction, identity=self.identity,
+            description=self.description, task=self.task, user_task=self._legacy_task,
+            tools=self.tools or "No Provided Tools", plan=self.plan, clan_name=self.clan_name)
+        self.llm.__init__(messages=messages, system_prompt=system_prompt)
+        self.llm.calls = calls
+
+
+def seed_history(folder: str, identity: str, count: int) -> None:
+    with open(os.path.join(folder, f"{identity}.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"role": "user" if i % 2 == 0 else "assistant", "content": "history " * 40}) + "\n")
+
+
+def measure(agent_cls, steps: int, history: int, runs: int) -> float:
+    """Seconds per step, averaged over `runs` tasks of `steps` steps each."""
+    total = 0.0
+    for _ in range(runs):
+        folder = tempfile.mkdtemp(prefix="agent_step_")
+        try:
+            seed_history(folder, "Bench", history)
+            llm = ScriptedLLM(steps=steps)
+            agent = agent_cls(llm=llm, identity="Bench", description="benchmark agent", task="echo things",
+                              tools=[EchoTool], verbose=False, native_tools=False)
+            agent.history_folder = folder
+            agent.plan = "Echo, then pass the result. " * 50
+            agent.user_task = "benchmark"
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                agent.unleash("start")
+                agent.checkpoint(wait=True)  # count the background writes too
+                total += time.perf_counter() - start
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return total / (steps * runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=30, help="LLM steps per task")
+    parser.add_argument("--history", type=int, default=400, help="messages already in the history journal")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    legacy = measure(LegacyAgent, args.steps, args.history, args.runs)
+    current = measure(Agent, args.steps, args.history, args.runs)
+
+    print(f"{args.steps} steps x {args.runs} runs, {args.history} messages of history")
+    print(f"legacy   : {legacy * 1e6:9.1f} us/step")
+    print(f"in-memory: {current * 1e6:9.1f} us/step  ({legacy / current:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Prompt tokens saved by unisonai.llms.context_cache on the JARVIS system prompts, against the
+in-memory stub provider (no network, no API key).
+
+    python benchmarks/context_cache.py [--requests 20] [--ttl 0.3]
+
+For each prompt a conversation of --requests turns is run through StubLLM with context caching
+off and then on; "cached" is the prompt tokens referenced by handle instead of resent, and the
+cost columns price the input at gemini-2.5-flash rates with the cached-input discount. The last
+section checks the fallbacks: a provider without cache support, a prefix too small to cache,
+a TTL refresh and a cache the provider dropped.
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from unisonai.llms.ratelimit import estimate_tokens
+from unisonai.llms.usage import PRICES, CACHED_INPUT_RATES
+from unisonai.llms.context_cache import context_cache
+from unisonai.llms.stub import StubLLM, stub_cache
+from unisonai.prompts.template import load_template
+
+
+def read(name: str) -> str:
+    with open(os.path.join(ROOT, "backend", "prompts", name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def conversation(system_prompt: str, requests: int):
+    """Runs one conversation; returns (prompt tokens sent in full, prompt tokens served from cache)."""
+    llm = StubLLM(messages=[], system_prompt=system_prompt, reply="Done.")
+    before = sum(context_cache.stats()["cached_tokens"].values())
+    sent = 0
+    for i in range(requests):
+        prompt = f"request {i}: open the browser and search for the weather"
+        sent += estimate_tokens(system_prompt) + estimate_tokens(llm.messages) + estimate_tokens(prompt)
+        llm.run(prompt)
+    cached = sum(context_cache.stats()["cached_tokens"].values()) - before
+    return sent - cached, cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="turns per conversation")
+    parser.add_argument("--ttl", type=float, default=0.3, help="cache TTL (seconds) for the refresh check")
+    args = parser.parse_args()
+
+    os.environ.setdefault("UserName", "Tony")
+    os.environ.setdefault("Age", "30")
+    base = load_template(os.path.join(ROOT, "backend", "prompts", "base.md"))
+    prompts = [
+        ("brain base.md", base.render(**{name: os.environ[name] for name in base.fields})),
+        ("codesmith.md", read("codesmith.md")),
+        ("web_crawler.md", read("web_crawler.md")),
+    ]
+    price = PRICES["gemini-2.5-flash"][0] / 1_000_000
+    context_cache.register_backend("stub", stub_cache)
+    rate = CACHED_INPUT_RATES["gemini"]
+
+    print(f"{'prompt':<16}{'prefix':>8}{'uncached':>10}{'sent':>9}{'cached':>9}{'saved':>8}{'cost':>11}{'cached cost':>13}")
+    for name, system_prompt in prompts:
+        context_cache.disable()
+        full, _ = conversation(system_prompt, args.requests)
+        context_cache.enable()
+        sent, cached = conversation(system_prompt, args.requests)
+        assert sent + cached == full, f"{name}: token accounting differs"
+        cost, cached_cost = f"${full * price:.5f}", f"${(sent + cached * rate) * price:.5f}"
+        print(f"{name:<16}{estimate_tokens(system_prompt):>8}{full:>10}{sent:>9}{cached:>9}{cached / full:>8.0%}"
+              f"{cost:>11}{cached_cost:>13}")
+
+    print("\nfallbacks and refresh")
+    system_prompt = prompts[0][1]
+    context_cache.close()  # start over with a short TTL
+    context_cache.enable(ttl=args.ttl, refresh_before=args.ttl / 2, min_uses=1)
+    handle = context_cache.handle("groq", "llama3", system_prompt)
+    print(f"  provider without caching -> {handle}, fallbacks {context_cache.stats()['fallbacks']}")
+    handle = context_cache.handle("stub", "stub", "You are a helpful assistant.")
+    print(f"  small prompt             -> {handle}, fallbacks {context_cache.stats()['fallbacks']}")
+
+    llm = StubLLM(messages=[], system_prompt=system_prompt, reply="Done.")
+    llm.run("first")
+    first = llm.cache_handle
+    time.sleep(args.ttl * 0.6)
+    llm.run("second")
+    assert llm.cache_handle is first and stub_cache.refreshed >= 1, "handle was not refreshed"
+    print(f"  refresh near expiry      -> same handle {first.name}, refreshes {context_cache.stats()['refreshes']}")
+
+    stub_cache.drop(first.name)
+    llm.run("third")
+    assert llm.cache_handle is None, "a dropped cache was referenced"
+    llm.run("fourth")
+    assert llm.cache_handle is not None and llm.cache_handle is not first, "cache was not registered again"
+    print(f"  cache dropped by provider -> sent in full once, re-registered as {llm.cache_handle.name}")
+
+    stub_cache.drop()
+    time.sleep(args.ttl * 0.6)
+    llm.run("fifth")
+    assert llm.cache_handle is not None and llm.cache_handle.name in stub_cache.caches, "refresh did not re-register"
+    print(f"  dropped before refresh   -> re-registered as {llm.cache_handle.name}")
+
+    context_cache.close()
+    print(f"\n{context_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark of the per-call overhead of the unisonai Gemini wrapper.
+
+Network I/O is stubbed out (ChatSession.send_message returns a canned reply), so the numbers
+show only what the wrapper and SDK do locally per call: building GenerativeModel objects and
+re-wrapping/validating the chat history.
+
+    python benchmarks/gemini_session.py [--turns 40] [--tasks 20]
+
+"legacy" replays the previous behaviour (two GenerativeModel builds per task and
+start_chat(history=...) on every run); "session" is the current Gemini wrapper.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+import google.generativeai as genai
+from google.generativeai import ChatSession
+from google.generativeai.types import content_types
+
+from unisonai.llms import Gemini
+from unisonai.llms.ratelimit import limiter
+
+MODEL = "gemini-2.5-flash-lite"
+SYSTEM_PROMPT = "You are a benchmark agent. " * 200
+
+
+class _Reply:
+    text = "ok"
+    usage_metadata = None
+
+
+def _fake_send_message(self, content, **kwargs):
+    # Mirror what the SDK does with a successful reply, minus the HTTP round trip
+    self._history.append(content_types.to_content(content))
+    reply = content_types.to_content("ok")
+    reply.role = "model"
+    self._history.append(reply)
+    return _Reply()
+
+
+def _fake_rewind(self):
+    del self._history[-2:]
+
+
+def legacy_task(turns: int) -> None:
+    """The old wrapper: model built twice per task, chat rebuilt from history on every run."""
+    messages = []
+    generation_config = {"temperature": 0.0, "max_output_tokens": 2048, "response_mime_type": "text/plain"}
+    client = genai.GenerativeModel(model_name=MODEL, generation_config=generation_config)
+    client = genai.GenerativeModel(model_name=MODEL, system_instruction=SYSTEM_PROMPT,
+                                   generation_config=generation_config)
+    for i in range(turns):
+        prompt = f"step {i}: " + "tool output " * 50
+        messages.append({"role": "user", "parts": [prompt]})
+        session = client.start_chat(history=messages)
+        reply = session.send_message(prompt)
+        messages.append({"role": "model", "parts": [reply.text]})
+
+
+def session_task(llm: Gemini, turns: int) -> None:
+    """The current wrapper, re-initialized per task the way Single_Agent does it."""
+    llm.reset()
+    llm.__init__(messages=[], model=MODEL, system_prompt=SYSTEM_PROMPT)
+    for i in range(turns):
+        llm.run(f"step {i}: " + "tool output " * 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="LLM calls per task")
+    parser.add_argument("--tasks", type=int, default=20)
+    args = parser.parse_args()
+
+    ChatSession.send_message = _fake_send_message
+    ChatSession.rewind = _fake_rewind
+    limiter.set_budget(MODEL, rpm=10 ** 9, tpm=10 ** 12)
+
+    calls = args.turns * args.tasks
+    start = time.perf_counter()
+    for _ in range(args.tasks):
+        legacy_task(args.turns)
+    legacy = time.perf_counter() - start
+
+    llm = Gemini(model=MODEL)
+    start = time.perf_counter()
+    for _ in range(args.tasks):
+        session_task(llm, args.turns)
+    current = time.perf_counter() - start
+
+    print(f"{calls} calls ({args.tasks} tasks x {args.turns} turns)")
+    print(f"legacy : {legacy / calls * 1e6:9.1f} us/call")
+    print(f"session: {current / calls * 1e6:9.1f} us/call  ({legacy / current:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Throughput of unisonai.llms.batch against a local stub chat-completions server.
+
+The server answers every POST after a fixed latency (no network, no API key), so the numbers
+show how batch throughput scales with concurrency and where the provider caps hold it back.
+
+    python benchmarks/llm_batch.py [--prompts 48] [--latency 0.1] [--rpm 0] [--fail-every 0]
+
+"sequential" is one blocking call at a time (what YTSummarize-style call sites do today);
+the other rows are run_batch() at increasing concurrency, plus one arun_batch() row.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from unisonai.llms.batch import run_batch, arun_batch, batch_limits
+
+PROVIDER = "stub-server"
+
+
+def start_server(latency: float, fail_every: int) -> ThreadingHTTPServer:
+    """OpenAI-shaped /chat/completions endpoint that sleeps `latency` seconds per request."""
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                counter["n"] += 1
+                n = counter["n"]
+            time.sleep(latency)
+            if fail_every and n % fail_every == 0:
+                self.send_response(503)
+                self.end_headers()
+                return
+            prompt = body["messages"][-1]["content"]
+            payload = json.dumps({"choices": [{"message": {"role": "assistant", "content": f"echo: {prompt}"}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 256  # the default backlog of 5 would refuse bursts of concurrent connects
+
+    server = Server(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class HTTPChatLLM:
+    """Minimal wrapper with the unisonai.llms run()/arun() interface, talking to the stub server."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.messages = []
+        self.system_prompt = None
+        # urllib is blocking; asyncio.to_thread's default pool is too small to show async scaling
+        self._executor = ThreadPoolExecutor(max_workers=64)
+
+    def run(self, prompt: str, save_messages: bool = True) -> str:
+        data = json.dumps({"model": "stub", "messages": self.messages + [{"role": "user", "content": prompt}]}).encode()
+        request = urllib.request.Request(self.url, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read())["choices"][0]["message"]["content"]
+
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.run, prompt, save_messages)
+
+
+def sequential(llm, prompts):
+    started = time.perf_counter()
+    ok = 0
+    for prompt in prompts:
+        try:
+            llm.run(prompt, save_messages=False)
+            ok += 1
+        except Exception:
+            pass
+    return ok, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the stub server takes per request")
+    parser.add_argument("--rpm", type=float, default=0, help="provider RPM cap (0 = none)")
+    parser.add_argument("--fail-every", type=int, default=0, help="make every Nth request fail with HTTP 503")
+    args = parser.parse_args()
+
+    server = start_server(args.latency, args.fail_every)
+    llm = HTTPChatLLM(f"http://127.0.0.1:{server.server_address[1]}/chat/completions")
+    prompts = [f"prompt {i}" for i in range(args.prompts)]
+    batch_limits.set_limits(PROVIDER, concurrency=64, rpm=args.rpm)
+
+    print(f"{args.prompts} prompts, {args.latency * 1000:.0f} ms per request, rpm cap: {args.rpm or 'none'}\n")
+    print(f"{'mode':<22}{'ok':>6}{'failed':>8}{'seconds':>10}{'prompts/s':>12}{'speed-up':>10}")
+    ok, seconds = sequential(llm, prompts)
+    base = ok / seconds
+    print(f"{'sequential':<22}{ok:>6}{args.prompts - ok:>8}{seconds:>10.2f}{base:>12.1f}{1.0:>9.1f}x")
+
+    for concurrency in (2, 4, 8, 16, 32):
+        report = run_batch(llm, prompts, concurrency=concurrency, provider=PROVIDER)
+        assert report.texts == [None if r.error else f"echo: {p}" for r, p in zip(report, prompts)], "results out of order"
+        s = report.summary()
+        print(f"{f'run_batch x{concurrency}':<22}{s['ok']:>6}{s['failed']:>8}{report.elapsed:>10.2f}"
+              f"{report.throughput:>12.1f}{report.throughput / base:>9.1f}x")
+
+    done = []
+    report = asyncio.run(arun_batch(llm, prompts, concurrency=16, provider=PROVIDER,
+                                    on_progress=lambda n, total, result: done.append(n)))
+    s = report.summary()
+    print(f"{'arun_batch x16':<22}{s['ok']:>6}{s['failed']:>8}{report.elapsed:>10.2f}"
+          f"{report.throughput:>12.1f}{report.throughput / base:>9.1f}x")
+    print(f"\nprogress callbacks: {len(done)}, provider gate: {batch_limits.stats()[PROVIDER]}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
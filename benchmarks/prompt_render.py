@@ -0,0 +1,93 @@
+"""
+Micro-benchmark of rendering the agents' system prompts for each new task.
+
+Uses the real templates from unisonai/prompts and the role descriptions from backend/prompts,
+so the sizes match what the JARVIS agents render. Nothing is sent anywhere.
+
+    python benchmarks/prompt_render.py [--tasks 20000]
+
+"str.format" is the previous per-task INDIVIDUAL_PROMPT/AGENT_PROMPT.format(...) call (and the
+regex substitution over base.md for the brain prompt); "template" is PromptTemplate.partial(...)
+with the agent's fixed fields, then render() with the per-task fields, as Single_Agent, Agent
+and brain.py now do.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from unisonai.prompts.individual import INDIVIDUAL_PROMPT, INDIVIDUAL_TOOLS_PROMPT
+from unisonai.prompts.agent import AGENT_PROMPT
+from unisonai.prompts.manager import MANAGER_PROMPT
+from unisonai.prompts.template import PromptTemplate, load_template
+
+
+def read(name: str) -> str:
+    with open(os.path.join(ROOT, "backend", "prompts", name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def per_call(fn, count: int) -> float:
+    """Microseconds per call, best of three rounds."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for i in range(count):
+            fn(i)
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20000, help="renders per measurement")
+    args = parser.parse_args()
+
+    description = read("web_crawler.md") + read("codesmith.md")  # a multi-KB role description
+    tools = "\n".join(f"-TOOL{i}: \n  NAME: tool_{i}\n  DESCRIPTION: {'does things ' * 20}\n  PARAMS: query: str"
+                      for i in range(8))
+    agent = dict(identity="Web Crawler", description=description, tools=tools)
+    clan = dict(members="-1: \n  ROLE: Researcher\n" * 6, shared_instruction="Be precise. " * 40,
+                identity="Lead", description=description, tools=tools, clan_name="JARVIS")
+    tasks = [f"task number {i}: look up the weather and summarise it" for i in range(64)]
+
+    cases = []
+    for name, prompt in (("individual", INDIVIDUAL_PROMPT), ("individual+tools", INDIVIDUAL_TOOLS_PROMPT)):
+        template = PromptTemplate(prompt)
+        legacy = lambda i, p=prompt: p.format(user_task=tasks[i % 64], **agent)
+        current = lambda i, t=template: t.partial(**agent).render(user_task=tasks[i % 64])
+        cases.append((name, legacy, current))
+    for name, prompt in (("clan agent", AGENT_PROMPT), ("clan manager", MANAGER_PROMPT)):
+        template = PromptTemplate(prompt)
+        legacy = lambda i, p=prompt: p.format(task=tasks[i % 64], user_task=tasks[i % 64], plan=tasks[i % 64], **clan)
+        current = lambda i, t=template: t.partial(**clan).render(user_task=tasks[i % 64], plan=tasks[i % 64])
+        cases.append((name, legacy, current))
+
+    os.environ.setdefault("UserName", "Tony")
+    os.environ.setdefault("Age", "30")
+    base_path = os.path.join(ROOT, "backend", "prompts", "base.md")
+
+    def brain_legacy(i):
+        with open(base_path, "r") as f:
+            text = f.read()
+        return re.sub(r"{(\w+)}", lambda m: os.environ[m.group(1)], text)
+
+    def brain_current(i):
+        template = load_template(base_path)
+        return template.render(**{name: os.environ[name] for name in template.fields})
+
+    cases.append(("brain base.md", brain_legacy, brain_current))
+
+    print(f"{'prompt':<18}{'chars':>8}{'str.format':>14}{'template':>12}{'speed-up':>10}")
+    for name, legacy, current in cases:
+        assert legacy(7) == current(7), f"{name}: rendered prompts differ"
+        before, after = per_call(legacy, args.tasks), per_call(current, args.tasks)
+        print(f"{name:<18}{len(current(0)):>8}{before:>11.2f} us{after:>9.2f} us{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares the local OCR path against the Gemini vision path on saved screenshots.
+
+Usage:
+    python benchmarks/vision_ocr.py <screenshot_dir> [--skip-model]
+
+Every image in the directory is run through both paths. If a `<name>.txt` file sits next to
+`<name>.png`/`.jpg`, it is used as the ground-truth text and accuracy is reported as a
+character-level similarity ratio (0..1).
+"""
+import os
+import re
+import sys
+import time
+import difflib
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PIL import Image
+from backend.vision import LocalOCR, GeminiVisionBatch, vision_system
+from unisonai.llms.ratelimit import limiter
+
+MODEL_PROMPT = "Transcribe all text visible in this image, line by line."
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def normalise(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def similarity(predicted: str, truth: str) -> float:
+    return difflib.SequenceMatcher(None, normalise(predicted), normalise(truth)).ratio()
+
+
+def run_ocr(image):
+    start = time.perf_counter()
+    lines = LocalOCR(image) or []
+    return time.perf_counter() - start, "\n".join(line["text"] for line in lines)
+
+
+def run_model(image):
+    start = time.perf_counter()
+    result = GeminiVisionBatch(MODEL_PROMPT, [("screen", image)])
+    text = "\n".join(line.lstrip("• ").strip() for line in result.splitlines()[1:])
+    return time.perf_counter() - start, text
+
+
+def summarise(label, latencies, scores):
+    if not latencies:
+        return
+    line = f"{label:<6} latency p50={statistics.median(latencies) * 1000:8.1f} ms  max={max(latencies) * 1000:8.1f} ms"
+    if scores:
+        line += f"  accuracy={statistics.mean(scores):.3f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--skip-model", action="store_true", help="only time the local OCR path")
+    args = parser.parse_args()
+
+    if vision_system.get_ocr_engine() is None:
+        print("No local OCR engine installed (pip install rapidocr_onnxruntime or pytesseract).")
+        return
+
+    # Measure the API itself, not the min_call_interval spacing enforced in the app
+    limiter.set_budget(vision_system.model_name, rpm=600)
+
+    results = {"ocr": ([], []), "model": ([], [])}
+    for name in sorted(os.listdir(args.directory)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(args.directory, name)
+        image = Image.open(path)
+        image.load()
+        truth_path = os.path.splitext(path)[0] + ".txt"
+        truth = open(truth_path, encoding="utf-8").read() if os.path.exists(truth_path) else None
+
+        runners = [("ocr", run_ocr)] + ([] if args.skip_model else [("model", run_model)])
+        for label, runner in runners:
+            elapsed, text = runner(image)
+            latencies, scores = results[label]
+            latencies.append(elapsed)
+            score = similarity(text, truth) if truth is not None else None
+            if score is not None:
+                scores.append(score)
+            print(f"{name:<30} {label:<6} {elapsed * 1000:8.1f} ms  chars={len(text):5d}"
+                  + (f"  accuracy={score:.3f}" if score is not None else ""))
+
+    print()
+    for label, (latencies, scores) in results.items():
+        summarise(label, latencies, scores)
+
+
+if __name__ == "__main__":
+    main()
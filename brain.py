@@ -1,13 +1,20 @@
 import os
-import google.generativeai as genai
 from backend.agents import AI_Expert, System_Automator, Web_Crawler
 from tools import ai_expert, system_automator, web_crawler, create_text_widget, Vision_tool
-import re
 from backend.vision import Vision
+import time
 import asyncio
+import contextvars
 from concurrent.futures import ThreadPoolExecutor
 import base64
 from shared_queue import ui_update_queue
+from unisonai.llms.ratelimit import limiter, estimate_tokens, Priority
+from unisonai.llms.usage import ledger, usage_scope, new_turn_id
+from unisonai.llms.clients import clients
+from unisonai.llms.circuit import CircuitOpenError
+from unisonai.llms.resilience import resilience, is_transient
+from unisonai.llms.context_cache import context_cache
+from unisonai.prompts.template import load_template
 
 safety_settings = [
     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
@@ -29,26 +36,25 @@ def load_prompt_from_file(file_path: str) -> str:
     in the format {ENV_VAR_NAME} with corresponding environment variables.
     """
     try:
-        with open(file_path, "r") as f:
-            template_string = f.read()
+        template = load_template(file_path)  # parsed once per file version
     except FileNotFoundError:
         print(f"Error: The file '{file_path}' was not found.")
         raise
 
-    def get_env_var(match: re.Match) -> str:
-        var_name = match.group(1)
+    values = {}
+    for var_name in template.fields:
         value = os.environ.get(var_name)
         if value is None:
             raise KeyError(f"Environment variable '{var_name}' not found, but is required by the prompt.")
-        return value
-
-    processed_string = re.sub(r"{(\w+)}", get_env_var, template_string)
-    return processed_string
+        values[var_name] = value
+    return template.render(**values)
 
 System = load_prompt_from_file("backend/prompts/base.md")
 
-genai.configure(api_key=os.environ['GEMINI_API_KEY'])
-model = genai.GenerativeModel("gemini-2.5-flash-lite", safety_settings=safety_settings, generation_config=generation_config, system_instruction=System)
+MODEL_NAME = "gemini-2.5-flash-lite"
+
+clients.configure_gemini(os.environ['GEMINI_API_KEY'])
+model = clients.gemini_model(MODEL_NAME, System, generation_config, safety_settings)
 AssistantMessages = []
 executor = ThreadPoolExecutor(max_workers=5)
 
@@ -73,22 +79,17 @@ async def execute_function(function_name, args):
             # Return a success message to the AI
             return f"Successfully queued the creation of a text widget with title '{args.get('title', 'INFORMATION')}'."
 
-        # --- Backend Agent Handling (no change) ---
+        # --- Backend Agent Handling: agents run natively on this event loop ---
         elif function_name == "AI_Expert":
-            result = await loop.run_in_executor(
-                executor, AI_Expert.unleash, args["prompt"]
-            )
+            result = await AI_Expert.aunleash(args["prompt"])
         elif function_name == "System_Automator":
-            result = await loop.run_in_executor(
-                executor, System_Automator.unleash, args["prompt"]
-            )
+            result = await System_Automator.aunleash(args["prompt"])
         elif function_name == "Web_Crawler":
-            result = await loop.run_in_executor(
-                executor, Web_Crawler.unleash, args["prompt"]
-            )
+            result = await Web_Crawler.aunleash(args["prompt"])
         elif function_name == "VisionTool":
+            # copy_context keeps the turn's usage tags on the worker thread
             result = await loop.run_in_executor(
-                executor, Vision, args["prompt"], args["mode"]
+                executor, contextvars.copy_context().run, Vision, args["prompt"], args["mode"]
             )
         else:
             result = "Unknown function called."
@@ -117,8 +118,20 @@ async def handle_function_calls(function_calls):
     return [(call[0], result) for call, result in zip(function_calls, results)]
 
 
+async def generate(prompt, files=None):
+    """
+    One user turn. Every LLM call made for it (brain, agents, tools) is tagged with a fresh
+    turn id in the usage ledger, which is appended to the usage file when the turn ends.
+    """
+    with usage_scope(agent="brain", turn_id=new_turn_id()):
+        try:
+            return await _generate(prompt, files)
+        finally:
+            await asyncio.to_thread(ledger.dump)
+
+
 # --- MODIFIED generate function ---
-async def generate(prompt, files=None): # Function is already async, which is correct
+async def _generate(prompt, files=None): # Function is already async, which is correct
     global AssistantMessages
     
     user_parts = []
@@ -156,7 +169,21 @@ async def generate(prompt, files=None): # Function is already async, which is co
     while True:
         try:
             # Using the synchronous generate_content as requested
-            response = model.generate_content(AssistantMessages, tools=tools)
+            reserved = estimate_tokens(System) + estimate_tokens(AssistantMessages) + generation_config["max_output_tokens"]
+
+            async def ask():
+                async with limiter.acquire_async(MODEL_NAME, tokens=reserved, priority=Priority.INTERACTIVE):
+                    started = time.perf_counter()
+                    # References base.md and the tool schemas by cache handle when context caching is on
+                    response = context_cache.gemini_generate(model, MODEL_NAME, System, AssistantMessages, tools=tools,
+                                                             generation_config=generation_config,
+                                                             safety_settings=safety_settings)
+                return response, time.perf_counter() - started
+
+            # Transient errors are retried with backoff; a failing endpoint fails fast
+            response, latency = await resilience.acall(f"gemini:{MODEL_NAME}", ask)
+            ledger.record("gemini", MODEL_NAME, response=response, prompt=[System, AssistantMessages],
+                          latency=latency)
             
             # This parsing logic is correct for the synchronous response
             function_calls = []
@@ -192,7 +219,13 @@ async def generate(prompt, files=None): # Function is already async, which is co
                         }
                     }]
                 })
+        except CircuitOpenError as e:
+            print(f"Model unavailable: {e}")
+            return "I can't reach my language model right now. Please try again in a little while."
         except Exception as e:
+            if is_transient(e):
+                print(f"Model still failing after retries: {e}")
+                return "My language model is overloaded right now. Please try again in a moment."
             print(f"FATAL: An error occurred in the generate loop: {e}")
             import traceback
             traceback.print_exc()
@@ -43,6 +43,8 @@ try:
     # from backend.vocalize.tts.edgetts import Edgetts
     from backend.vocalize.tts.elevenlabstts import ElevenLabsTTS
     from backend.vision import vision_system
+    from unisonai.llms.clients import clients
+    from unisonai.config import config
     
     logger.info(f"System: {platform.system()}, Release: {platform.release()}")
     logger.info("Core modules successfully imported")
@@ -271,7 +273,11 @@ def remove_file_from_queue(filename: str):
 def task_processor_loop():
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(async_worker())
+    try:
+        loop.run_until_complete(async_worker())
+    finally:
+        loop.run_until_complete(clients.aclose())  # the loop's pooled async HTTP clients
+        loop.close()
 
 async def async_worker():
     while True:
@@ -349,6 +355,11 @@ def main():
 
     logger.info("--- Starting System Initializations ---")
 
+    # Open the provider connections in the background so the first request skips TCP/TLS setup
+    clients.prewarm()
+    # Pick up API keys edited in ~/.unisonai/config.json without a restart
+    config.watch()
+
     # Component initialization with proper error handling
     with ThreadPoolExecutor(max_workers=3, thread_name_prefix='Init') as executor:
         stt_future = executor.submit(initialize_stt)
@@ -0,0 +1,55 @@
+"""run_batch/arun_batch and the per-provider caps, on the offline StubLLM provider."""
+import time
+import asyncio
+
+import pytest
+
+from unisonai.llms.batch import _Gate, arun_batch, batch_limits, run_batch
+from unisonai.llms.stub import StubLLM, StubProviderError
+
+
+def test_gate_spends_rpm_budget_then_waits():
+    gate = _Gate(concurrency=2, rpm=60)  # burst of 2, then one call per second
+    now = gate.bucket.updated
+    assert gate.delay(now) == 0
+    gate.take()
+    gate.take()
+    assert gate.delay(now) == -1  # both slots busy
+    gate.active = 0
+    assert gate.delay(now) == pytest.approx(1.0)
+    assert gate.delay(now + 1.0) == 0
+
+
+def test_run_batch_stays_within_rpm():
+    batch_limits.set_limits("stub-rpm", concurrency=2, rpm=600)  # burst of 2, then one every 0.1s
+    started = time.monotonic()
+    report = run_batch(StubLLM(messages=[]), [f"p{i}" for i in range(6)], concurrency=6, provider="stub-rpm")
+    assert time.monotonic() - started >= 0.35
+    assert report.texts == [f"stub: p{i}" for i in range(6)]
+    stats = batch_limits.stats()["stub-rpm"]
+    assert stats["calls"] == 6 and stats["peak"] <= 2 and stats["in_flight"] == 0
+
+
+def test_arun_batch_stays_within_rpm():
+    batch_limits.set_limits("stub-arpm", concurrency=2, rpm=600)
+    started = time.monotonic()
+    report = asyncio.run(arun_batch(StubLLM(messages=[]), [f"p{i}" for i in range(6)], provider="stub-arpm"))
+    assert time.monotonic() - started >= 0.35
+    assert report.texts == [f"stub: p{i}" for i in range(6)]
+    stats = batch_limits.stats()["stub-arpm"]
+    assert stats["calls"] == 6 and stats["peak"] <= 2 and stats["in_flight"] == 0
+
+
+def test_failed_prompt_does_not_abort_the_batch():
+    def reply(prompt: str) -> str:
+        if prompt == "boom":
+            raise StubProviderError("simulated outage")
+        return prompt.upper()
+
+    llm = StubLLM(messages=[], reply=reply)
+    report = run_batch(llm, ["a", "boom", "c"], provider="stub")
+    assert report.texts == ["A", None, "C"]
+    assert [result.index for result in report.failed] == [1]
+    assert llm.messages == []  # batch prompts never touch the LLM's history
+    with pytest.raises(StubProviderError):
+        report.raise_for_errors()
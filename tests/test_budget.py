@@ -0,0 +1,59 @@
+"""TaskRun bookkeeping of repeated tool calls, through Single_Agent's step planning."""
+import pytest
+
+from unisonai.budget import TaskBudget, TaskRun
+from unisonai.single_agent import Single_Agent
+from unisonai.llms.stub import StubLLM
+from unisonai.tools.tool import BaseTool, Field
+
+
+class LookupTool(BaseTool):
+    name = "lookup"
+    description = "Looks a key up."
+    params = [Field("key", "The key")]
+
+    def _run(self, key: str):
+        return f"value of {key}"
+
+
+@pytest.fixture
+def agent(tmp_path):
+    return Single_Agent(llm=StubLLM(messages=[]), identity="tester", description="Runs checks.",
+                        tools=[LookupTool], history_folder=str(tmp_path), verbose=False)
+
+
+CALL = [("lookup", {"key": "a"})]
+
+
+def test_failed_call_may_be_retried(agent):
+    run = TaskRun(TaskBudget())
+    _, pending, _ = agent._plan_tools(run, CALL)
+    assert pending == [0]
+    agent._tool_outcome(run, "lookup", {"key": "a"}, error=RuntimeError("connection reset"))
+    _, pending, _ = agent._plan_tools(run, CALL)
+    assert pending == [0]  # nothing to reuse: run it again
+
+
+def test_succeeded_call_is_answered_from_the_run(agent):
+    run = TaskRun(TaskBudget())
+    agent._plan_tools(run, CALL)
+    agent._tool_outcome(run, "lookup", {"key": "a"}, "value of a")
+    results, pending, _ = agent._plan_tools(run, CALL)
+    assert pending == []
+    ok, message = results[0]
+    assert not ok and "value of a" in message
+
+
+def test_failing_call_still_counts_towards_max_repeats(agent):
+    run = TaskRun(TaskBudget(max_repeats=2))
+    for _ in range(2):
+        assert agent._plan_tools(run, CALL) is not None
+        agent._tool_outcome(run, "lookup", {"key": "a"}, error=RuntimeError("connection reset"))
+    assert agent._plan_tools(run, CALL) is None
+    assert "identical params" in run.stop_reason
+
+
+def test_step_tokens_include_the_resent_context():
+    run = TaskRun(TaskBudget())
+    run.record_step("lookup", "prompt", "reply", llm_seconds=0.1, context_tokens=1000)
+    assert run.tokens > 1000
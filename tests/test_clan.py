@@ -0,0 +1,36 @@
+"""Clan setup of members that were built with one shared LLM instance."""
+from unisonai.agent import Agent
+from unisonai.clan import Clan
+from unisonai.llms.stub import StubLLM
+
+
+def make_clan(tmp_path, llm):
+    manager = Agent(llm=llm, identity="Lead", description="Plans the work.", task="Plan", verbose=False)
+    writer = Agent(llm=llm, identity="Writer", description="Writes the report.", task="Write", verbose=False)
+    researcher = Agent(llm=StubLLM(messages=[]), identity="Researcher", description="Finds sources.",
+                       task="Research", verbose=False)
+    clan = Clan(clan_name="Checks", manager=manager, members=[manager, writer, researcher],
+                shared_instruction="Be brief.", goal="Write a report", history_folder=str(tmp_path),
+                cache_plan=False)
+    return clan, manager, writer, researcher
+
+
+def test_members_sharing_an_llm_get_their_own_copy(tmp_path):
+    shared = StubLLM(messages=[], model="shared", reply="Done.")
+    _, manager, writer, researcher = make_clan(tmp_path, shared)
+    assert manager.llm is shared  # the first user keeps the instance
+    assert writer.llm is not shared and writer.llm.messages is not shared.messages
+    assert writer.llm.model == "shared" and writer.llm.reply == "Done."
+    assert researcher.llm is not shared
+
+
+def test_each_member_keeps_its_own_prompt_and_history(tmp_path):
+    _, manager, writer, _ = make_clan(tmp_path, StubLLM(messages=[], model="shared"))
+    manager._configure_llm("Write a report")
+    manager_prompt = manager.llm.system_prompt
+    writer._configure_llm("Write a report")
+    assert writer.llm.system_prompt != manager_prompt
+    manager.llm.run("plan it")
+    assert writer.llm.messages == []
+    manager._configure_llm("Write a report")  # skipped re-init: the LLM must still hold the manager's prompt
+    assert manager.llm.system_prompt == manager_prompt
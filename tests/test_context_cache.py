@@ -0,0 +1,232 @@
+"""Context cache registration, expiry and fallbacks, on the offline stub cache backend."""
+import asyncio
+
+import pytest
+
+from unisonai.llms import genai
+from unisonai.llms.context_cache import context_cache
+from unisonai.llms.stub import StubLLM, StubProviderError, stub_cache
+
+SETTINGS = ("ttl", "refresh_before", "min_tokens", "min_uses", "retry_after", "enabled")
+
+
+@pytest.fixture
+def cache():
+    """The shared context cache, enabled with small thresholds and the stub backend registered."""
+    saved = {name: getattr(context_cache, name) for name in SETTINGS}
+    backends = dict(context_cache._backends)
+    context_cache.close()
+    context_cache.register_backend("stub", stub_cache)
+    context_cache.enable(ttl=600.0, refresh_before=60.0, min_tokens=10, min_uses=2)
+    yield context_cache
+    context_cache.close()
+    context_cache._backends = backends
+    for name, value in saved.items():
+        setattr(context_cache, name, value)
+
+
+def prompt(name: str) -> str:
+    return f"You are {name}. " + "Follow the house rules. " * 40
+
+
+def test_prefix_is_registered_once_seen_twice(cache):
+    llm = StubLLM(messages=[], model="cc-register", system_prompt=prompt("register"))
+    llm.run("one")
+    assert llm.cache_handle is None  # warming
+    llm.run("two")
+    first = llm.cache_handle
+    assert first is not None and first.name in stub_cache.caches
+    llm.run("three")
+    assert llm.cache_handle is first
+
+
+def test_dropped_cache_is_sent_in_full_then_registered_again(cache):
+    llm = StubLLM(messages=[], model="cc-dropped", system_prompt=prompt("dropped"))
+    llm.run("one")
+    llm.run("two")
+    first = llm.cache_handle
+    expirations = cache.stats()["expirations"]
+    stub_cache.drop(first.name)
+    llm.run("three")
+    assert llm.cache_handle is None
+    assert cache.stats()["expirations"] == expirations + 1
+    llm.run("four")
+    assert llm.cache_handle is None  # warming again, like a new prefix
+    llm.run("five")
+    assert llm.cache_handle is not None and llm.cache_handle is not first
+    assert llm.cache_handle.name in stub_cache.caches
+
+
+def test_refresh_of_a_vanished_cache_registers_it_again(cache):
+    cache.enable(refresh_before=cache.ttl)  # every call refreshes
+    system_prompt = prompt("refresh")
+    cache.handle("stub", "cc-refresh", system_prompt)
+    first = cache.handle("stub", "cc-refresh", system_prompt)
+    stub_cache.drop()
+    handle = cache.handle("stub", "cc-refresh", system_prompt)
+    assert handle is not None and handle is not first and handle.name in stub_cache.caches
+    assert "failed" not in cache.stats()["fallbacks"]
+
+
+def test_failed_registration_falls_back_and_backs_off(cache):
+    class Broken:
+        def create(self, model, system_prompt, tools, ttl):
+            raise StubProviderError("quota exceeded", 429)
+
+    cache.register_backend("stub-broken", Broken())
+    cache.enable(min_uses=1)
+    assert cache.handle("stub-broken", "cc-broken", prompt("broken")) is None
+    assert cache.handle("stub-broken", "cc-broken", prompt("broken")) is None  # not retried for retry_after
+    assert cache.stats()["fallbacks"]["failed"] == 2
+
+
+def test_gemini_generate_retries_without_an_expired_cache(cache):
+    class CachedModel:
+        def generate_content(self, contents):
+            raise StubProviderError("404 Cached content cachedContents/stub-1 not found", 404)
+
+    class Backend:
+        def create(self, model, system_prompt, tools, ttl):
+            return "cachedContents/stub-1", None, None
+
+        def refresh(self, handle, ttl):
+            pass
+
+        def delete(self, handle):
+            pass
+
+        def model(self, handle, generation_config=None, safety_settings=None):
+            return CachedModel()
+
+    class FallbackModel:
+        def generate_content(self, contents):
+            return f"full prompt: {contents}"
+
+    cache.register_backend("gemini", Backend())
+    cache.enable(min_uses=1)
+    reply = cache.gemini_generate(FallbackModel(), "gemini-test", prompt("gemini"), "hello")
+    assert reply == "full prompt: hello"
+    assert cache.stats()["handles"] == []  # the expired handle was dropped
+
+
+# --- The Gemini wrapper's own expiry paths, against fake SDK models ---
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        part = type("Part", (), {"text": text, "function_call": None})()
+        self.candidates = [type("Candidate", (), {"content": type("Content", (), {"parts": [part]})()})()]
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history)
+
+    def send_message(self, prompt, **kwargs):
+        return self.model.answer(prompt)
+
+    async def send_message_async(self, prompt, **kwargs):
+        return self.model.answer(prompt)
+
+    def rewind(self):
+        pass
+
+
+class FakeModel:
+    """A GenerativeModel answering as `name`; one bound to a cache fails once the backend lost it."""
+
+    def __init__(self, name: str, backend=None):
+        self.name = name
+        self.backend = backend
+        self.tools = []
+
+    def answer(self, prompt):
+        if self.backend is not None and self.name not in self.backend.live:
+            raise RuntimeError(f"404 Cached content {self.name} not found")
+        return FakeResponse(f"{self.name}: {prompt}")
+
+    def start_chat(self, history):
+        return FakeChat(self, history)
+
+    def generate_content(self, contents, tools=None):
+        self.tools.append(tools)
+        return self.answer(contents[-1]["parts"][0])
+
+    async def generate_content_async(self, contents, tools=None):
+        return self.generate_content(contents, tools)
+
+
+class FakeGeminiBackend:
+    """Stands in for GeminiCacheBackend; `live` holds the caches the provider still has."""
+
+    def __init__(self):
+        self.live = set()
+        self.created = 0
+
+    def create(self, model, system_prompt, tools, ttl):
+        self.created += 1
+        name = f"cachedContents/fake-{self.created}"
+        self.live.add(name)
+        return name, None, None
+
+    def refresh(self, handle, ttl):
+        pass
+
+    def delete(self, handle):
+        self.live.discard(handle.name)
+
+    def model(self, handle, generation_config=None, safety_settings=None):
+        return handle.models.setdefault("fake", FakeModel(handle.name, self))
+
+
+@pytest.fixture
+def gemini(cache, monkeypatch):
+    """A Gemini wrapper on fake models, with the fake cache backend registered for "gemini"."""
+    full = FakeModel("full")
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(genai, "_get_model", lambda *args, **kwargs: full)
+    monkeypatch.setattr(genai.clients, "configure_gemini", lambda api_key: None)
+    monkeypatch.setattr(genai.config, "get_api_key", lambda provider: "test-key")
+    backend = FakeGeminiBackend()
+    cache.register_backend("gemini", backend)
+    llm = genai.Gemini(messages=[], system_prompt=prompt("gemini"))
+    return llm, backend, full
+
+
+def test_gemini_run_resends_the_full_prompt_after_a_cache_miss(cache, gemini):
+    llm, backend, _ = gemini
+    assert llm.run("one") == "full: one"  # warming
+    assert llm.run("two") == "cachedContents/fake-1: two"
+    backend.live.clear()
+    expirations = cache.stats()["expirations"]
+    assert llm.run("three") == "full: three"  # retried on the full prompt
+    assert cache.stats()["expirations"] == expirations + 1
+    assert [message["parts"][0] for message in llm.messages[::2]] == ["one", "two", "three"]
+
+
+def test_gemini_arun_resends_the_full_prompt_after_a_cache_miss(cache, gemini):
+    llm, backend, _ = gemini
+
+    async def conversation():
+        await llm.arun("one")
+        assert await llm.arun("two") == "cachedContents/fake-1: two"
+        backend.live.clear()
+        return await llm.arun("three")
+
+    assert asyncio.run(conversation()) == "full: three"
+    assert len(llm.messages) == 6
+
+
+def test_gemini_tool_turn_resends_the_declarations_after_a_cache_miss(cache, gemini):
+    llm, backend, full = gemini
+    cache.enable(min_uses=1)
+    tools = [{"function_declarations": [{"name": "lookup"}]}]
+    assert llm.run_tools("one", tools) == ("cachedContents/fake-1: one", [])
+    backend.live.clear()
+    assert llm.run_tools("two", tools) == ("full: two", [])
+    assert full.tools == [tools]  # the full call carries the declarations again
+    assert asyncio.run(llm.arun_tools("three", tools)) == ("cachedContents/fake-2: three", [])  # registered again
+    backend.live.clear()
+    assert asyncio.run(llm.arun_tools("four", tools)) == ("full: four", [])
+    assert full.tools == [tools, tools]
@@ -0,0 +1,76 @@
+"""ContextWindow trimming of agent histories, on the offline StubLLM provider."""
+from unisonai.context_window import SUMMARY_HEADER, ContextWindow
+from unisonai.llms.stub import StubLLM
+
+SYSTEM_PROMPT = "You are a careful research agent. " * 10
+
+
+def turn(i: int, words: int = 40) -> list:
+    return [{"role": "user", "content": f"question {i} " + "word " * words},
+            {"role": "assistant", "content": f"answer {i} " + "word " * words}]
+
+
+def tool_turn(i: int, words: int = 40) -> list:
+    """A user turn whose reply went through a tool call (OpenAI message format)."""
+    call = {"id": f"call_{i}", "type": "function", "function": {"name": "lookup", "arguments": "{}"}}
+    return [{"role": "user", "content": f"look up {i}"},
+            {"role": "assistant", "content": None, "tool_calls": [call]},
+            {"role": "tool", "tool_call_id": f"call_{i}", "content": "result " + "word " * words},
+            {"role": "assistant", "content": f"found {i}"}]
+
+
+def stub(messages: list) -> StubLLM:
+    return StubLLM(messages=list(messages), system_prompt=SYSTEM_PROMPT)
+
+
+def test_cut_never_lands_between_a_tool_call_and_its_result():
+    history = []
+    for i in range(12):
+        history += tool_turn(i)
+    for keep_last in range(1, 9):  # every offset into the 4-message tool turns
+        llm = stub(history)
+        decision = ContextWindow(max_tokens=700, keep_last=keep_last, summary_tokens=64, verbose=False).fit(llm)
+        assert decision is not None and decision.dropped
+        kept = llm.messages[decision.summary_messages:]
+        assert kept[0]["role"] == "user" and kept[0]["content"].startswith("look up")
+        for index, message in enumerate(kept):
+            if message["role"] == "tool":
+                assert kept[index - 1].get("tool_calls"), "a tool result lost its call"
+
+
+def test_system_prompt_and_latest_messages_are_kept():
+    history = [message for i in range(20) for message in turn(i)]
+    llm = stub(history)
+    decision = ContextWindow(max_tokens=600, keep_last=4, summary_tokens=64, verbose=False).fit(llm)
+    assert decision is not None and decision.kept >= 4
+    assert llm.system_prompt == SYSTEM_PROMPT
+    assert llm.messages[-decision.kept:] == history[-decision.kept:]
+    assert decision.dropped == history[:len(history) - decision.kept]
+    assert decision.after <= 600
+
+
+def test_summary_pair_keeps_roles_alternating():
+    history = [message for i in range(20) for message in turn(i)]
+    llm = stub(history)
+    decision = ContextWindow(max_tokens=600, keep_last=4, summary_tokens=64, verbose=False).fit(llm)
+    assert decision.summary_messages == 2
+    assert llm.messages[0]["role"] == "user" and llm.messages[0]["content"].startswith(SUMMARY_HEADER)
+    assert llm.messages[1]["role"] == "assistant"
+    roles = [message["role"] for message in llm.messages]
+    assert roles == ["user", "assistant"] * (len(roles) // 2)
+
+
+def test_over_budget_when_the_kept_tail_alone_does_not_fit():
+    history = [message for i in range(10) for message in turn(i)] + turn(10, words=400) + turn(11, words=400)
+    llm = stub(history)
+    decision = ContextWindow(max_tokens=300, keep_last=4, summary_tokens=32, verbose=False).fit(llm)
+    assert decision.dropped and decision.over_budget
+    assert llm.messages[-4:] == history[-4:]
+    assert "exceed the budget" in decision.describe()
+
+
+def test_history_within_budget_is_left_alone():
+    history = turn(0)
+    llm = stub(history)
+    assert ContextWindow(max_tokens=10_000, verbose=False).fit(llm) is None
+    assert llm.messages == history
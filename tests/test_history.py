@@ -0,0 +1,83 @@
+"""HistoryJournal round trips, compaction and the legacy JSON migration, in a temporary folder."""
+import json
+
+from unisonai.history import HistoryJournal
+
+
+def messages(start: int, count: int) -> list:
+    return [{"role": "user" if i % 2 == 0 else "model", "parts": [f"message {i} – ünïcode"]}
+            for i in range(start, start + count)]
+
+
+def test_legacy_history_is_migrated_once(tmp_path):
+    legacy, path = tmp_path / "Researcher.json", tmp_path / "Researcher.jsonl"
+    history = messages(0, 6)
+    legacy.write_text(json.dumps(history), encoding="utf-8")
+    HistoryJournal.migrate_legacy(str(legacy), str(path))
+    assert HistoryJournal(str(path)).load() == history
+    assert json.loads(legacy.read_text(encoding="utf-8")) == history  # left in place
+
+    legacy.write_text(json.dumps(messages(100, 2)), encoding="utf-8")
+    HistoryJournal.migrate_legacy(str(legacy), str(path))  # the journal exists: nothing is redone
+    assert HistoryJournal(str(path)).load() == history
+
+
+def test_migrate_append_sync_and_reload(tmp_path):
+    legacy, path = tmp_path / "Writer.json", tmp_path / "Writer.jsonl"
+    legacy.write_text(json.dumps(messages(0, 4)), encoding="utf-8")
+    HistoryJournal.migrate_legacy(str(legacy), str(path))
+
+    journal = HistoryJournal(str(path))
+    history = journal.load()
+    history += messages(4, 3)
+    journal.sync(history)
+    journal.append(messages(7, 2))  # a concurrent run's own turn
+    journal.close()
+    assert HistoryJournal(str(path)).load() == messages(0, 9)
+    assert HistoryJournal(str(path)).load(limit=3) == messages(6, 3)
+
+
+def test_sync_compacts_to_the_latest_messages(tmp_path):
+    path = str(tmp_path / "Manager.jsonl")
+    journal = HistoryJournal(path, compact_bytes=2_000, keep_last=5)
+    history = messages(0, 60)
+    journal.sync(history)
+    assert HistoryJournal(path).load() == history[-5:]
+
+    history += messages(60, 2)
+    journal.sync(history)  # keeps appending after the rewrite
+    journal.close()
+    assert HistoryJournal(path).load() == history[-7:]
+
+
+def test_append_compacts_to_the_latest_messages(tmp_path):
+    path = str(tmp_path / "Scout.jsonl")
+    journal = HistoryJournal(path, compact_bytes=2_000, keep_last=5)
+    for start in range(0, 60, 2):
+        journal.append(messages(start, 2))
+    journal.close()
+    loaded = HistoryJournal(path).load()
+    assert loaded == messages(60 - len(loaded), len(loaded)) and len(loaded) < 60
+
+
+def test_shrunk_history_rewrites_the_journal(tmp_path):
+    path = str(tmp_path / "Editor.jsonl")
+    journal = HistoryJournal(path)
+    journal.sync(messages(0, 8))
+    journal.sync(messages(0, 2))  # reset or trimmed in memory
+    journal.close()
+    assert HistoryJournal(path).load() == messages(0, 2)
+
+
+def test_torn_last_line_is_skipped_and_not_glued_to_the_next(tmp_path):
+    path = tmp_path / "Critic.jsonl"
+    journal = HistoryJournal(str(path))
+    journal.sync(messages(0, 3))
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b'{"role": "user", "parts": ["cut sho')  # crash mid-write
+    journal = HistoryJournal(str(path))
+    assert journal.load() == messages(0, 3)
+    journal.append(messages(3, 1))
+    journal.close()
+    assert HistoryJournal(str(path)).load() == messages(0, 4)
@@ -0,0 +1,90 @@
+"""@resilient retries and history rollback, on the offline StubLLM provider."""
+import asyncio
+
+import pytest
+
+from unisonai.llms.resilience import RetryPolicy, resilience, resilient
+from unisonai.llms.streaming import Delta
+from unisonai.llms.stub import StubLLM, StubProviderError
+
+
+class WrapperStub(StubLLM):
+    """A StubLLM that, like the real wrappers, records the prompt before the call and goes through @resilient."""
+
+    @resilient("stub")
+    def run(self, prompt: str, save_messages: bool = True) -> str:
+        self.add_message(self.USER, prompt)
+        text = self._answer(prompt)
+        self.add_message(self.MODEL, text)
+        return text
+
+    @resilient("stub")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        self.add_message(self.USER, prompt)
+        text = self._answer(prompt)
+        self.add_message(self.MODEL, text)
+        return text
+
+    @resilient("stub")
+    def stream(self, prompt: str, save_messages: bool = True):
+        self.add_message(self.USER, prompt)
+        text = self._answer(prompt)
+        yield Delta(Delta.TEXT, text)
+        self.add_message(self.MODEL, text)
+        yield Delta(Delta.END, text)
+
+
+def wrapper(model: str) -> WrapperStub:
+    """One endpoint per test, so the shared breakers do not carry over."""
+    llm = WrapperStub(messages=[], model=model)
+    llm.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.0)
+    return llm
+
+
+TURN = [{"role": "user", "content": "hello"}]
+
+
+def test_retry_starts_from_the_same_history():
+    llm = wrapper("retry-run")
+    llm.fail_next(2)
+    assert llm.run("hello") == "retry-run: hello"
+    assert llm.calls == 3
+    assert llm.messages == TURN + [{"role": "assistant", "content": "retry-run: hello"}]
+    stats = resilience.stats()["stub:retry-run"]
+    assert (stats["retries"], stats["recovered"], stats["failed"]) == (2, 1, 0)
+
+
+def test_final_failure_rolls_back_the_history():
+    llm = wrapper("retry-exhausted")
+    llm.add_message(llm.USER, "earlier")
+    llm.fail_next(3)
+    with pytest.raises(StubProviderError):
+        llm.run("hello")
+    assert llm.calls == 3
+    assert llm.messages == [{"role": "user", "content": "earlier"}]
+
+
+def test_client_error_is_not_retried():
+    llm = wrapper("retry-400")
+    llm.fail_next(1, status_code=400)
+    with pytest.raises(StubProviderError):
+        llm.run("hello")
+    assert llm.calls == 1 and llm.messages == []
+    assert resilience.breaker("stub:retry-400").stats()["consecutive_failures"] == 0
+
+
+def test_async_retry_starts_from_the_same_history():
+    llm = wrapper("retry-arun")
+    llm.fail_next(1)
+    assert asyncio.run(llm.arun("hello")) == "retry-arun: hello"
+    assert llm.calls == 2
+    assert llm.messages == TURN + [{"role": "assistant", "content": "retry-arun: hello"}]
+
+
+def test_stream_retry_starts_from_the_same_history():
+    llm = wrapper("retry-stream")
+    llm.fail_next(2)
+    deltas = list(llm.stream("hello"))
+    assert [delta.kind for delta in deltas] == [Delta.TEXT, Delta.END]
+    assert llm.calls == 3
+    assert llm.messages == TURN + [{"role": "assistant", "content": "retry-stream: hello"}]
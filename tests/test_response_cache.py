@@ -0,0 +1,85 @@
+"""The LLM response cache decorators, on a throwaway sqlite file."""
+import asyncio
+import threading
+
+import pytest
+
+from unisonai.llms.response_cache import cached_completion, cached_tool_completion, response_cache
+
+
+class Wrapper:
+    """The wrapper attributes the cache keys on, with counted run/arun/run_tools."""
+
+    def __init__(self, max_tokens: int = 2048):
+        self.messages = []
+        self.model = "stub"
+        self.temperature = 0.0
+        self.max_tokens = max_tokens
+        self.system_prompt = "You are terse."
+        self.calls = 0
+
+    def _reply(self, prompt: str, save_messages: bool) -> str:
+        self.calls += 1
+        text = f"reply {self.calls} to {prompt}"
+        if save_messages:
+            self.messages += [{"role": "user", "content": prompt}, {"role": "assistant", "content": text}]
+        return text
+
+    @cached_completion("stub")
+    def run(self, prompt: str, save_messages: bool = True) -> str:
+        return self._reply(prompt, save_messages)
+
+    @cached_completion("stub")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        return self._reply(prompt, save_messages)
+
+    @cached_tool_completion("stub")
+    async def arun_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        self._reply(prompt, save_messages)
+        return "", [("search", {"query": prompt})]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    enabled, path = response_cache.enabled, response_cache.path
+    response_cache.enable(path=str(tmp_path / "llm_cache.sqlite3"))
+    yield response_cache
+    response_cache.enable(path=path)
+    response_cache.enabled = enabled
+
+
+def test_async_hit_replays_the_turn_off_the_event_loop(cache, monkeypatch):
+    threads = []
+    get = cache.get
+
+    def recording_get(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return get(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "get", recording_get)
+    first, second = Wrapper(), Wrapper()
+    assert asyncio.run(first.arun("hello")) == "reply 1 to hello"
+    assert asyncio.run(second.arun("hello")) == "reply 1 to hello"
+    assert second.calls == 0 and second.messages == first.messages
+    assert threads and threading.main_thread() not in threads
+
+
+def test_output_limit_is_part_of_the_key(cache):
+    Wrapper(max_tokens=2048).run("hello")
+    short = Wrapper(max_tokens=64)
+    short.run("hello")
+    assert short.calls == 1
+    repeat = Wrapper(max_tokens=64)
+    repeat.run("hello")
+    assert repeat.calls == 0
+
+
+def test_async_tool_turn_is_cached(cache):
+    tools = [{"name": "search"}]
+    assert asyncio.run(Wrapper().arun_tools("weather", tools)) == ("", [("search", {"query": "weather"})])
+    again = Wrapper()
+    assert asyncio.run(again.arun_tools("weather", tools)) == ("", [("search", {"query": "weather"})])
+    assert again.calls == 0
+    other = Wrapper()
+    asyncio.run(other.arun_tools("weather", [{"name": "browse"}]))
+    assert other.calls == 1
@@ -0,0 +1,76 @@
+"""RoutedLLM failure paths, on the offline StubLLM provider."""
+import asyncio
+
+import pytest
+
+from unisonai.llms.circuit import CircuitBreaker
+from unisonai.llms.router import RoutedLLM
+from unisonai.llms.stub import StubLLM, StubProviderError
+
+
+def tripped_router() -> RoutedLLM:
+    """A one-provider router whose breaker has just opened; reset_timeout=0 makes it half-open at once."""
+    router = RoutedLLM([StubLLM(messages=[], model="flaky", reply="one two three")],
+                       messages=[], failure_threshold=1, reset_timeout=0.0)
+    router.providers[0].fail_next()
+    with pytest.raises(StubProviderError):
+        router.run("hello")
+    assert router._routes[0].breaker.state == CircuitBreaker.HALF_OPEN
+    return router
+
+
+def assert_trial_free(router: RoutedLLM) -> None:
+    breaker = router._routes[0].breaker
+    assert breaker.allow(), "the half-open trial was not given back"
+    assert not breaker.allow()  # and it is still a single trial
+    breaker.release()
+
+
+def test_closed_stream_releases_half_open_trial():
+    router = tripped_router()
+    calls = router._routes[0].calls
+    stream = router.stream("hello")
+    next(stream)
+    stream.close()
+    assert_trial_free(router)
+    assert router._routes[0].calls == calls  # an abandoned stream is not an outcome
+
+
+def test_closed_astream_releases_half_open_trial():
+    router = tripped_router()
+
+    async def consume_one():
+        stream = router.astream("hello")
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(consume_one())
+    assert_trial_free(router)
+
+
+def test_finished_stream_closes_circuit():
+    router = tripped_router()
+    text = "".join(delta.text for delta in router.stream("hello", save_messages=False) if delta.kind != delta.END)
+    assert text == "one two three"
+    assert router._routes[0].breaker.state == CircuitBreaker.CLOSED
+
+
+def test_providers_keep_their_own_temperature():
+    cold, warm = StubLLM(messages=[], model="cold", temperature=0.1), StubLLM(messages=[], model="warm", temperature=0.9)
+    router = RoutedLLM([cold, warm], messages=[])
+    cold.fail_next()
+    assert router.run("hello") == "warm: hello"
+    assert (cold.temperature, warm.temperature) == (0.1, 0.9)
+    assert RoutedLLM([cold, warm], messages=[], temperature=0.5)._load(0).temperature == 0.5
+
+
+def test_hedged_call_runs_on_a_detached_copy():
+    slow = StubLLM(messages=[], model="slow", latency=0.3)
+    fast = StubLLM(messages=[], model="fast")
+    router = RoutedLLM([slow, fast], messages=[], hedge=True, hedge_after=0.05)
+    assert router.run("hello") == "fast: hello"
+    assert router.hedges == 1
+    router._pool.shutdown(wait=True)  # let the losing call finish
+    assert slow.calls == fast.calls == 0  # both ran on copies, not on the shared instances
+    assert slow.messages == fast.messages == router.messages == [
+        {"role": "user", "content": "hello"}, {"role": "assistant", "content": "fast: hello"}]
@@ -0,0 +1,96 @@
+"""ToolRuntime timeouts, concurrency slots, retries and the disk cache."""
+import time
+import asyncio
+import threading
+
+import pytest
+
+from unisonai.tools.runtime import ToolRuntime, ToolTimeout
+from unisonai.tools.tool import BaseTool, Field
+
+
+class SlowTool(BaseTool):
+    """Sleeps `seconds`, counting how many calls run at once."""
+
+    name = "Slow Tool"
+    description = "Sleeps."
+    params = [Field("seconds", "How long to sleep")]
+    timeout = 0.05
+    max_concurrency = 1
+    retries = 1
+    retry_backoff = 0.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = self.peak = self.runs = 0
+
+    def _run(self, seconds: float):
+        with self.lock:
+            self.running += 1
+            self.runs += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(seconds)
+        with self.lock:
+            self.running -= 1
+        return f"slept {seconds}"
+
+
+class WidgetTool(SlowTool):
+    name = "Widget Tool"
+    side_effects = True
+
+
+def wait_for_workers(tool: SlowTool, runtime: ToolRuntime) -> None:
+    deadline = time.monotonic() + 2.0
+    while (tool.running or runtime._slots_for(tool).active) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_abandoned_worker_keeps_its_slot():
+    runtime, tool = ToolRuntime(), WidgetTool()
+    with pytest.raises(ToolTimeout) as raised:
+        runtime.call(tool, {"seconds": 0.3})
+    assert raised.value.still_running
+    assert runtime._slots_for(tool).active == 1  # held by the worker that is still sleeping
+    wait_for_workers(tool, runtime)
+    assert runtime._slots_for(tool).active == 0
+
+
+def test_side_effect_tool_is_not_retried_after_timeout():
+    runtime, tool = ToolRuntime(), WidgetTool()
+    with pytest.raises(ToolTimeout):
+        runtime.call(tool, {"seconds": 0.3})
+    assert tool.runs == 1
+    assert runtime.stats()[tool.name]["retries"] == 0
+    wait_for_workers(tool, runtime)
+
+
+def test_retry_waits_for_the_abandoned_worker():
+    runtime, tool = ToolRuntime(), SlowTool()
+    with pytest.raises(ToolTimeout):
+        runtime.call(tool, {"seconds": 0.2})
+    assert tool.runs == 2 and tool.peak == 1  # the retry started only after the first call returned
+    wait_for_workers(tool, runtime)
+
+
+def test_async_timeout_keeps_the_slot_and_skips_the_retry():
+    runtime, tool = ToolRuntime(), WidgetTool()
+    with pytest.raises(ToolTimeout):
+        asyncio.run(runtime.acall(tool, {"seconds": 0.3}))
+    assert tool.runs == 1 and runtime._slots_for(tool).active == 1
+    wait_for_workers(tool, runtime)
+    assert runtime._slots_for(tool).active == 0
+
+
+def test_async_call_reuses_the_disk_cache(tmp_path):
+    class CachedTool(SlowTool):
+        name = "Cached Tool"
+        cache_ttl = 60
+        disk_cache = True
+        timeout = None
+
+    tool = CachedTool()
+    assert asyncio.run(ToolRuntime(cache_dir=str(tmp_path)).acall(tool, {"seconds": 0})) == "slept 0"
+    fresh = ToolRuntime(cache_dir=str(tmp_path))  # nothing in memory: the hit comes from disk
+    assert asyncio.run(fresh.acall(tool, {"seconds": 0})) == "slept 0"
+    assert tool.runs == 1 and fresh.stats()[tool.name]["cache_hits"] == 1
@@ -64,7 +64,7 @@ create_text_widget = {
 
 Vision_tool = {
     "name": "VisionTool",
-    "description": "Captures the user's screen or takes a picture with the webcam for analysis. Use mode='screen' for UI content, reading text on the screen, or summarizing visual elements on the desktop. Use mode='camera' for analyzing the user's real-world environment and objects nearby.",
+    "description": "Captures the user's screen or takes a picture with the webcam for analysis. Use mode='screen' for UI content, reading text on the screen, or summarizing visual elements on the desktop. Use mode='camera' for analyzing the user's real-world environment and objects nearby. Use mode='screen+camera' when both views are needed, mode='monitors' to look at every display, and mode='burst' for several camera frames in one request. Use mode='ocr' to read all text on the screen locally and in full.",
     "parameters": {
         "type": "OBJECT",
         "properties": {
@@ -74,8 +74,8 @@ Vision_tool = {
             },
             "mode": {
                 "type": "STRING",
-                "description": "The source of the image to analyze. Defaults to 'screen' if not specified.",
-                "enum": ["screen", "camera"]
+                "description": "The source of the image(s) to analyze. Defaults to 'screen' if not specified.",
+                "enum": ["screen", "camera", "screen+camera", "monitors", "burst", "ocr"]
             }
         },
         "required": ["prompt", "mode"]
@@ -2,15 +2,29 @@ import sys  # Added for exiting the process smoothly
 from unisonai.llms import Gemini
 from unisonai.prompts.agent import AGENT_PROMPT
 from unisonai.prompts.manager import MANAGER_PROMPT
+from unisonai.prompts.agent import NATIVE_TOOLS_NOTE
+from unisonai.prompts.template import PromptTemplate
+from unisonai.tools.schema import compile_tools, describe_calls
 import re
 import yaml
 import colorama
 from colorama import Fore, Style
 from typing import Any
+from concurrent.futures import ThreadPoolExecutor
 import json
 import difflib  # For fuzzy string matching
+import time
+from unisonai.budget import TaskBudget, TaskRun
+from unisonai.context_window import ContextWindow
+from unisonai.history import HistoryJournal
+from unisonai.llms.usage import usage_scope, current_turn, new_turn_id
+import os
 colorama.init(autoreset=True)
 
+# Parsed once; the clan-level fields are bound per agent via partial(), the task fields per run
+AGENT_TEMPLATE = PromptTemplate(AGENT_PROMPT)
+MANAGER_TEMPLATE = PromptTemplate(MANAGER_PROMPT)
+
 
 def create_tools(tools: list):
     formatted_tools = ""
@@ -38,7 +52,11 @@ class Agent:
                  description: str,  # Description of the agent
                  task: str,  # A Base Example Task According to agents's work
                  verbose: bool = True,
-                 tools: list[Any] = []):
+                 tools: list[Any] = [],
+                 budget: TaskBudget = None,
+                 native_tools: bool = True,
+                 checkpoint_every: int = 5,  # steps between background history checkpoints
+                 context_window: ContextWindow = None):
         self.llm = llm
         self.identity = identity
         self.description = description
@@ -55,6 +73,28 @@ class Agent:
         self.clan_name = ""
         self.output_file = None
         self.verbose = verbose
+        self.budget = budget or TaskBudget()
+        # Token budget of the history sent on each step; older turns are summarized once it is exceeded
+        self.context_window = context_window or ContextWindow()
+        self.last_run = None
+        self._journal = None
+        self.bus = None  # set by Clan: messages then go through its MessageBus instead of nested unleash() calls
+        # In-memory state: history is loaded once, the prompt re-rendered only when its inputs change
+        self.checkpoint_every = checkpoint_every
+        self.messages = []
+        self._state_journal = None
+        self._prompt_key = None
+        self._unsaved_steps = 0
+        self._checkpointer = None
+        self._archived = []  # messages trimmed from the LLM history, still part of the journal
+        self._summary_len = 0  # leading LLM messages that carry the trim summary (never journaled)
+        # Native function calling when the LLM supports it; the YAML protocol stays as the fallback
+        self.tool_format = getattr(llm, "tool_format", None) if native_tools else None
+        self.tool_schemas, self.tool_names = None, {}
+        if self.tool_format:
+            self.tool_schemas, self.tool_names = compile_tools(
+                [tool() if isinstance(tool, type) else tool for tool in tools], self.tool_format,
+                builtins=("send_message", "ask_user", "pass_result"))
 
     def _parse_and_fix_json(self, json_str: str):
         """Parses JSON string and attempts to fix common errors."""
@@ -103,6 +143,9 @@ class Agent:
         print(Fore.LIGHTCYAN_EX +
               f"Status: Sending message to {matched_agent_name}" + Style.RESET_ALL)
         msg = f"""MESSAGE FROM: {sender}\nMESSAGE TO: {matched_agent_name}\n\n{message}\n\nADDITIONAL RESOURCE:\n{additional_resource}"""
+        if self.bus is not None:
+            self.bus.post(sender or self.identity, matched_agent_name, msg)
+            return
         is_manager_message = matched_agent_name in [
             "CEO/Manager", "Manager", "CEO"]
         for member in self.rawmembers:
@@ -114,6 +157,23 @@ class Agent:
             elif member.identity == matched_agent_name:
                 member.unleash(msg)
 
+    def send_messages(self, messages: list, sender: str = None):
+        """
+        Sends several messages from one step. On a clan bus they are fanned out together and the
+        replies are gathered into a single message; otherwise they are sent one after another.
+        """
+        if self.bus is None:
+            for item in messages:
+                self.send_message(item["agent_name"], item["message"], item.get("additional_resource"), sender=sender)
+            return
+        outgoing = []
+        for item in messages:
+            matched_agent_name = self._get_agent_by_name(item["agent_name"])
+            print(Fore.LIGHTCYAN_EX +
+                  f"Status: Sending message to {matched_agent_name}" + Style.RESET_ALL)
+            outgoing.append((matched_agent_name, f"""MESSAGE FROM: {sender}\nMESSAGE TO: {matched_agent_name}\n\n{item["message"]}\n\nADDITIONAL RESOURCE:\n{item.get("additional_resource")}"""))
+        self.bus.fan_out(sender or self.identity, outgoing)
+
     def _ensure_dict_params(self, params_data):
         """Ensures params is a dictionary by parsing it if it's a string."""
         if isinstance(params_data, str):
@@ -135,103 +195,208 @@ class Agent:
             return {}
         return params_data
 
-    def unleash(self, task: str):
+    def _get_journal(self) -> HistoryJournal:
+        """Returns the append-only history journal in the current history folder."""
         # Use history_folder if set; if not, default to current directory
         folder = self.history_folder if self.history_folder is not None else "."
-        try:
-            with open(f"{folder}/{self.identity}.json", "r", encoding="utf-8") as f:
-                history = f.read()
-                self.messages = json.loads(history) if history else []
-        except FileNotFoundError:
-            open(f"{folder}/{self.identity}.json",
-                 "w", encoding="utf-8").close()
-            self.messages = []
-        self.llm.reset()
-        if self.tools:
-            if self.ask_user:
-                self.llm.__init__(
-                    messages=self.messages,
-                    system_prompt=MANAGER_PROMPT.format(
-                        members=self.members,
-                        shared_instruction=self.shared_instruction,
-                        identity=self.identity,
-                        description=self.description,
-                        task=self.task,
-                        user_task=task,
-                        tools=self.tools,
-                        plan=self.plan,
-                        clan_name=self.clan_name
-                    )
-                )
-            else:
-                self.llm.__init__(
-                    messages=self.messages,
-                    system_prompt=AGENT_PROMPT.format(
-                        identity=self.identity,
-                        description=self.description,
-                        task=self.task,
-                        tools=self.tools,
-                        user_task=task,
-                        shared_instruction=self.shared_instruction,
-                        members=self.members,
-                        plan=self.plan,
-                        clan_name=self.clan_name
-                    )
-                )
+        path = os.path.join(folder, f"{self.identity}.jsonl")
+        if self._journal is None or self._journal.path != path:
+            HistoryJournal.migrate_legacy(os.path.join(folder, f"{self.identity}.json"), path)
+            self._journal = HistoryJournal(path)
+        return self._journal
+
+    def _configure_llm(self, task: str) -> None:
+        """
+        Prepares the LLM for a run. History is read from the journal only the first time (or when
+        the history folder changes) and then kept in memory; the role prompt is rendered and the
+        LLM re-initialized only when one of the prompt's inputs changed, so in a clan it happens
+        once per clan run rather than on every step.
+        """
+        journal = self._get_journal()
+        if self._state_journal is not journal:
+            self.messages = journal.load()
+            self._state_journal = journal
+            self._archived, self._summary_len = [], 0
+            self._prompt_key = None
         else:
-            if self.ask_user:
-                self.llm.__init__(
-                    messages=self.messages,
-                    system_prompt=MANAGER_PROMPT.format(
-                        members=self.members,
-                        shared_instruction=self.shared_instruction,
-                        identity=self.identity,
-                        description=self.description,
-                        task=self.task,
-                        user_task=task,
-                        plan=self.plan,
-                        tools="No Provided Tools",
-                        clan_name=self.clan_name
-                    )
-                )
-            else:
-                self.llm.__init__(
-                    messages=self.messages,
-                    system_prompt=AGENT_PROMPT.format(
-                        identity=self.identity,
-                        description=self.description,
-                        task=self.task,
-                        tools="No Provided Tools",
-                        plan=self.plan,
-                        user_task=task,
-                        shared_instruction=self.shared_instruction,
-                        members=self.members,
-                        clan_name=self.clan_name
-                    )
-                )
-        print(Fore.LIGHTCYAN_EX + "Status: Evaluating Task...\n")
-        response = self.llm.run(task, save_messages=True)
+            self.messages = list(self.llm.messages)
+        prompt_args = dict(
+            members=self.members,
+            shared_instruction=self.shared_instruction,
+            identity=self.identity,
+            description=self.description,
+            task=self.task,
+            user_task=self.user_task or task,
+            tools=self.tools or "No Provided Tools",
+            plan=self.plan,
+            clan_name=self.clan_name
+        )
+        key = (self.ask_user, self.tool_schemas is not None, tuple(prompt_args.items()))
+        if key == self._prompt_key:
+            return
+        template = (MANAGER_TEMPLATE if self.ask_user else AGENT_TEMPLATE).partial(
+            members=self.members,
+            shared_instruction=self.shared_instruction,
+            identity=self.identity,
+            description=self.description,
+            tools=prompt_args["tools"],
+            clan_name=self.clan_name,
+        )
+        system_prompt = template.render(task=self.task, user_task=prompt_args["user_task"], plan=self.plan)
+        if self.tool_schemas is not None:
+            system_prompt += NATIVE_TOOLS_NOTE
+        self.llm.reset()
+        self.llm.__init__(messages=self.messages, system_prompt=system_prompt)
+        self._prompt_key = key
+
+    def _write_checkpoint(self, journal: HistoryJournal, messages: list) -> None:
         try:
-            with open(f"{folder}/{self.identity}.json", "w", encoding="utf-8") as f:
-                f.write(json.dumps(self.llm.messages, indent=4))
+            journal.sync(messages)
         except Exception as e:
             print(e)
-        if self.verbose:
-            print("Response:")
-            print(response)
-        yaml_blocks = re.findall(r"```yml(.*?)```", response, flags=re.DOTALL)
-        if not yaml_blocks:
-            yaml_blocks = re.findall(
-                r"```yaml(.*?)```", response, flags=re.DOTALL)
-        if not yaml_blocks:
-            return response
-        yaml_content = yaml_blocks[0].strip()
+
+    def stop(self, reason: str = "stopped") -> None:
+        """Ends the current run after its in-flight step (the clan finished while this member worked)."""
+        run = self.last_run
+        if run is not None and run.stop_reason is None:
+            run.stop_reason = reason
+
+    def checkpoint(self, wait: bool = False) -> None:
+        """
+        Writes the in-memory history to the journal on a background thread. With wait=True it
+        blocks until every pending checkpoint is written and fsynced.
+        """
+        if self._state_journal is None:
+            return
+        if self._checkpointer is None:
+            self._checkpointer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"Checkpoint-{self.identity}")
+        self._unsaved_steps = 0
+        messages = self._archived + self.llm.messages[self._summary_len:]
+        future = self._checkpointer.submit(self._write_checkpoint, self._state_journal, messages)
+        if wait:
+            future.result()
+            self._state_journal.flush()
+
+    def _fit_context(self) -> None:
+        """Trims the LLM history to the context window; trimmed messages stay in the journal."""
+        decision = self.context_window.fit(self.llm, agent=self.identity)
+        if decision is not None and decision.dropped:
+            self._archived.extend(decision.dropped[self._summary_len:])
+            self._summary_len = decision.summary_messages
+
+    def _after_step(self) -> None:
+        """Counts a finished LLM step and checkpoints every `checkpoint_every` steps."""
+        self._unsaved_steps += 1
+        if self.checkpoint_every and self._unsaved_steps >= self.checkpoint_every:
+            self.checkpoint()
+
+    def _call_llm(self, task: str):
+        """
+        One LLM call. Returns (response, data) where data is the {"thoughts", "name", "params"}
+        of a native tool call, or None when the response has to go through the YAML fallback.
+        """
+        if self.tool_schemas is None:
+            return self.llm.run(task, save_messages=True), None
+        response, calls = self.llm.run_tools(task, self.tool_schemas, save_messages=True)
+        if not calls:
+            return response, None
+        if len(calls) > 1 and all(self.tool_names.get(n, n) == "send_message" for n, _ in calls):
+            # Several send_message calls in one response are a fan-out
+            data = {"thoughts": response or "", "name": "send_message", "params": {"messages": [args for _, args in calls]}}
+            return response or describe_calls(calls), data
+        name, params = calls[0]
+        data = {"thoughts": response or "", "name": self.tool_names.get(name, name), "params": params}
+        return response or describe_calls(calls), data
+
+    def _run_tool(self, name: str, params):
+        """
+        Executes one of the agent's own tools.
+        Returns (found, tool_response); found is False if no tool matched or it could not run.
+        """
+        for tool in self.rawtools:
+            tool_instance = tool if not isinstance(
+                tool, type) else tool()
+            if tool_instance.name.lower() != name.lower():
+                continue
+            try:
+                if isinstance(params, dict):
+                    tool_response = tool_instance._run(**params)
+                else:
+                    tool_response = tool_instance._run()
+                print(Fore.LIGHTCYAN_EX +
+                      "Status: Executing Tool...\n")
+                print("Tool Response:")
+                print(tool_response)
+                return True, tool_response
+            except TypeError as e:
+                print(
+                    f"{Fore.RED}TypeError when executing tool '{name}': {e}")
+                # Check for errors related to missing self or duplicate parameters.
+                if ("missing 1 required positional argument: 'self'" in str(e) or
+                        "got multiple values for argument" in str(e)):
+                    try:
+                        print(
+                            f"{Fore.LIGHTCYAN_EX}Status: Executing Tool (via unbound method)...\n")
+                        # Call the unbound _run method from the class so that self is not passed twice.
+                        tool_response = tool_instance.__class__._run(
+                            **params)
+                        print("Tool Response:")
+                        print(tool_response)
+                        return True, tool_response
+                    except Exception as inner_e:
+                        print(
+                            f"{Fore.RED}Failed to execute tool via unbound method: {inner_e}")
+            except Exception as e:
+                print(
+                    f"{Fore.RED}Error executing tool '{name}': {e}")
+        return False, None
+
+    def unleash(self, task: str):
+        """
+        Runs the agent iteratively: one LLM call per step until it passes a result, delegates
+        with send_message, answers in plain text, or its TaskBudget runs out.
+        """
         try:
-            data = yaml.safe_load(yaml_content)
-        except yaml.YAMLError as e:
-            print(f"{Fore.RED}Error parsing YAML: {e}")
-            return response
-        if "thoughts" in data and "name" in data and "params" in data:
+            with usage_scope(agent=self.identity, turn_id=current_turn() or new_turn_id()):
+                return self._unleash(task)
+        finally:
+            if self._unsaved_steps:
+                self.checkpoint()
+
+    def _unleash(self, task: str):
+        run = self.last_run = TaskRun(self.budget)
+        response = None
+        self._configure_llm(task)
+        while not run.exceeded():
+            prompt = task
+            print(Fore.LIGHTCYAN_EX + "Status: Evaluating Task...\n")
+            self._fit_context()
+            context_tokens = self.context_window.count(self.llm)  # resent with this step
+            started = time.perf_counter()
+            response, data = self._call_llm(task)
+            llm_seconds = time.perf_counter() - started
+            self._after_step()
+            if self.verbose:
+                print("Response:")
+                print(response)
+            if data is None:
+                yaml_blocks = re.findall(r"```yml(.*?)```", response, flags=re.DOTALL)
+                if not yaml_blocks:
+                    yaml_blocks = re.findall(
+                        r"```yaml(.*?)```", response, flags=re.DOTALL)
+                if not yaml_blocks:
+                    run.record_step("answer", prompt, response, llm_seconds, context_tokens=context_tokens)
+                    return response
+                yaml_content = yaml_blocks[0].strip()
+                try:
+                    data = yaml.safe_load(yaml_content)
+                except yaml.YAMLError as e:
+                    print(f"{Fore.RED}Error parsing YAML: {e}")
+                    return response
+            if not (isinstance(data, dict) and "thoughts" in data and "name" in data and "params" in data):
+                print(
+                    Fore.RED + "YAML block found, but it doesn't match the expected format.")
+                return response
             thoughts = data["thoughts"]
             name = data["name"]
             params_raw = data["params"]
@@ -239,80 +404,61 @@ class Agent:
             if len(thoughts) > 150:
                 thoughts = f"{thoughts[:120]}..."
             print(f"{Fore.MAGENTA}Thoughts: {thoughts}\n{Fore.GREEN}Using Tool ({name})\n{Fore.LIGHTYELLOW_EX}Params: {params}")
+            run.record_step(name, prompt, response, llm_seconds, context_tokens=context_tokens)
             if name == "send_message":
-                if isinstance(params, dict) and "agent_name" in params and "message" in params:
+                if isinstance(params, dict) and isinstance(params.get("messages"), list):
+                    messages = [m for m in params["messages"] if isinstance(m, dict) and "agent_name" in m and "message" in m]
+                    if messages:
+                        self.send_messages(messages, sender=self.identity)
+                    else:
+                        print(f"{Fore.RED}Error: send_message 'messages' need 'agent_name' and 'message' each.")
+                elif isinstance(params, dict) and "agent_name" in params and "message" in params:
                     self.send_message(params["agent_name"], params["message"], params.get(
                         "additional_resource"), sender=self.identity)
                 else:
                     print(
                         f"{Fore.RED}Error: Missing required parameters for send_message tool. Need 'agent_name' and 'message'.")
                     print(f"{Fore.RED}Available params: {params}")
+                return None
             elif name == "ask_user":
                 if isinstance(params, dict) and "question" in params:
                     print("QUESTION: " + params["question"])
-                    self.unleash(input("You: "))
                 else:
                     question = str(
                         params) if params else "What would you like to say?"
                     print("QUESTION: " + question)
-                    self.unleash(input("You: "))
+                task = input("You: ")
             elif name == "pass_result":
                 if isinstance(params, dict) and "result" in params:
                     print("RESULT: " + str(params["result"]))
-                    if self.output_file:
-                        with open(self.output_file, "w", encoding="utf-8") as file:
-                            file.write(
-                                str(params["result"]) or str(params))
-                        sys.exit(0)
                 else:
                     print("RESULT: " + str(params))
-                    if self.output_file:
-                        with open(self.output_file, "w", encoding="utf-8") as file:
-                            file.write(
-                                str(params["result"]) or str(params))
+                result = params["result"] if isinstance(params, dict) and "result" in params else params
+                if self.output_file:
+                    with open(self.output_file, "w", encoding="utf-8") as file:
+                        file.write(str(result))
+                    if self.bus is None:
+                        self.checkpoint(wait=True)
                         sys.exit(0)
+                if self.bus is not None:
+                    self.bus.finish(result)
+                return None
             else:
-                # Execute the tool by first ensuring we have an instance.
-                for tool in self.rawtools:
-                    tool_instance = tool if not isinstance(
-                        tool, type) else tool()
-                    if tool_instance.name.lower() == name.lower():
-                        try:
-                            if isinstance(params, dict):
-                                tool_response = tool_instance._run(**params)
-                            else:
-                                tool_response = tool_instance._run()
-                            print(Fore.LIGHTCYAN_EX +
-                                  "Status: Executing Tool...\n")
-                            print("Tool Response:")
-                            print(tool_response)
-                            self.unleash(
-                                "Here is your tool response:\n\n" + str(tool_response))
-                            break
-                        except TypeError as e:
-                            print(
-                                f"{Fore.RED}TypeError when executing tool '{name}': {e}")
-                            # Check for errors related to missing self or duplicate parameters.
-                            if ("missing 1 required positional argument: 'self'" in str(e) or
-                                    "got multiple values for argument" in str(e)):
-                                try:
-                                    print(
-                                        f"{Fore.LIGHTCYAN_EX}Status: Executing Tool (via unbound method)...\n")
-                                    # Call the unbound _run method from the class so that self is not passed twice.
-                                    tool_response = tool_instance.__class__._run(
-                                        **params)
-                                    print("Tool Response:")
-                                    print(tool_response)
-                                    self.unleash(
-                                        "Here is your tool response:\n\n" + str(tool_response))
-                                    break
-                                except Exception as inner_e:
-                                    print(
-                                        f"{Fore.RED}Failed to execute tool via unbound method: {inner_e}")
-                        except Exception as e:
-                            print(
-                                f"{Fore.RED}Error executing tool '{name}': {e}")
-        else:
-            print(
-                Fore.RED + "YAML block found, but it doesn't match the expected format.")
-            return response
+                run.register_call(name, params)
+                if run.stop_reason:
+                    break
+                if run.has_result(name, params):  # failed calls may be retried
+                    print(f"{Fore.YELLOW}Repeated tool call ({name}) detected; reusing previous result.")
+                    task = ("You already called this tool with these exact params. Do not repeat it. "
+                            f"The previous result was:\n\n{run.previous_result(name, params)}")
+                    continue
+                started = time.perf_counter()
+                with usage_scope(tool=name):
+                    found, tool_response = self._run_tool(name, params)
+                run.steps[-1].tool_seconds = time.perf_counter() - started
+                if not found:
+                    return None
+                run.remember_result(name, params, tool_response)
+                task = "Here is your tool response:\n\n" + str(tool_response)
+        print(f"{Fore.RED}{run.stop_message()}")
+        return f"{run.stop_message()} Last response:\n{response}"
@@ -0,0 +1,120 @@
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from unisonai.llms.ratelimit import estimate_tokens
+
+
+class TaskBudget:
+    """
+    Per-task limits for an agent run. Any limit set to None is disabled.
+
+    max_steps:   LLM calls allowed for one task
+    max_seconds: wall-clock time for one task
+    max_tokens:  estimated tokens sent and received for one task; every step counts the system
+                 prompt and history it resends, its new message and the reply
+    max_repeats: identical tool calls (same name and params) tolerated before the run is cut off
+    """
+
+    def __init__(self,
+                 max_steps: Optional[int] = 25,
+                 max_seconds: Optional[float] = 300.0,
+                 max_tokens: Optional[int] = 200_000,
+                 max_repeats: Optional[int] = 3):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.max_repeats = max_repeats
+
+
+class StepRecord:
+    """Timing and cost of one agent step (one LLM call plus the action it chose)."""
+
+    def __init__(self, index: int, action: str, llm_seconds: float, tool_seconds: float, tokens: int):
+        self.index = index
+        self.action = action
+        self.llm_seconds = llm_seconds
+        self.tool_seconds = tool_seconds
+        self.tokens = tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "step": self.index,
+            "action": self.action,
+            "llm_seconds": round(self.llm_seconds, 3),
+            "tool_seconds": round(self.tool_seconds, 3),
+            "tokens": self.tokens,
+        }
+
+
+class TaskRun:
+    """Tracks one task against its TaskBudget: step count, elapsed time, tokens and repeated calls."""
+
+    def __init__(self, budget: TaskBudget):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.steps: List[StepRecord] = []
+        self.tokens = 0
+        self.stop_reason: Optional[str] = None
+        self._calls: Dict[str, int] = {}
+        self._results: Dict[str, Any] = {}
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def record_step(self, action: str, prompt: str, response: str, llm_seconds: float, tool_seconds: float = 0.0,
+                    context_tokens: int = 0) -> StepRecord:
+        """`context_tokens` is the system prompt and history sent along with `prompt`."""
+        tokens = context_tokens + estimate_tokens(prompt) + estimate_tokens(response)
+        self.tokens += tokens
+        step = StepRecord(len(self.steps) + 1, action, llm_seconds, tool_seconds, tokens)
+        self.steps.append(step)
+        return step
+
+    def exceeded(self) -> Optional[str]:
+        """Returns why the run must stop before the next LLM call, or None if it may continue."""
+        budget = self.budget
+        if budget.max_steps is not None and len(self.steps) >= budget.max_steps:
+            self.stop_reason = f"step limit of {budget.max_steps} reached"
+        elif budget.max_seconds is not None and self.elapsed >= budget.max_seconds:
+            self.stop_reason = f"time limit of {budget.max_seconds:.0f}s reached"
+        elif budget.max_tokens is not None and self.tokens >= budget.max_tokens:
+            self.stop_reason = f"token limit of {budget.max_tokens} reached"
+        return self.stop_reason
+
+    @staticmethod
+    def _call_key(name: str, params: Any) -> str:
+        return f"{name.lower()}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def register_call(self, name: str, params: Any) -> int:
+        """Counts a tool call and returns how many times this exact call has been made in the run."""
+        key = self._call_key(name, params)
+        self._calls[key] = self._calls.get(key, 0) + 1
+        count = self._calls[key]
+        if self.budget.max_repeats is not None and count > self.budget.max_repeats:
+            self.stop_reason = f"tool '{name}' was called {count} times with identical params"
+        return count
+
+    def remember_result(self, name: str, params: Any, result: Any) -> None:
+        self._results[self._call_key(name, params)] = result
+
+    def previous_result(self, name: str, params: Any) -> Any:
+        return self._results.get(self._call_key(name, params))
+
+    def has_result(self, name: str, params: Any) -> bool:
+        """True once this exact call has succeeded; failed calls leave nothing to reuse."""
+        return self._call_key(name, params) in self._results
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "steps": len(self.steps),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "tokens": self.tokens,
+            "stop_reason": self.stop_reason,
+            "timings": [step.as_dict() for step in self.steps],
+        }
+
+    def stop_message(self) -> str:
+        return (f"Task stopped: {self.stop_reason} after {len(self.steps)} steps "
+                f"({self.elapsed:.1f}s, ~{self.tokens} tokens).")
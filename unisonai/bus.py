@@ -0,0 +1,320 @@
+import time
+import uuid
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from typing import Any, Dict, List, Optional, Tuple
+
+import colorama
+from colorama import Fore
+
+colorama.init(autoreset=True)
+
+MANAGER_ALIASES = ("CEO/Manager", "Manager", "CEO")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Envelope:
+    """One message on the clan bus, with the timestamps used for latency tracing."""
+
+    def __init__(self, sender: str, recipient: str, content: str, group: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.sender = sender
+        self.recipient = recipient
+        self.content = content
+        self.group = group  # fan-out group the message belongs to, if any
+        self.reply_to: Optional[str] = None  # id of the message this one answers
+        self.sent = time.monotonic()
+        self.started: Optional[float] = None  # recipient began working on it
+        self.finished: Optional[float] = None  # recipient's run returned
+        self.replied: Optional[float] = None  # recipient sent something back to the sender
+
+    def as_dict(self) -> Dict[str, Any]:
+        def span(end: Optional[float], start: Optional[float]) -> Optional[float]:
+            return round(end - start, 4) if end is not None and start is not None else None
+
+        return {
+            "id": self.id,
+            "sender": self.sender,
+            "recipient": self.recipient,
+            "group": self.group,
+            "reply_to": self.reply_to,
+            "delivery_seconds": span(self.started, self.sent),
+            "handling_seconds": span(self.finished, self.started),
+            "turnaround_seconds": span(self.replied, self.sent),
+        }
+
+
+class _Gather:
+    """Replies a sender is waiting for after fanning work out to several members."""
+
+    def __init__(self, owner: str, recipients: List[str], timeout: float):
+        self.id = uuid.uuid4().hex[:8]
+        self.owner = owner
+        self.recipients = recipients
+        self.pending = set(recipients)
+        self.replies: List[Envelope] = []
+        self.deadline = time.monotonic() + timeout
+
+
+class MessageBus:
+    """
+    Delivers messages between clan members through per-agent mailboxes instead of nested
+    unleash() calls.
+
+    - every member has an asyncio mailbox drained by one worker, so a member handles its
+      messages one at a time while different members work concurrently
+    - at most `max_concurrency` members run at once; agents are synchronous and run on a
+      thread pool, so send_message() from inside a run just posts and returns
+    - fan_out() sends several messages in one step and gathers the recipients' replies into
+      a single message for the sender (partial after `gather_timeout` seconds or when
+      nothing else is left to run)
+    - every message is traced: delivery latency (sent -> recipient starts), handling time and
+      turnaround (sent -> recipient replies to the sender); see trace() and stats()
+    - the run ends when a member calls finish() (pass_result) or no work is left; members still
+      mid-run are then asked to stop after their current step (agent.stop()) and waited for
+    """
+
+    def __init__(self, max_concurrency: int = 3, gather_timeout: float = 600.0, verbose: bool = True):
+        self.max_concurrency = max(1, max_concurrency)
+        self.gather_timeout = gather_timeout
+        self.verbose = verbose
+        self.manager: Optional[str] = None
+        self.result: Any = None
+        self._agents: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._log: List[Envelope] = []
+        self._groups: List[_Gather] = []
+        self._inflight = 0  # messages posted but not yet handled
+        self._closed = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._mailboxes: Dict[str, asyncio.Queue] = {}
+        self._done: Optional[asyncio.Event] = None
+        self._running: Dict[str, Any] = {}  # identity -> concurrent future of its latest unleash()
+
+    # --- Membership ---
+    def register(self, agent, manager: bool = False) -> None:
+        self._agents[agent.identity] = agent
+        agent.bus = self
+        if manager:
+            self.manager = agent.identity
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Maps a recipient name (or a manager alias) to a registered identity."""
+        if name in self._agents:
+            return name
+        if name in MANAGER_ALIASES:
+            return self.manager
+        lowered = name.lower()
+        for identity in self._agents:
+            if identity.lower() == lowered:
+                return identity
+        return None
+
+    # --- Sending (thread-safe) ---
+    def post(self, sender: str, recipient: str, content: str, group: Optional[str] = None) -> Optional[Envelope]:
+        """Queues a message for `recipient` and returns immediately."""
+        identity = self.resolve(recipient)
+        if identity is None:
+            print(f"{Fore.RED}Bus: no clan member named '{recipient}'; message from {sender} dropped.")
+            return None
+        envelope = Envelope(sender, identity, content, group)
+        with self._lock:
+            if self._closed:
+                return None
+            self._log.append(envelope)
+            self._inflight += 1  # counted before the sender's own run ends, so the bus never looks idle
+        self._call(self._route, envelope)
+        return envelope
+
+    def fan_out(self, sender: str, messages: List[Tuple[str, str]]) -> List[Envelope]:
+        """
+        Posts several (recipient, content) messages at once. When they go to more than one
+        member, their replies to `sender` are gathered and delivered to it as one message.
+        """
+        recipients = [self.resolve(recipient) for recipient, _ in messages]
+        distinct = list(dict.fromkeys(r for r in recipients if r and r != sender))
+        group = None
+        if len(distinct) > 1:
+            gather = _Gather(sender, distinct, self.gather_timeout)
+            with self._lock:
+                self._groups.append(gather)
+            group = gather.id
+        envelopes = [self.post(sender, recipient, content, group) for recipient, content in messages]
+        return [envelope for envelope in envelopes if envelope is not None]
+
+    def finish(self, result: Any = None) -> None:
+        """Ends the run (called when a member passes the final result)."""
+        with self._lock:
+            self.result = result
+            self._closed = True
+        self._call(self._stop)
+
+    def _call(self, callback, *args) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            callback(*args)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(callback, *args)
+
+    # --- Routing (event loop only) ---
+    def _route(self, envelope: Envelope) -> None:
+        now = time.monotonic()
+        # The first unanswered message the sender got from the recipient is the one being answered
+        for earlier in self._log:
+            if (earlier.sender == envelope.recipient and earlier.recipient == envelope.sender
+                    and earlier.replied is None and earlier is not envelope and earlier.sent <= envelope.sent):
+                earlier.replied = now
+                envelope.reply_to = earlier.id
+                break
+        for gather in self._groups:
+            if gather.owner == envelope.recipient and envelope.sender in gather.pending:
+                gather.pending.discard(envelope.sender)
+                gather.replies.append(envelope)
+                envelope.started = envelope.finished = now  # consumed by the gather
+                with self._lock:
+                    self._inflight -= 1
+                if not gather.pending:
+                    self._release(gather)
+                return
+        self._mailboxes[envelope.recipient].put_nowait(envelope)
+
+    def _release(self, gather: _Gather) -> None:
+        """Delivers a gather group's replies to its owner as one message."""
+        self._groups.remove(gather)
+        if not gather.replies:
+            return
+        missing = [name for name in gather.recipients if name in gather.pending]
+        content = f"GATHERED REPLIES ({len(gather.replies)}/{len(gather.recipients)}):\n\n"
+        content += "\n\n---\n\n".join(reply.content for reply in gather.replies)
+        if missing:
+            content += "\n\nNO REPLY YET FROM: " + ", ".join(missing)
+        envelope = Envelope(", ".join(reply.sender for reply in gather.replies), gather.owner, content, gather.id)
+        with self._lock:
+            self._log.append(envelope)
+            self._inflight += 1
+        self._mailboxes[gather.owner].put_nowait(envelope)
+
+    def _settle(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+            idle = self._inflight == 0
+        if not idle:
+            return
+        # Nothing is running: hand over whatever the open gathers have, or stop
+        for gather in [g for g in self._groups if g.replies]:
+            self._release(gather)
+        with self._lock:
+            idle = self._inflight == 0
+        if idle:
+            self._stop()
+
+    def _stop(self) -> None:
+        if self._done is not None:
+            self._done.set()
+
+    def _expire_gathers(self) -> None:
+        now = time.monotonic()
+        for gather in [g for g in self._groups if g.deadline <= now]:
+            self._release(gather)
+
+    # --- Scheduling ---
+    async def _worker(self, identity: str, slots: asyncio.Semaphore, executor: ThreadPoolExecutor) -> None:
+        agent = self._agents[identity]
+        mailbox = self._mailboxes[identity]
+        loop = asyncio.get_running_loop()
+        while True:
+            envelope = await mailbox.get()
+            async with slots:
+                envelope.started = time.monotonic()
+                if self.verbose:
+                    print(f"{Fore.LIGHTCYAN_EX}Bus: {identity} picked up message from {envelope.sender} "
+                          f"after {envelope.started - envelope.sent:.2f}s")
+                try:
+                    context = contextvars.copy_context()
+                    future = self._running[identity] = executor.submit(context.run, agent.unleash, envelope.content)
+                    await asyncio.wrap_future(future)
+                except Exception as e:
+                    print(f"{Fore.RED}Bus: {identity} failed on message {envelope.id}: {e}")
+                finally:
+                    envelope.finished = time.monotonic()
+                    self._settle()
+
+    async def run(self, recipient: str, content: str, sender: str = "user") -> Any:
+        """Delivers the first message and schedules members until the clan finishes."""
+        self._loop = asyncio.get_running_loop()
+        self._done = asyncio.Event()
+        self._closed = False
+        self._mailboxes = {identity: asyncio.Queue() for identity in self._agents}
+        slots = asyncio.Semaphore(self.max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ClanMember")
+        workers = [asyncio.create_task(self._worker(identity, slots, executor)) for identity in self._agents]
+        try:
+            if self.post(sender, recipient, content) is None:
+                return None
+            while not self._done.is_set():
+                try:
+                    await asyncio.wait_for(self._done.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    self._expire_gathers()
+        finally:
+            with self._lock:
+                self._closed = True
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+            await self._drain()
+            self._loop = None
+        return self.result
+
+    async def _drain(self) -> None:
+        """
+        Stops members still mid-run after the clan finished and waits for them (up to
+        gather_timeout), so callers never checkpoint an agent that is still running.
+        """
+        running = {identity: f for identity, f in self._running.items() if not f.done()}
+        self._running = {}
+        if not running:
+            return
+        for identity in running:
+            stop = getattr(self._agents[identity], "stop", None)
+            if stop is not None:
+                stop("the clan finished")
+        if self.verbose:
+            print(f"{Fore.LIGHTCYAN_EX}Bus: waiting for {', '.join(running)} to finish their current step")
+        _, pending = await asyncio.to_thread(wait_futures, list(running.values()), self.gather_timeout)
+        if pending:
+            print(f"{Fore.RED}Bus: members still running after {self.gather_timeout:.0f}s: "
+                  f"{', '.join(i for i, f in running.items() if f in pending)}")
+
+    # --- Tracing ---
+    def trace(self) -> List[Dict[str, Any]]:
+        """Per-message delivery, handling and turnaround timings, in send order."""
+        with self._lock:
+            return [envelope.as_dict() for envelope in self._log]
+
+    def stats(self) -> Dict[str, Any]:
+        records = self.trace()
+        delivery = [r["delivery_seconds"] for r in records if r["delivery_seconds"] is not None]
+        turnaround = [r["turnaround_seconds"] for r in records if r["turnaround_seconds"] is not None]
+        return {
+            "messages": len(records),
+            "delivery_p50": _percentile(delivery, 0.5),
+            "delivery_p95": _percentile(delivery, 0.95),
+            "turnaround_p50": _percentile(turnaround, 0.5),
+            "turnaround_p95": _percentile(turnaround, 0.95),
+        }
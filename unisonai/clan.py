@@ -1,8 +1,16 @@
 from typing import Any
 from unisonai.prompts.plan import PLAN_PROMPT
 from unisonai.agent import Agent
+from unisonai.bus import MessageBus
+from unisonai.plan_cache import PlanCache, plan_cache
+from unisonai.llms.usage import usage_scope, new_turn_id
 import re
+import copy
+import asyncio
+import threading
+import contextvars
 import os
+from concurrent.futures import ThreadPoolExecutor
 import colorama
 colorama.init(autoreset=True)
 
@@ -17,8 +25,18 @@ def create_members(members: list[Any]):
     return formatted_members
 
 
+def _own_llm(llm):
+    """A copy of a wrapper with its own history list and chat session, for a member that shared one."""
+    clone = copy.copy(llm)
+    clone.messages = []
+    if hasattr(clone, "chat_session"):
+        clone.chat_session = None
+    return clone
+
+
 class Clan:
-    def __init__(self, clan_name: str, manager: Agent, members: list[Agent], shared_instruction: str, goal: str, history_folder: str = "history", output_file: str = None):
+    def __init__(self, clan_name: str, manager: Agent, members: list[Agent], shared_instruction: str, goal: str, history_folder: str = "history", output_file: str = None, max_concurrency: int = 3, gather_timeout: float = 600.0,
+                 cache_plan: bool = True, plan_ttl: float = None, serve_stale_plan: bool = False, plan_store: PlanCache = None):
         self.clan_name = clan_name
         self.goal = goal
         self.shared_instruction = shared_instruction
@@ -26,7 +44,24 @@ class Clan:
         self.members = members
         self.output_file = output_file
         self.history_folder = history_folder
+        self.max_concurrency = max_concurrency
+        self.gather_timeout = gather_timeout
+        self.bus = None
+        # Plans are reused for the same goal, roster, instruction and model (see unisonai/plan_cache.py)
+        self.cache_plan = cache_plan
+        self.plan_ttl = plan_ttl
+        self.serve_stale_plan = serve_stale_plan  # use an expired plan now, regenerate it in the background
+        self.plan_store = plan_store or plan_cache
+        self.plan_refresh = None
         self.manager.ask_user = False
+        # Members run at the same time, and each one resets and re-initializes its LLM with its
+        # own prompt and history: members built with the same LLM instance get their own copy
+        seen_llms = set()
+        for member in [self.manager] + [m for m in self.members if m is not self.manager]:
+            if id(member.llm) in seen_llms:
+                member.llm = _own_llm(member.llm)
+                member._prompt_key = None
+            seen_llms.add(id(member.llm))
         os.makedirs(self.history_folder, exist_ok=True)
         if self.output_file is not None:
             open(self.output_file, "w", encoding="utf-8").close()
@@ -52,10 +87,19 @@ class Clan:
             member.rawmembers = self.members
             self.formatted_members = formatted_members
 
-    def unleash(self):
-        self.manager.llm.reset()
+    def plan_key(self) -> str:
+        model = getattr(self.manager.llm, "model", type(self.manager.llm).__name__)
+        return PlanCache.make_key(self.goal, self.formatted_members, self.shared_instruction, str(model))
+
+    def invalidate_plan(self) -> None:
+        """Forgets the cached plan for this clan's goal and roster."""
+        self.plan_store.invalidate(self.plan_key())
+
+    def _make_plan(self, llm=None) -> str:
+        llm = llm or self.manager.llm
+        llm.reset()
         # self.manager.llm.__init__(system_prompt=PLAN_PROMPT.format(members=self.members))
-        response = self.manager.llm.run(PLAN_PROMPT.format(
+        response = llm.run(PLAN_PROMPT.format(
             members=self.formatted_members,
             client_task=self.goal
         ) + "\n\n" + "Make a plan To acomplish this task: \n" + self.goal)
@@ -64,8 +108,70 @@ class Clan:
         # remove the <think> and </think> and all its content
         response = re.sub(r"<think>(.*?)</think>", "",
                           response, flags=re.DOTALL)
-        self.manager.llm.reset()
-        for member in self.members:
-            member.plan = response
+        llm.reset()
+        return response
+
+    def _refresh_plan(self, key: str, llm) -> None:
+        try:
+            self.plan_store.put(key, self._make_plan(llm), refresh=True)
+        except Exception as e:
+            print(f"{colorama.Fore.RED}Background plan refresh failed: {e}")
+
+    def _get_plan(self) -> str:
+        """Returns a cached plan when there is one for this goal and roster, otherwise plans with the manager."""
+        if not self.cache_plan:
+            return self._make_plan()
+        key = self.plan_key()
+        plan, fresh = self.plan_store.get(key, self.plan_ttl)
+        if plan is not None and fresh:
+            print(colorama.Fore.LIGHTCYAN_EX + "Status: Using cached plan\n\n" + colorama.Fore.LIGHTYELLOW_EX + plan)
+            return plan
+        if plan is not None and self.serve_stale_plan:
+            print(colorama.Fore.LIGHTCYAN_EX + "Status: Using expired cached plan, refreshing it in the background\n\n" +
+                  colorama.Fore.LIGHTYELLOW_EX + plan)
+            # A copy of the manager's LLM, so the refresh does not share its messages with the run.
+            # Not a daemon thread: a short scheduled job still waits for the new plan before exiting.
+            context = contextvars.copy_context()
+            self.plan_refresh = threading.Thread(target=context.run, args=(self._refresh_plan, key, copy.copy(self.manager.llm)),
+                                                 name="PlanRefresh")
+            self.plan_refresh.start()
+            return plan
+        plan = self._make_plan()
+        self.plan_store.put(key, plan)
+        return plan
+
+    def unleash(self):
+        """Plans the task, then runs the members on a message bus until the manager passes the result."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aunleash())
+        # Called from code that already runs an event loop (use aunleash there to avoid blocking it):
+        # run the bus on its own loop in a worker thread
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ClanUnleash") as pool:
+            return pool.submit(context.run, lambda: asyncio.run(self.aunleash())).result()
+
+    async def aunleash(self):
+        """
+        Async variant of `unleash`. Members exchange messages through per-agent mailboxes and
+        up to `max_concurrency` of them work at the same time; see unisonai/bus.py.
+        """
+        with usage_scope(agent=self.manager.identity, turn_id=new_turn_id()):
+            plan = await asyncio.to_thread(self._get_plan)
+            for member in self.members:
+                member.plan = plan
 
-        self.manager.unleash(self.goal)
+            self.bus = MessageBus(self.max_concurrency, self.gather_timeout, verbose=self.manager.verbose)
+            self.bus.register(self.manager, manager=True)
+            for member in self.members:
+                if member is not self.manager:
+                    self.bus.register(member)
+            result = await self.bus.run(self.manager.identity, self.goal)
+            # Agents kept their history in memory during the run; make sure it is all on disk
+            for member in set(self.members) | {self.manager}:
+                await asyncio.to_thread(member.checkpoint, True)
+        stats = self.bus.stats()
+        print(f"{colorama.Fore.LIGHTCYAN_EX}Status: Clan finished after {stats['messages']} messages "
+              f"(delivery p50 {stats['delivery_p50']:.2f}s, turnaround p50 {stats['turnaround_p50']:.2f}s)")
+        return result
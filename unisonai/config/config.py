@@ -1,64 +1,277 @@
 import os
 import json
+import copy
+import atexit
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 class Config:
+    """
+    Layered settings held in memory: environment > config file > defaults.
+
+    - reads never touch the disk; environment variables are looked up live, so a key exported
+      after start-up is picked up on the next read
+    - set_api_key() / set() only change the in-memory file layer. Setting a value that is
+      already in effect (for example a key the wrappers just read from the environment) is a
+      no-op; real changes are written `save_delay` seconds after the last one (debounced),
+      atomically (temp file + fsync + rename), and at interpreter exit. save() writes right away
+    - watch() polls the file and hot-reloads edits made by other processes or by hand;
+      on_change() callbacks receive (key, old, new) for every effective value that changed
+    - every method is safe to call from several threads
+    """
+
     _instance = None
-    _config_file = Path.home() / '.unisonai' / 'config.json'
-    _config: Dict[str, Any] = {
+    _config_file = Path(os.getenv("UNISONAI_CONFIG", str(Path.home() / '.unisonai' / 'config.json')))
+    _defaults: Dict[str, Any] = {
         'api_keys': {
             'gemini': None,
             'openai': None,
             'anthropic': None,
             'cohere': None,
             'groq': None,
-            'mixtral': None
+            'mixtral': None,
+            'xai': None,
         }
     }
+    # Environment variable that overrides each setting
+    _env_vars: Dict[str, str] = {
+        'api_keys.gemini': 'GEMINI_API_KEY',
+        'api_keys.openai': 'OPENAI_API_KEY',
+        'api_keys.anthropic': 'ANTHROPIC_API_KEY',
+        'api_keys.cohere': 'COHERE_API_KEY',
+        'api_keys.groq': 'GROQ_API_KEY',
+        'api_keys.mixtral': 'MISTRAL_API_KEY',
+        'api_keys.xai': 'XAI_API_KEY',
+    }
+    save_delay = 1.0
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Config, cls).__new__(cls)
-            cls._instance._load_config()
+            cls._instance._setup()
         return cls._instance
 
+    def _setup(self):
+        self._lock = threading.RLock()
+        self._file: Dict[str, Any] = {}
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self._listeners: List[Callable[[str, Any, Any], None]] = []
+        self.saves = 0
+        self.reloads = 0
+        self._load_config()
+        atexit.register(self.flush)
+
+    # --- Layers ---
+    @staticmethod
+    def _split(key: str) -> List[str]:
+        return key.split('.')
+
+    @staticmethod
+    def _lookup(tree: Dict[str, Any], parts: List[str]) -> Any:
+        for part in parts:
+            if not isinstance(tree, dict) or part not in tree:
+                return None
+            tree = tree[part]
+        return tree
+
+    def _effective(self, key: str) -> Any:
+        """Must be called with the lock held."""
+        env = self._env_vars.get(key)
+        if env and os.getenv(env):
+            return os.getenv(env)
+        parts = self._split(key)
+        value = self._lookup(self._file, parts)
+        return value if value is not None else self._lookup(self._defaults, parts)
+
+    def _keys(self) -> List[str]:
+        """Every leaf key of the defaults and the file layer. Must be called with the lock held."""
+        keys = []
+
+        def walk(tree, prefix):
+            for name, value in tree.items():
+                key = f"{prefix}{name}"
+                if isinstance(value, dict):
+                    walk(value, key + '.')
+                elif key not in keys:
+                    keys.append(key)
+        walk(self._defaults, '')
+        walk(self._file, '')
+        return keys
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Effective value of a dotted key such as 'api_keys.gemini'."""
+        with self._lock:
+            value = self._effective(key)
+        return default if value is None else value
+
+    def set(self, key: str, value: Any, persist: bool = True) -> None:
+        """Sets a dotted key in the file layer; persist=False keeps the change in memory only."""
+        with self._lock:
+            parts = self._split(key)
+            if self._lookup(self._file, parts) == value or (value is not None and self._effective(key) == value):
+                return
+            old = self._effective(key)
+            tree = self._file
+            for part in parts[:-1]:
+                tree = tree.setdefault(part, {})
+            tree[parts[-1]] = value
+            new = self._effective(key)
+            if persist:
+                self._dirty = True
+                self._schedule_save()
+        if old != new:
+            self._notify([(key, old, new)])
+
+    # --- API keys ---
+    def set_api_key(self, provider: str, api_key: str):
+        """Set API key for a specific provider."""
+        if provider not in self._defaults['api_keys']:
+            raise ValueError(f"Unknown provider: {provider}")
+        self.set(f'api_keys.{provider}', api_key)
+
+    def get_api_key(self, provider: str) -> str:
+        """Get API key for a specific provider."""
+        return self.get(f'api_keys.{provider}')
+
+    def get_all_api_keys(self) -> Dict[str, str]:
+        """Get all API keys."""
+        with self._lock:
+            return {provider: self._effective(f'api_keys.{provider}') for provider in self._defaults['api_keys']}
+
+    # --- Persistence ---
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self._config_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_file(self) -> Dict[str, Any]:
+        with open(self._config_file, 'r') as f:
+            loaded = json.load(f)
+        return loaded if isinstance(loaded, dict) else {}
+
     def _load_config(self):
         """Load configuration from file if it exists."""
-        if self._config_file.exists():
+        with self._lock:
+            self._file_signature = self._signature()
+            if self._file_signature is None:
+                return
             try:
-                with open(self._config_file, 'r') as f:
-                    loaded_config = json.load(f)
-                    self._config['api_keys'].update(
-                        loaded_config.get('api_keys', {}))
+                self._file = self._read_file()
             except Exception as e:
                 print(f"Error loading config: {e}")
 
+    def _schedule_save(self):
+        """Re-arms the debounced save. Must be called with the lock held."""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
     def _save_config(self):
-        """Save configuration to file."""
+        """Atomically writes the file layer (never environment values). Must be called with the lock held."""
         try:
             self._config_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self._config_file, 'w') as f:
-                json.dump(self._config, f, indent=4)
+            tmp_path = self._config_file.with_name(self._config_file.name + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self._file, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._config_file)
+            self._file_signature = self._signature()
+            self._dirty = False
+            self.saves += 1
         except Exception as e:
             print(f"Error saving config: {e}")
 
-    def set_api_key(self, provider: str, api_key: str):
-        """Set API key for a specific provider."""
-        if provider in self._config['api_keys']:
-            self._config['api_keys'][provider] = api_key
-            self._save_config()
-        else:
-            raise ValueError(f"Unknown provider: {provider}")
+    def flush(self):
+        """Writes pending changes now, if there are any."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._save_config()
 
-    def get_api_key(self, provider: str) -> str:
-        """Get API key for a specific provider."""
-        return self._config['api_keys'].get(provider)
+    def save(self):
+        """Writes the file layer now, whether or not it changed."""
+        with self._lock:
+            self._dirty = True
+        self.flush()
 
-    def get_all_api_keys(self) -> Dict[str, str]:
-        """Get all API keys."""
-        return self._config['api_keys'].copy()
+    # --- Hot reload ---
+    def on_change(self, callback: Callable[[str, Any, Any], None]) -> None:
+        """Registers callback(key, old, new), called after set() or a reload changes an effective value."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, changes: List[Tuple[str, Any, Any]]) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for key, old, new in changes:
+            for callback in listeners:
+                try:
+                    callback(key, old, new)
+                except Exception as e:
+                    print(f"Config change callback failed for {key}: {e}")
+
+    def reload(self) -> bool:
+        """Re-reads the file if it changed on disk. Unsaved in-memory changes win over the file."""
+        with self._lock:
+            signature = self._signature()
+            if signature == self._file_signature:
+                return False
+            try:
+                loaded = self._read_file() if signature is not None else {}
+            except Exception as e:
+                print(f"Error loading config: {e}")
+                return False
+            keys = self._keys()
+            before = {key: self._effective(key) for key in keys}
+            if self._dirty:
+                pending = self._file
+                self._file = loaded
+                self._merge(self._file, pending)
+            else:
+                self._file = loaded
+            self._file_signature = signature
+            self.reloads += 1
+            changes = [(key, before.get(key), self._effective(key)) for key in self._keys()]
+        self._notify([change for change in changes if change[1] != change[2]])
+        return True
+
+    @staticmethod
+    def _merge(target: Dict[str, Any], source: Dict[str, Any]) -> None:
+        for name, value in source.items():
+            if isinstance(value, dict) and isinstance(target.get(name), dict):
+                Config._merge(target[name], value)
+            else:
+                target[name] = copy.deepcopy(value)
+
+    def watch(self, interval: float = 2.0) -> None:
+        """Starts a daemon thread that hot-reloads the config file whenever it changes."""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watch_stop.clear()
+
+            def poll():
+                while not self._watch_stop.wait(interval):
+                    self.reload()
+
+            self._watcher = threading.Thread(target=poll, daemon=True, name="ConfigWatcher")
+            self._watcher.start()
+
+    def unwatch(self) -> None:
+        self._watch_stop.set()
 
 
 # Create a global config instance
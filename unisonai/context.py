@@ -0,0 +1,117 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+class AgentContext:
+    """
+    Execution state of one agent invocation: its own LLM instance (and so its own message
+    list and chat session), history offset, I/O executor and TaskRun. Nothing in a context
+    is shared with other invocations running at the same time.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.run = None
+        self.history_offset = 0  # messages of llm.messages already appended to the journal
+        self.history_lock = threading.Lock()
+
+
+class ContextPool:
+    """
+    Hands out AgentContexts to concurrent invocations of one agent definition.
+
+    At most `max_concurrency` contexts are leased at once; further callers wait (threads block,
+    coroutines poll on the event loop). Returned contexts are kept and reused, so their LLM
+    clients are not rebuilt on every call.
+    """
+
+    def __init__(self, factory: Callable[[], AgentContext], max_concurrency: int = 2):
+        self.factory = factory
+        self.max_concurrency = max(1, max_concurrency)
+        self._cond = threading.Condition()
+        self._idle: List[AgentContext] = []
+        self._active = 0
+        self._peak = 0
+        self._leases = 0
+        self._waits = 0
+        self._total_wait = 0.0
+
+    def _try_take(self) -> bool:
+        """Claims a slot if one is free. Must be called with the lock held."""
+        if self._active >= self.max_concurrency:
+            return False
+        self._active += 1
+        self._peak = max(self._peak, self._active)
+        return True
+
+    def _checkout(self, waited: float) -> AgentContext:
+        with self._cond:
+            self._leases += 1
+            if waited > 0:
+                self._waits += 1
+                self._total_wait += waited
+            context = self._idle.pop() if self._idle else None
+        if context is None:
+            try:
+                context = self.factory()
+            except BaseException:
+                self._checkin(None)
+                raise
+        return context
+
+    def _checkin(self, context: Optional[AgentContext]) -> None:
+        with self._cond:
+            self._active -= 1
+            if context is not None:
+                context.executor = None
+                self._idle.append(context)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        """Blocks until a slot is free, then yields a context for the duration of one invocation."""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while not self._try_take():
+                waited = True
+                self._cond.wait()
+        context = self._checkout(time.monotonic() - start if waited else 0.0)
+        try:
+            yield context
+        finally:
+            self._checkin(context)
+
+    @asynccontextmanager
+    async def alease(self):
+        """Async variant of `lease` that waits on the event loop instead of blocking a thread."""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                if self._try_take():
+                    break
+            waited = True
+            await asyncio.sleep(0.05)
+        context = self._checkout(time.monotonic() - start if waited else 0.0)
+        try:
+            yield context
+        finally:
+            self._checkin(context)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "idle": len(self._idle),
+                "peak": self._peak,
+                "leases": self._leases,
+                "waited": self._waits,
+                "total_wait": self._total_wait,
+            }
@@ -0,0 +1,356 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from colorama import Fore
+
+try:
+    import tiktoken
+except ImportError:  # optional: exact counts for OpenAI models
+    tiktoken = None
+
+# Average characters per token of each provider's tokenizer on mixed English prose and code.
+# Used whenever no exact tokenizer is available; close enough to keep a budget, not to bill.
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "xai": 4.0,
+    "groq": 3.8,
+    "mistral": 3.6,
+    "anthropic": 3.5,
+    "gemini": 4.0,
+    "cohere": 4.0,
+    "default": 4.0,
+}
+
+# Role/formatting tokens each provider adds around a message
+MESSAGE_OVERHEAD = 4
+
+# Wrapper module -> provider name (same names as the usage ledger)
+_MODULE_PROVIDERS = {
+    "genai": "gemini",
+    "openaillm": "openai",
+    "anthropicllm": "anthropic",
+    "groqllm": "groq",
+    "mixtral": "mistral",
+    "xai": "xai",
+    "coherellm": "cohere",
+}
+
+SUMMARY_HEADER = "Summary of the earlier conversation (older messages were trimmed to fit the context window):"
+
+
+def provider_of(llm) -> str:
+    """Provider name of an LLM wrapper instance ("default" for anything unknown)."""
+    return _MODULE_PROVIDERS.get(type(llm).__module__.rsplit(".", 1)[-1], "default")
+
+
+def _part_text(part: Any) -> str:
+    if isinstance(part, str):
+        return part
+    if isinstance(part, dict):
+        return part.get("text") or json.dumps(part, default=str)
+    return str(part)
+
+
+def message_text(message: Any) -> str:
+    """The text of a history message in any wrapper's format (content, message or parts)."""
+    if not isinstance(message, dict):
+        return str(message)
+    for key in ("content", "message"):
+        if key in message:
+            content = message[key]
+            break
+    else:
+        content = message.get("parts")
+    if isinstance(content, str):
+        text = content
+    elif isinstance(content, list):
+        text = "\n".join(_part_text(part) for part in content)
+    else:
+        text = "" if content is None else str(content)
+    if message.get("tool_calls"):
+        text += json.dumps(message["tool_calls"], default=str)
+    return text
+
+
+def _is_turn_start(message: Any) -> bool:
+    """True for a plain user message, the only safe place to start a trimmed history
+    (never between a tool call and its result, and never on an assistant message)."""
+    if not isinstance(message, dict) or str(message.get("role", "")).lower() != "user":
+        return False
+    if "parts" in message and "content" not in message:
+        parts = message["parts"]
+        return bool(parts) and all(isinstance(part, str) for part in parts)
+    return isinstance(message.get("content", message.get("message")), str)
+
+
+class TokenCounter:
+    """
+    Counts tokens the way one provider would. OpenAI models use tiktoken when it is
+    installed; every other provider (and OpenAI without tiktoken) uses an approximate
+    characters-per-token ratio, so counting works offline and without extra packages.
+    """
+
+    _shared: Dict[Tuple[str, Optional[str]], "TokenCounter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, provider: str = "default", model: Optional[str] = None):
+        self.provider = provider
+        self.model = model
+        self.chars_per_token = CHARS_PER_TOKEN.get(provider, CHARS_PER_TOKEN["default"])
+        self._encoding = None
+        if tiktoken is not None and provider == "openai":
+            try:
+                self._encoding = tiktoken.encoding_for_model(model or "")
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    @classmethod
+    def for_llm(cls, llm) -> "TokenCounter":
+        """Shared counter for the provider and model of `llm`."""
+        key = (provider_of(llm), getattr(llm, "model", None))
+        with cls._shared_lock:
+            counter = cls._shared.get(key)
+            if counter is None:
+                counter = cls._shared[key] = cls(*key)
+        return counter
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return max(1, round(len(text) / self.chars_per_token))
+
+    def count_message(self, message: Any) -> int:
+        return MESSAGE_OVERHEAD + self.count(message_text(message))
+
+    def count_messages(self, messages: List[Any]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+
+class TrimDecision:
+    """What one trim of an agent's history did, and why."""
+
+    def __init__(self, agent: Optional[str], provider: str, budget: int, before: int, after: int,
+                 dropped: List[Any], kept: int, summary: Optional[str], summary_tokens: int,
+                 summary_messages: int, summarizer: str, seconds: float):
+        self.agent = agent
+        self.provider = provider
+        self.budget = budget
+        self.before = before
+        self.after = after
+        self.dropped = dropped  # the messages removed from the head of the history
+        self.kept = kept
+        self.summary = summary
+        self.summary_tokens = summary_tokens
+        self.summary_messages = summary_messages  # messages inserted at the head to carry the summary
+        self.summarizer = summarizer
+        self.seconds = seconds
+        self.at = time.time()
+
+    @property
+    def over_budget(self) -> bool:
+        """True when even the pinned system prompt and latest turns did not fit."""
+        return self.after > self.budget
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "agent": self.agent,
+            "provider": self.provider,
+            "budget": self.budget,
+            "tokens_before": self.before,
+            "tokens_after": self.after,
+            "dropped_messages": len(self.dropped),
+            "kept_messages": self.kept,
+            "summarizer": self.summarizer,
+            "summary_tokens": self.summary_tokens,
+            "over_budget": self.over_budget,
+            "seconds": round(self.seconds, 4),
+        }
+
+    def describe(self) -> str:
+        text = (f"Context trimmed{f' for {self.agent}' if self.agent else ''}: ~{self.before} -> ~{self.after} tokens "
+                f"(budget {self.budget}); dropped {len(self.dropped)} messages, kept the latest {self.kept}, "
+                f"{self.summarizer} summary")
+        if self.over_budget:
+            text += "; the system prompt and latest turns alone exceed the budget"
+        return text
+
+
+class ContextWindow:
+    """
+    Keeps an agent's LLM history within a token budget.
+
+    max_tokens:     budget for the system prompt plus the history sent on every call (None disables)
+    keep_last:      latest messages that are always kept verbatim (extended back to a user turn)
+    summary_tokens: room reserved for the summary of the trimmed middle
+    summarizer:     None for a cheap extractive summary, an LLM wrapper (its run() is called
+                    without touching its history) or a callable taking the transcript text
+
+    The system prompt and the latest turns are pinned. When the total goes over budget, the
+    oldest messages are dropped, replaced by one summary exchange at the head of the history,
+    and the decision is printed (when verbose) and kept in `decisions`.
+    """
+
+    def __init__(self,
+                 max_tokens: Optional[int] = 32_000,
+                 keep_last: int = 6,
+                 summary_tokens: int = 512,
+                 summarizer: Union[Callable[[str], str], Any, None] = None,
+                 verbose: bool = True,
+                 max_decisions: int = 100):
+        self.max_tokens = max_tokens
+        self.keep_last = keep_last
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.verbose = verbose
+        self.decisions = deque(maxlen=max_decisions)
+        self._lock = threading.Lock()
+        self._counts: Dict[int, Tuple[Any, int]] = {}  # id(message) -> (message, tokens)
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    # --- Counting ---
+    def _count_message(self, counter: TokenCounter, message: Any) -> int:
+        with self._lock:
+            cached = self._counts.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        tokens = counter.count_message(message)
+        with self._lock:
+            if len(self._counts) > 10_000:
+                self._counts.clear()
+            self._counts[id(message)] = (message, tokens)
+        return tokens
+
+    def count(self, llm, system_prompt: Optional[str] = None) -> int:
+        """Estimated tokens of the system prompt and history `llm` would send."""
+        counter = TokenCounter.for_llm(llm)
+        system = system_prompt if system_prompt is not None else getattr(llm, "system_prompt", None)
+        return counter.count(system) + sum(self._count_message(counter, m) for m in llm.messages)
+
+    def needs_trim(self, llm, system_prompt: Optional[str] = None) -> bool:
+        return self.max_tokens is not None and self.count(llm, system_prompt) > self.max_tokens
+
+    # --- Summarizing ---
+    @staticmethod
+    def _transcript(messages: List[Any]) -> List[str]:
+        lines = []
+        for message in messages:
+            text = " ".join(message_text(message).split())
+            if text.startswith(SUMMARY_HEADER):
+                text = text[len(SUMMARY_HEADER):].strip()
+            if text:
+                role = message.get("role", "?") if isinstance(message, dict) else "?"
+                lines.append(f"{role}: {text}")
+        return lines
+
+    def _extractive(self, lines: List[str], counter: TokenCounter) -> str:
+        """Most recent lines first, each clipped, until summary_tokens is used up."""
+        room = self.summary_tokens
+        picked = []
+        for line in reversed(lines):
+            line = line if len(line) <= 300 else line[:297] + "..."
+            tokens = counter.count(line)
+            if tokens > room:
+                break
+            picked.append(line)
+            room -= tokens
+        omitted = len(lines) - len(picked)
+        head = [f"({omitted} older messages omitted)"] if omitted else []
+        return "\n".join(head + picked[::-1])
+
+    def _summarize(self, messages: List[Any], counter: TokenCounter) -> Tuple[str, str]:
+        """(summary, how it was made) for the trimmed messages; LLM summaries are cached."""
+        lines = self._transcript(messages)
+        if self.summarizer is None:
+            return self._extractive(lines, counter), "extractive"
+        transcript = "\n".join(lines)
+        key = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key], "cached"
+        instruction = (f"Summarize this conversation in at most {int(self.summary_tokens * 0.75)} words. "
+                       "Keep facts, decisions, open tasks and tool results that may still matter.\n\n")
+        try:
+            if callable(self.summarizer) and not hasattr(self.summarizer, "run"):
+                summary = self.summarizer(instruction + transcript)
+            else:
+                summary = self.summarizer.run(instruction + transcript, save_messages=False)
+        except Exception as e:
+            print(f"{Fore.RED}Context summary failed, falling back to an extractive one: {e}")
+            return self._extractive(lines, counter), "extractive"
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > 64:
+                self._summaries.popitem(last=False)
+        return summary, "llm"
+
+    @staticmethod
+    def _summary_exchange(llm, summary: str) -> List[Any]:
+        """A user/assistant message pair in the wrapper's own format, so roles keep alternating."""
+        history = llm.messages
+        llm.messages = []
+        try:
+            llm.add_message(llm.USER, f"{SUMMARY_HEADER}\n{summary}")
+            llm.add_message(getattr(llm, "ASSISTANT", None) or llm.MODEL, "Understood, I will continue from there.")
+            return llm.messages
+        finally:
+            llm.messages = history
+
+    # --- Trimming ---
+    def _cut(self, messages: List[Any], counter: TokenCounter, room: int) -> int:
+        """Index where the kept tail starts: at a user turn, at least keep_last back, as far back as fits."""
+        cut = max(0, len(messages) - self.keep_last)
+        while cut > 0 and not _is_turn_start(messages[cut]):
+            cut -= 1
+        tail = sum(self._count_message(counter, m) for m in messages[cut:])
+        while cut > 0:
+            start = cut - 1
+            while start > 0 and not _is_turn_start(messages[start]):
+                start -= 1
+            extra = sum(self._count_message(counter, m) for m in messages[start:cut])
+            if tail + extra > room:
+                break
+            tail += extra
+            cut = start
+        return cut
+
+    def fit(self, llm, system_prompt: Optional[str] = None, agent: Optional[str] = None) -> Optional[TrimDecision]:
+        """
+        Trims `llm.messages` in place (the list is replaced, not mutated) when the system prompt
+        plus history is over budget. Returns the TrimDecision, or None when nothing was trimmed.
+        """
+        if self.max_tokens is None:
+            return None
+        started = time.perf_counter()
+        counter = TokenCounter.for_llm(llm)
+        system = counter.count(system_prompt if system_prompt is not None else getattr(llm, "system_prompt", None))
+        messages = llm.messages
+        before = system + sum(self._count_message(counter, m) for m in messages)
+        if before <= self.max_tokens:
+            return None
+        cut = self._cut(messages, counter, self.max_tokens - system - self.summary_tokens)
+        if cut == 0:
+            decision = TrimDecision(agent, counter.provider, self.max_tokens, before, before, [], len(messages),
+                                    None, 0, 0, "no", time.perf_counter() - started)
+        else:
+            dropped, kept = messages[:cut], messages[cut:]
+            summary, how = self._summarize(dropped, counter)
+            head = self._summary_exchange(llm, summary)
+            llm.messages = head + kept
+            after = system + sum(self._count_message(counter, m) for m in llm.messages)
+            decision = TrimDecision(agent, counter.provider, self.max_tokens, before, after, dropped, len(kept),
+                                    summary, counter.count(summary), len(head), how, time.perf_counter() - started)
+        self.decisions.append(decision)
+        if self.verbose:
+            print(f"{Fore.LIGHTBLACK_EX}{decision.describe()}")
+        return decision
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class HistoryJournal:
+    """
+    Append-only JSONL journal of an agent's LLM messages (one message per line).
+
+    - sync() appends only the messages added since the last call instead of rewriting the file
+    - fsync is batched: every `fsync_every` appends or `fsync_interval` seconds, and on flush()
+    - once the file grows past `compact_bytes` it is atomically rewritten with the last
+      `keep_last` messages (temp file + fsync + os.replace)
+    - load(limit) reads only the tail of the file
+    - a torn last line from a crash is skipped on load and never glued to the next record
+    - append() lets several concurrent runs of one agent share the journal without
+      tracking a single in-memory list
+    """
+
+    def __init__(self,
+                 path: str,
+                 fsync_every: int = 20,
+                 fsync_interval: float = 2.0,
+                 compact_bytes: int = 4 * 1024 * 1024,
+                 keep_last: int = 500):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self.keep_last = keep_last
+        self._lock = threading.Lock()
+        self._file = None
+        self._written = 0  # messages of the in-memory list already in the journal
+        self._pending = 0  # appends since the last fsync
+        self._last_fsync = time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    # --- Reading ---
+    def _read_tail_lines(self, limit: Optional[int]) -> List[bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                if limit is None:
+                    return f.read().split(b"\n")
+                f.seek(0, os.SEEK_END)
+                pos = f.tell()
+                data = b""
+                while pos > 0 and data.count(b"\n") <= limit:
+                    step = min(64 * 1024, pos)
+                    pos -= step
+                    f.seek(pos)
+                    data = f.read(step) + data
+        except FileNotFoundError:
+            return []
+        lines = data.split(b"\n")
+        if pos > 0:
+            lines = lines[1:]  # the first line may start mid-record
+        return lines
+
+    def _read_tail(self, limit: Optional[int]) -> List[Dict[str, Any]]:
+        messages = []
+        for line in self._read_tail_lines(limit):
+            if not line.strip():
+                continue
+            try:
+                messages.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+        if limit is not None:
+            messages = messages[-limit:] if limit else []
+        return messages
+
+    def load(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns the last `limit` messages (all when None), skipping torn or corrupt lines."""
+        messages = self._read_tail(limit)
+        with self._lock:
+            self._written = len(messages)
+        return messages
+
+    # --- Writing ---
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            # Terminate a torn line left by a crash so the next record starts cleanly
+            if self._file.tell() > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._file.write(b"\n")
+        return self._file
+
+    def _fsync(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+
+    def _rewrite(self, messages: List[Dict[str, Any]]) -> None:
+        """Atomically replaces the journal with `messages`."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+
+    def sync(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Persists `messages`, the agent's full in-memory history. New messages are appended;
+        if the list shrank (reset or trimmed), the journal is rewritten to match it.
+        """
+        with self._lock:
+            if len(messages) < self._written:
+                self._rewrite(messages)
+                self._written = len(messages)
+                return
+            new = messages[self._written:]
+            if not new:
+                return
+            f = self._open()
+            f.write(b"".join(json.dumps(m, ensure_ascii=False).encode("utf-8") + b"\n" for m in new))
+            self._written = len(messages)
+            self._pending += len(new)
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._fsync()
+            else:
+                f.flush()
+            if f.tell() > self.compact_bytes:
+                self._rewrite(messages[-self.keep_last:])
+
+    def append(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Appends `messages` as-is. Unlike sync(), it keeps no per-list offset, so concurrent
+        runs of the same agent can each append their own new messages to one journal.
+        """
+        if not messages:
+            return
+        with self._lock:
+            f = self._open()
+            f.write(b"".join(json.dumps(m, ensure_ascii=False).encode("utf-8") + b"\n" for m in messages))
+            self._pending += len(messages)
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._fsync()
+            else:
+                f.flush()
+            if f.tell() > self.compact_bytes:
+                f.flush()
+                self._rewrite(self._read_tail(self.keep_last))
+
+    def flush(self) -> None:
+        """Forces buffered appends to disk."""
+        with self._lock:
+            if self._pending:
+                self._fsync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                if self._pending:
+                    self._fsync()
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def migrate_legacy(json_path: str, journal_path: str) -> None:
+        """Converts an old `<identity>.json` history into a journal once, if no journal exists yet."""
+        if os.path.exists(journal_path) or not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                messages = json.loads(f.read() or "[]")
+        except (OSError, json.JSONDecodeError):
+            return
+        journal = HistoryJournal(journal_path)
+        journal._rewrite(messages)
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
 
@@ -32,6 +33,13 @@ class BaseLLM(ABC):
         """
         pass
 
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """
+        Async variant of run(). Subclasses with a native async client should override this;
+        the default runs the blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self.run, prompt, save_messages)
+
     def reset(self) -> None:
         """Reset the conversation messages."""
         self.messages = []
\ No newline at end of file
@@ -1,9 +1,16 @@
-import anthropic
 import os
+import time
 from dotenv import load_dotenv
 from rich import print
-from typing import Type, Optional, List, Dict
+from typing import Type, Optional, List, Dict, Iterator, AsyncIterator
 from unisonai.config import config
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.response_cache import cached_completion, cached_tool_completion
+from unisonai.llms.resilience import resilient
+from unisonai.llms.context_cache import context_cache
+from unisonai.llms.streaming import Delta
+from unisonai.tools.schema import describe_calls
 
 load_dotenv()
 
@@ -13,6 +20,8 @@ class Anthropic:
     ASSISTANT = "assistant"
     SYSTEM = "system"
     MODEL = "model"
+    # Schema flavour for native function calling (see unisonai.tools.schema.compile_tools)
+    tool_format = "anthropic"
 
     def __init__(
             self,
@@ -55,15 +64,14 @@ class Anthropic:
         # Configure API key
         if api_key:
             config.set_api_key('anthropic', api_key)
-            self.client = anthropic.Anthropic(api_key=api_key)
+            self.client = clients.get("anthropic", api_key)
         else:
             stored_key = config.get_api_key('anthropic')
             if stored_key:
-                self.client = anthropic.Anthropic(api_key=stored_key)
+                self.client = clients.get("anthropic", stored_key)
             elif os.getenv("ANTHROPIC_API_KEY"):
                 config.set_api_key('anthropic', os.getenv("ANTHROPIC_API_KEY"))
-                self.client = anthropic.Anthropic(
-                    api_key=os.getenv("ANTHROPIC_API_KEY"))
+                self.client = clients.get("anthropic", os.getenv("ANTHROPIC_API_KEY"))
             else:
                 raise ValueError(
                     "No API key provided. Please provide an API key either through:\n"
@@ -79,10 +87,14 @@ class Anthropic:
         self.max_tokens = max_tokens
         self.connectors = connectors
         self.verbose = verbose
+        self._async_client = None
+        self._cache_handle = None  # set when the last streamed/tool request marked its prefix for caching
 
         if self.system_prompt is not None:
             self.add_message(self.SYSTEM, self.system_prompt)
 
+    @cached_completion("anthropic")
+    @resilient("anthropic")
     def run(self, prompt: str, save_messages: bool = True) -> str:
         if save_messages:
             self.add_message(self.USER, prompt)
@@ -104,16 +116,171 @@ class Anthropic:
         >>> llm.run("Hello, how are you?")
         "I'm doing well, thank you!"
         """
+        started = time.perf_counter()
         self.response = self.client.messages.create(
             model=self.model,
             messages=self.messages,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
         )
+        self._record_usage(self.response, self.response.content, started)
         if save_messages:
             self.add_message(self.MODEL, self.response.content)
         return self.response.content
 
+    @cached_completion("anthropic")
+    @resilient("anthropic")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """
+        Async variant of run() using the AsyncAnthropic client on the caller's event loop.
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to run
+
+        Returns
+        -------
+        str
+            The text of the response
+        """
+        self._async_client = clients.get("anthropic", self.client.api_key, asynchronous=True)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+        started = time.perf_counter()
+        self.response = await self._async_client.messages.create(
+            model=self.model,
+            messages=self.messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        text = "".join(getattr(block, "text", "") for block in self.response.content)
+        self._record_usage(self.response, text, started)
+        if save_messages:
+            self.add_message(self.MODEL, text)
+        return text
+
+    def _record_usage(self, response, completion, started: float, cache_handle=None) -> None:
+        """Reports one call to the usage ledger; tokens are estimated when the response has no usage."""
+        context_cache.served(cache_handle, response)
+        ledger.record("anthropic", self.model, response=response, prompt=self.messages,
+                      completion=completion, latency=time.perf_counter() - started)
+
+    def _chat_request(self, prompt: str, tools: list | None = None) -> dict:
+        # The Messages API takes the system prompt separately and only user/assistant turns
+        messages = [
+            {"role": self.ASSISTANT if m["role"] == self.MODEL else m["role"], "content": m["content"]}
+            for m in self.messages if m["role"] != self.SYSTEM
+        ]
+        messages.append({"role": self.USER, "content": prompt})
+        request = dict(model=self.model, messages=messages,
+                       temperature=self.temperature, max_tokens=self.max_tokens)
+        self._cache_handle = context_cache.handle("anthropic", self.model, self.system_prompt, tools)
+        if self._cache_handle is not None:
+            # The breakpoint on the system block caches the tool definitions and system prompt before it
+            request["system"] = [{"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}}]
+        elif self.system_prompt:
+            request["system"] = self.system_prompt
+        return request
+
+    def _tool_request(self, prompt: str, tools: list) -> dict:
+        return dict(self._chat_request(prompt, tools), tools=tools)
+
+    def _finish_stream(self, prompt: str, text: str, final, started: float, save_messages: bool) -> Delta:
+        self._record_usage(final, text, started, self._cache_handle)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+            self.add_message(self.ASSISTANT, text)
+        return Delta(Delta.END, text, final)
+
+    @resilient("anthropic")
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """
+        Stream the reply
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to run
+
+        Yields
+        ------
+        Delta
+            "text" pieces as they arrive, then one "end" Delta with the full reply
+            (see unisonai.llms.streaming). The history is saved once the stream completes.
+        """
+        started = time.perf_counter()
+        pieces = []
+        with self.client.messages.stream(**self._chat_request(prompt)) as events:
+            for text in events.text_stream:
+                pieces.append(text)
+                yield Delta(Delta.TEXT, text)
+            final = events.get_final_message()  # carries usage
+        yield self._finish_stream(prompt, "".join(pieces), final, started, save_messages)
+
+    @resilient("anthropic")
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """
+        Async variant of stream()
+        """
+        self._async_client = clients.get("anthropic", self.client.api_key, asynchronous=True)
+        started = time.perf_counter()
+        pieces = []
+        async with self._async_client.messages.stream(**self._chat_request(prompt)) as events:
+            async for text in events.text_stream:
+                pieces.append(text)
+                yield Delta(Delta.TEXT, text)
+            final = await events.get_final_message()
+        yield self._finish_stream(prompt, "".join(pieces), final, started, save_messages)
+
+    def _after_tools(self, prompt: str, save_messages: bool, started: float):
+        text, calls = [], []
+        for block in self.response.content:
+            if getattr(block, "type", None) == "tool_use":
+                calls.append((block.name, dict(block.input or {})))
+            elif getattr(block, "text", None):
+                text.append(block.text)
+        r = "".join(text)
+        self._record_usage(self.response, r, started, self._cache_handle)
+        if save_messages:
+            # Calls are stored as text so the history stays replayable without the tool definitions
+            self.add_message(self.USER, prompt)
+            self.add_message(self.ASSISTANT, r or describe_calls(calls))
+        return r, calls
+
+    @cached_tool_completion("anthropic")
+    @resilient("anthropic")
+    def run_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """
+        Run one turn with native tool definitions
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to run
+        tools : list
+            Anthropic tool definitions, as built by unisonai.tools.schema.compile_tools
+
+        Returns
+        -------
+        tuple
+            (text, calls) where calls is a list of (tool_name, input) tuples
+        """
+        started = time.perf_counter()
+        self.response = self.client.messages.create(**self._tool_request(prompt, tools))
+        return self._after_tools(prompt, save_messages, started)
+
+    @cached_tool_completion("anthropic")
+    @resilient("anthropic")
+    async def arun_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """
+        Async variant of run_tools()
+        """
+        self._async_client = clients.get("anthropic", self.client.api_key, asynchronous=True)
+        started = time.perf_counter()
+        self.response = await self._async_client.messages.create(**self._tool_request(prompt, tools))
+        return self._after_tools(prompt, save_messages, started)
+
     def add_message(self, role: str, content: str) -> None:
         """
         Add a message to the list of messages
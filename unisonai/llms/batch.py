@@ -0,0 +1,302 @@
+import copy
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from unisonai.llms.ratelimit import _Bucket
+from unisonai.llms.resilience import resilience
+from unisonai.context_window import provider_of
+
+# Per-provider (max in-flight calls, requests per minute) shared by every batch in the process.
+# Conservative free-tier numbers; raise them with batch_limits.set_limits() for paid keys.
+DEFAULT_PROVIDER_LIMITS: Dict[str, tuple] = {
+    "gemini": (4, 15),
+    "groq": (8, 30),
+    "openai": (16, 500),
+    "anthropic": (8, 50),
+    "mistral": (4, 60),
+    "cohere": (4, 20),
+    "xai": (8, 60),
+    "default": (8, 60),
+}
+
+
+class _Gate:
+    """Concurrency slots plus an RPM token bucket for one provider."""
+
+    def __init__(self, concurrency: int, rpm: Optional[float]):
+        self.concurrency = max(1, concurrency)
+        self.rpm = rpm
+        self.bucket = _Bucket(rpm, burst=self.concurrency) if rpm else None
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self.total_wait = 0.0
+
+    def delay(self, now: float) -> float:
+        """0 when a call may start now, -1 to wait for a free slot, else seconds until the RPM budget allows it."""
+        if self.active >= self.concurrency:
+            return -1
+        if self.bucket is not None:
+            return self.bucket.delay(1, now)
+        return 0.0
+
+    def take(self) -> None:
+        if self.bucket is not None:
+            self.bucket.take(1)
+        self.active += 1
+        self.calls += 1
+        self.peak = max(self.peak, self.active)
+
+
+class ProviderLimits:
+    """
+    Process-wide per-provider caps for batch calls: at most `concurrency` calls in flight and
+    `rpm` calls started per minute, however many batches run at once. Threads block on a
+    condition; coroutines poll on the event loop.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None):
+        self._cond = threading.Condition()
+        self._limits = dict(limits or DEFAULT_PROVIDER_LIMITS)
+        self._gates: Dict[str, _Gate] = {}
+
+    def set_limits(self, provider: str, concurrency: Optional[int] = None, rpm: Optional[float] = None) -> None:
+        """Changes a provider's caps; rpm=0 removes the RPM cap."""
+        default_concurrency, default_rpm = self._limits.get(provider, self._limits["default"])
+        with self._cond:
+            self._limits[provider] = (concurrency or default_concurrency, default_rpm if rpm is None else rpm)
+            gate = self._gates.pop(provider, None)
+            if gate is not None:
+                # Calls already in flight keep counting against the new gate
+                self._gate(provider).active = gate.active
+            self._cond.notify_all()
+
+    def _gate(self, provider: str) -> _Gate:
+        """Must be called with the lock held."""
+        gate = self._gates.get(provider)
+        if gate is None:
+            concurrency, rpm = self._limits.get(provider, self._limits["default"])
+            gate = self._gates[provider] = _Gate(concurrency, rpm)
+        return gate
+
+    def _release(self, provider: str) -> None:
+        with self._cond:
+            self._gate(provider).active -= 1
+            self._cond.notify_all()
+
+    def _granted(self, provider: str, waited: float) -> None:
+        """Must be called with the lock held."""
+        gate = self._gate(provider)
+        gate.take()
+        gate.total_wait += waited
+
+    @contextmanager
+    def acquire(self, provider: str):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                delay = self._gate(provider).delay(time.monotonic())
+                if delay == 0:
+                    break
+                self._cond.wait(timeout=None if delay < 0 else delay)
+            self._granted(provider, time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release(provider)
+
+    @asynccontextmanager
+    async def acquire_async(self, provider: str):
+        start = time.monotonic()
+        while True:
+            with self._cond:
+                delay = self._gate(provider).delay(time.monotonic())
+                if delay == 0:
+                    self._granted(provider, time.monotonic() - start)
+                    break
+            await asyncio.sleep(0.05 if delay < 0 else min(delay, 1.0))
+        try:
+            yield
+        finally:
+            self._release(provider)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            return {
+                provider: {
+                    "concurrency": gate.concurrency,
+                    "rpm": gate.rpm,
+                    "in_flight": gate.active,
+                    "peak": gate.peak,
+                    "calls": gate.calls,
+                    "avg_wait": gate.total_wait / gate.calls if gate.calls else 0.0,
+                }
+                for provider, gate in self._gates.items()
+            }
+
+
+# Shared by every batch in the process
+batch_limits = ProviderLimits()
+
+
+class BatchResult:
+    """Outcome of one prompt of a batch: `text` on success, `error` on failure."""
+
+    __slots__ = ("index", "prompt", "text", "error", "seconds", "attempts")
+
+    def __init__(self, index: int, prompt: str):
+        self.index = index
+        self.prompt = prompt
+        self.text: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.seconds = 0.0
+        self.attempts = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "ok": self.ok,
+            "text": self.text,
+            "error": None if self.error is None else f"{type(self.error).__name__}: {self.error}",
+            "seconds": round(self.seconds, 3),
+            "attempts": self.attempts,
+        }
+
+    def __repr__(self) -> str:
+        return f"BatchResult({self.index}, ok={self.ok})"
+
+
+class BatchReport(list):
+    """The BatchResults of a batch, in prompt order, with the batch's totals."""
+
+    def __init__(self, results: List[BatchResult], elapsed: float):
+        super().__init__(results)
+        self.elapsed = elapsed
+
+    @property
+    def texts(self) -> List[Optional[str]]:
+        """Replies in prompt order, None where the prompt failed."""
+        return [result.text for result in self]
+
+    @property
+    def failed(self) -> List[BatchResult]:
+        return [result for result in self if not result.ok]
+
+    @property
+    def throughput(self) -> float:
+        """Completed prompts per second."""
+        return sum(1 for result in self if result.ok) / self.elapsed if self.elapsed else 0.0
+
+    def raise_for_errors(self) -> None:
+        """Raises the first failure, if any, after the whole batch has run."""
+        if self.failed:
+            raise self.failed[0].error
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "prompts": len(self),
+            "ok": len(self) - len(self.failed),
+            "failed": len(self.failed),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "throughput": round(self.throughput, 2),
+        }
+
+
+ProgressCallback = Callable[[int, int, BatchResult], None]
+
+
+def _progress(on_progress: Optional[ProgressCallback], lock: threading.Lock, state: list, total: int,
+              result: BatchResult) -> None:
+    with lock:
+        state[0] += 1
+        done = state[0]
+    if on_progress is not None:
+        try:
+            on_progress(done, total, result)
+        except Exception as e:
+            print(f"Batch progress callback failed: {e}")
+
+
+def _isolated(llm):
+    """A shallow copy with its own history list, so concurrent calls never share a chat session."""
+    clone = copy.copy(llm)
+    clone.messages = list(getattr(llm, "messages", []))
+    return clone
+
+
+def run_batch(llm, prompts: Sequence[str], concurrency: int = 8, provider: Optional[str] = None,
+              retries: int = 0, on_progress: Optional[ProgressCallback] = None) -> BatchReport:
+    """
+    Runs independent prompts on `llm` concurrently and returns their results in prompt order.
+
+    Each prompt is a separate run(prompt, save_messages=False) call on a copy of `llm`: it sees
+    the LLM's system prompt and current history but adds nothing to it. At most `concurrency` prompts of this batch
+    are in flight, and all batches together stay within the provider's caps in `batch_limits`.
+    The wrappers already retry transient errors themselves (unisonai.llms.resilience); a prompt
+    that still fails is retried `retries` more times with the same jittered backoff and then
+    recorded in its BatchResult; the other prompts still run. on_progress(done, total, result) is called as each one finishes.
+    """
+    provider = provider or provider_of(llm)
+    results = [BatchResult(i, prompt) for i, prompt in enumerate(prompts)]
+    lock, state = threading.Lock(), [0]
+    started = time.perf_counter()
+
+    def execute(result: BatchResult) -> None:
+        for attempt in range(retries + 1):
+            result.attempts = attempt + 1
+            with batch_limits.acquire(provider):
+                call_started = time.perf_counter()
+                try:
+                    result.text, result.error = _isolated(llm).run(result.prompt, save_messages=False), None
+                except Exception as e:
+                    result.error = e
+                result.seconds = time.perf_counter() - call_started
+            if result.ok:
+                break
+            if attempt < retries:
+                time.sleep(resilience.policy.backoff(attempt, result.error))
+        _progress(on_progress, lock, state, len(results), result)
+
+    if results:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(results))),
+                                thread_name_prefix="LLMBatch") as executor:
+            list(executor.map(execute, results))
+    return BatchReport(results, time.perf_counter() - started)
+
+
+async def arun_batch(llm, prompts: Sequence[str], concurrency: int = 8, provider: Optional[str] = None,
+                     retries: int = 0, on_progress: Optional[ProgressCallback] = None) -> BatchReport:
+    """Async variant of run_batch() using llm.arun() on the caller's event loop."""
+    provider = provider or provider_of(llm)
+    results = [BatchResult(i, prompt) for i, prompt in enumerate(prompts)]
+    lock, state = threading.Lock(), [0]
+    slots = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+
+    async def execute(result: BatchResult) -> None:
+        async with slots:
+            for attempt in range(retries + 1):
+                result.attempts = attempt + 1
+                async with batch_limits.acquire_async(provider):
+                    call_started = time.perf_counter()
+                    try:
+                        result.text, result.error = await _isolated(llm).arun(result.prompt, save_messages=False), None
+                    except Exception as e:
+                        result.error = e
+                    result.seconds = time.perf_counter() - call_started
+                if result.ok:
+                    break
+                if attempt < retries:
+                    await asyncio.sleep(resilience.policy.backoff(attempt, result.error))
+        _progress(on_progress, lock, state, len(results), result)
+
+    await asyncio.gather(*(execute(result) for result in results))
+    return BatchReport(results, time.perf_counter() - started)
@@ -0,0 +1,407 @@
+import os
+import time
+import atexit
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import httpx  # installed with the openai/groq/anthropic/cohere SDKs
+except ImportError:
+    httpx = None
+
+# Endpoint of each provider, used as the pool key when the caller passes no base URL and for pre-warming
+DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "xai": "https://api.x.ai/v1",
+    "groq": "https://api.groq.com",
+    "anthropic": "https://api.anthropic.com",
+    "mistral": "https://api.mistral.ai",
+    "cohere": "https://api.cohere.com",
+    "google-genai": "https://generativelanguage.googleapis.com",
+}
+
+# Where each provider's API key lives (config name, environment variable), so prewarm() can
+# build the clients of configured providers before any wrapper has asked for them
+API_KEY_SOURCES = {
+    "openai": ("openai", "OPENAI_API_KEY"),
+    "xai": (None, "XAI_API_KEY"),
+    "groq": ("groq", "GROQ_API_KEY"),
+    "anthropic": ("anthropic", "ANTHROPIC_API_KEY"),
+    "mistral": ("mixtral", "MISTRAL_API_KEY"),
+    "cohere": ("cohere", "COHERE_API_KEY"),
+    "gemini": ("gemini", "GEMINI_API_KEY"),
+}
+
+
+def configured_key(provider: str) -> Optional[str]:
+    """The API key stored in the config (or environment) for `provider`, if any."""
+    name, env = API_KEY_SOURCES.get(provider, (None, None))
+    key = None
+    if name is not None:
+        try:
+            from unisonai.config import config
+            key = config.get_api_key(name)
+        except Exception:
+            key = None
+    return key or (os.getenv(env) if env else None)
+
+
+def _openai(api_key, base_url, http, asynchronous):
+    import openai
+    cls = openai.AsyncOpenAI if asynchronous else openai.OpenAI
+    return cls(api_key=api_key, base_url=base_url, **({"http_client": http} if http else {}))
+
+
+def _xai(api_key, base_url, http, asynchronous):
+    return _openai(api_key, base_url or DEFAULT_BASE_URLS["xai"], http, asynchronous)
+
+
+def _groq(api_key, base_url, http, asynchronous):
+    import groq
+    cls = groq.AsyncGroq if asynchronous else groq.Groq
+    return cls(api_key=api_key, base_url=base_url, **({"http_client": http} if http else {}))
+
+
+def _anthropic(api_key, base_url, http, asynchronous):
+    import anthropic
+    cls = anthropic.AsyncAnthropic if asynchronous else anthropic.Anthropic
+    return cls(api_key=api_key, base_url=base_url, **({"http_client": http} if http else {}))
+
+
+def _mistral(api_key, base_url, http, asynchronous):
+    from mistralai import Mistral
+    pool = {"async_client" if asynchronous else "client": http} if http else {}
+    return Mistral(api_key=api_key, server_url=base_url, **pool)
+
+
+def _cohere(api_key, base_url, http, asynchronous):
+    import cohere
+    cls = cohere.AsyncClient if asynchronous else cohere.Client
+    return cls(api_key=api_key, base_url=base_url, **({"httpx_client": http} if http else {}))
+
+
+def _google_genai(api_key, base_url, http, asynchronous):
+    from google import genai
+    client = genai.Client(api_key=api_key)  # one client serves both; async calls go through client.aio
+    return client.aio if asynchronous else client
+
+
+class _Pooled:
+    """One pooled SDK client and the keep-alive HTTP pool underneath it."""
+
+    def __init__(self, provider: str, base_url: str, asynchronous: bool, loop=None):
+        self.provider = provider
+        self.base_url = base_url
+        self.asynchronous = asynchronous
+        self.loop = loop
+        self.client = None
+        self.http = None
+        self.created = time.time()
+        self.hits = 0
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.warmed = False
+
+    def _event(self, name: str) -> None:
+        if name == "connection.connect_tcp.complete":
+            self.connections += 1
+        elif name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def hooks(self) -> Dict[str, list]:
+        """httpx event hooks that count requests and trace whether each one opened a new connection."""
+        if self.asynchronous:
+            async def trace(name, info):
+                self._event(name)
+
+            async def on_request(request):
+                self.requests += 1
+                request.extensions["trace"] = trace
+        else:
+            def trace(name, info):
+                self._event(name)
+
+            def on_request(request):
+                self.requests += 1
+                request.extensions["trace"] = trace
+        return {"request": [on_request]}
+
+    def as_dict(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.connections)
+        return {
+            "provider": self.provider,
+            "base_url": self.base_url,
+            "async": self.asynchronous,
+            "pooled_http": self.http is not None,
+            "client_reuses": self.hits,
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "connections_reused": reused,
+            "reuse_ratio": reused / self.requests if self.requests else 0.0,
+            "tls_handshakes": self.tls_handshakes,
+            "warmed": self.warmed,
+        }
+
+
+class ClientRegistry:
+    """
+    Process-wide pool of provider SDK clients.
+
+    - one client per (provider, API key, base URL), built on first use and handed out to every
+      wrapper, agent and tool afterwards, so keep-alive connections and TLS sessions survive
+      wrapper (re-)initialization
+    - clients get a shared httpx pool (`max_connections`, `max_keepalive`, `keepalive_expiry`)
+      whose requests are traced, so stats() can report how many reused a warm connection
+    - async clients are pooled per event loop, since their connections belong to the loop;
+      aclose() closes the running loop's pools and close() (also run at exit) every pool
+    - prewarm() builds the clients of the providers with a configured API key and opens their
+      connections in the background before the first call
+    - google.generativeai is configured once per key and its GenerativeModel templates are
+      shared, instead of reconfiguring the SDK (which drops its channel) in every module
+
+    Factories for other providers can be added with register().
+    """
+
+    def __init__(self,
+                 max_connections: int = 20,
+                 max_keepalive: int = 10,
+                 keepalive_expiry: float = 120.0,
+                 max_models: int = 32):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.max_models = max_models
+        self._lock = threading.Lock()
+        self._factories: Dict[str, Callable] = {
+            "openai": _openai,
+            "xai": _xai,
+            "groq": _groq,
+            "anthropic": _anthropic,
+            "mistral": _mistral,
+            "cohere": _cohere,
+            "google-genai": _google_genai,
+        }
+        self._pool: Dict[Tuple, _Pooled] = {}
+        self._gemini_key: Optional[str] = None
+        self._gemini_models: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.gemini_configures = 0
+        self.gemini_model_hits = 0
+        self.gemini_model_misses = 0
+
+    def register(self, provider: str, factory: Callable) -> None:
+        """factory(api_key, base_url, http_client_or_None, asynchronous) -> SDK client."""
+        self._factories[provider] = factory
+
+    @staticmethod
+    def _fingerprint(api_key: Optional[str]) -> str:
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+    def _http(self, entry: _Pooled):
+        if httpx is None or entry.provider == "google-genai":
+            return None
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_keepalive,
+                              keepalive_expiry=self.keepalive_expiry)
+        cls = httpx.AsyncClient if entry.asynchronous else httpx.Client
+        return cls(limits=limits, timeout=httpx.Timeout(600.0, connect=10.0), follow_redirects=True,
+                   event_hooks=entry.hooks())
+
+    def _drop_closed_loops(self) -> None:
+        """Must be called with the lock held. A closed loop's connections died with it; nothing is left to close."""
+        for key in [k for k, e in self._pool.items() if e.loop is not None and e.loop.is_closed()]:
+            del self._pool[key]
+
+    def get(self, provider: str, api_key: Optional[str], base_url: Optional[str] = None, asynchronous: bool = False):
+        """The pooled client for (provider, api_key, base_url); async clients are per running loop."""
+        url = base_url or DEFAULT_BASE_URLS.get(provider)
+        loop = None
+        if asynchronous:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        key = (provider, self._fingerprint(api_key), url, asynchronous, id(loop) if loop else None)
+        with self._lock:
+            entry = self._pool.get(key)
+            if entry is not None and entry.client is not None:
+                entry.hits += 1
+                return entry.client
+            if asynchronous:
+                self._drop_closed_loops()
+            factory = self._factories.get(provider)
+            if factory is None:
+                raise ValueError(f"No client factory registered for provider '{provider}'")
+            entry = _Pooled(provider, url, asynchronous, loop)
+            entry.http = self._http(entry)
+            entry.client = factory(api_key, base_url, entry.http, asynchronous)
+            self._pool[key] = entry
+            return entry.client
+
+    # --- google.generativeai ---
+    def configure_gemini(self, api_key: str) -> None:
+        """Configures google.generativeai only when the key changes (reconfiguring drops its channel)."""
+        with self._lock:
+            if api_key == self._gemini_key:
+                return
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self._gemini_key = api_key
+            self._gemini_models.clear()
+            self.gemini_configures += 1
+
+    def gemini_model(self, model: str, system_prompt: Optional[str] = None,
+                     generation_config: Optional[Dict[str, Any]] = None, safety_settings: Any = None):
+        """
+        A shared GenerativeModel. These are stateless request templates, so identical
+        configurations are built once and handed out to every caller.
+        """
+        key = (model, system_prompt, repr(sorted((generation_config or {}).items())), repr(safety_settings))
+        with self._lock:
+            client = self._gemini_models.get(key)
+            if client is not None:
+                self._gemini_models.move_to_end(key)
+                self.gemini_model_hits += 1
+                return client
+        import google.generativeai as genai
+        client = genai.GenerativeModel(
+            model_name=model,
+            system_instruction=system_prompt or None,
+            safety_settings=safety_settings,
+            generation_config=generation_config,
+        )
+        with self._lock:
+            self.gemini_model_misses += 1
+            self._gemini_models[key] = client
+            while len(self._gemini_models) > self.max_models:
+                self._gemini_models.popitem(last=False)
+        return client
+
+    # --- Warm-up ---
+    def _warm(self, entry: _Pooled) -> None:
+        try:
+            if entry.http is not None and not entry.asynchronous:
+                entry.http.head(entry.base_url)  # any status will do: the connection stays in the pool
+                entry.warmed = True
+        except Exception as e:
+            print(f"Pre-warming {entry.provider} ({entry.base_url}) failed: {e}")
+
+    def _warm_gemini(self) -> None:
+        try:
+            import google.generativeai as genai
+            with self._lock:
+                names = [key[0] for key in self._gemini_models]
+            genai.get_model(f"models/{names[-1] if names else 'gemini-2.0-flash'}")
+        except Exception as e:
+            print(f"Pre-warming gemini failed: {e}")
+
+    def _build_configured(self, wanted: Optional[set]) -> None:
+        """Builds the sync client of every provider with a configured API key (clients are otherwise lazy)."""
+        for provider in API_KEY_SOURCES:
+            if wanted is not None and provider not in wanted:
+                continue
+            api_key = configured_key(provider)
+            if not api_key:
+                continue
+            try:
+                if provider == "gemini":
+                    self.configure_gemini(api_key)
+                else:
+                    self.get(provider, api_key)
+            except ImportError:
+                pass  # SDK not installed: that provider is not in use
+            except Exception as e:
+                print(f"Pre-warming {provider} failed: {e}")
+
+    def prewarm(self, providers: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Builds the clients of the providers that have an API key configured, then opens a
+        connection to every pooled endpoint (limited to `providers` when given) and the
+        google.generativeai channel. Runs on a daemon thread unless background=False;
+        failures are printed and otherwise ignored.
+        """
+        wanted = set(providers) if providers is not None else None
+
+        def warm():
+            self._build_configured(wanted)
+            with self._lock:
+                entries = [e for e in self._pool.values() if wanted is None or e.provider in wanted]
+                gemini = self._gemini_key is not None and (wanted is None or "gemini" in wanted)
+            for entry in entries:
+                self._warm(entry)
+            if gemini:
+                self._warm_gemini()
+
+        if not background:
+            warm()
+            return None
+        thread = threading.Thread(target=warm, daemon=True, name="ClientPrewarm")
+        thread.start()
+        return thread
+
+    # --- Reporting ---
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = [e.as_dict() for e in self._pool.values()]
+            gemini = {
+                "configures": self.gemini_configures,
+                "model_reuses": self.gemini_model_hits,
+                "models_built": self.gemini_model_misses,
+            }
+        requests = sum(e["requests"] for e in entries)
+        reused = sum(e["connections_reused"] for e in entries)
+        return {
+            "clients": len(entries),
+            "client_reuses": sum(e["client_reuses"] for e in entries),
+            "requests": requests,
+            "connections_opened": sum(e["connections_opened"] for e in entries),
+            "connections_reused": reused,
+            "reuse_ratio": reused / requests if requests else 0.0,
+            "gemini": gemini,
+            "pools": entries,
+        }
+
+    async def aclose(self) -> None:
+        """Closes the async HTTP pools of the running event loop; call it before the loop ends."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = [e for e in self._pool.values() if e.loop is loop]
+            for key in [k for k, e in self._pool.items() if e.loop is loop]:
+                del self._pool[key]
+        for entry in entries:
+            if entry.http is not None:
+                await entry.http.aclose()
+
+    @staticmethod
+    def _close_async(entry: _Pooled, timeout: float = 5.0) -> None:
+        loop = entry.loop
+        if entry.http is None or loop is None or loop.is_closed():
+            return
+        try:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(entry.http.aclose(), loop).result(timeout)
+            else:
+                loop.run_until_complete(entry.http.aclose())
+        except Exception as e:
+            print(f"Closing {entry.provider} async client failed: {e}")
+
+    def close(self) -> None:
+        """Closes every HTTP pool (async ones on their own loop, if it is still open) and forgets every client."""
+        with self._lock:
+            entries = list(self._pool.values())
+            self._pool.clear()
+        for entry in entries:
+            if entry.http is None:
+                continue
+            if entry.asynchronous:
+                self._close_async(entry)
+            else:
+                entry.http.close()
+
+
+# Shared by every wrapper, agent and tool in the process
+clients = ClientRegistry()
+atexit.register(clients.close)
@@ -1,9 +1,14 @@
-import cohere
 import os
+import time
 from dotenv import load_dotenv
 from rich import print
-from typing import Type, Optional, List, Dict
+from typing import Type, Optional, List, Dict, Iterator, AsyncIterator
 from unisonai.config import config
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.response_cache import cached_completion
+from unisonai.llms.resilience import resilient
+from unisonai.llms.streaming import Delta, collect, acollect
 
 load_dotenv()
 
@@ -54,15 +59,14 @@ class Cohere:
         # Configure API key
         if api_key:
             config.set_api_key('cohere', api_key)
-            self.client = cohere.Client(api_key=api_key)
+            self.api_key = api_key
         else:
             stored_key = config.get_api_key('cohere')
             if stored_key:
-                self.client = cohere.Client(api_key=stored_key)
+                self.api_key = stored_key
             elif os.getenv("COHERE_API_KEY"):
                 config.set_api_key('cohere', os.getenv("COHERE_API_KEY"))
-                self.client = cohere.Client(
-                    api_key=os.getenv("COHERE_API_KEY"))
+                self.api_key = os.getenv("COHERE_API_KEY")
             else:
                 raise ValueError(
                     "No API key provided. Please provide an API key either through:\n"
@@ -71,6 +75,8 @@ class Cohere:
                     "3. COHERE_API_KEY environment variable"
                 )
 
+        self.client = clients.get("cohere", self.api_key)
+        self._async_client = None
         self.messages = messages
         self.model = model
         self.temperature = temperature
@@ -82,9 +88,9 @@ class Cohere:
         if self.system_prompt != None:
             self.add_message(self.SYSTEM, self.system_prompt)
 
+    @cached_completion("cohere")
+    @resilient("cohere")
     def run(self, prompt: str, save_messages: bool = True) -> str:
-        if save_messages:
-            self.add_message(self.USER, prompt)
         """
         Run the LLM
 
@@ -103,7 +109,28 @@ class Cohere:
         >>> llm.run("Hello, how are you?")
         "I'm doing well, thank you!"
         """
-        self.stream = self.client.chat_stream(
+        return collect(self.stream(prompt, save_messages), echo=self.verbose)
+
+    @cached_completion("cohere")
+    @resilient("cohere")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """
+        Async variant of run() streaming through cohere.AsyncClient on the caller's event loop.
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to run
+
+        Returns
+        -------
+        str
+            The response
+        """
+        return await acollect(self.astream(prompt, save_messages), echo=self.verbose)
+
+    def _stream_request(self, prompt: str) -> dict:
+        return dict(
             model=self.model,
             message=prompt,
             temperature=self.temperature,
@@ -112,15 +139,62 @@ class Cohere:
             preamble=self.system_prompt,
             max_tokens=self.max_tokens,
         )
+
+    def _finish_stream(self, prompt: str, response: str, final, started: float, save_messages: bool) -> Delta:
+        self._record_usage(final, response, started)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+            self.add_message(self.MODEL, response)
+        return Delta(Delta.END, response, final)
+
+    @resilient("cohere")
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """
+        Stream the reply
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to run
+
+        Yields
+        ------
+        Delta
+            "text" pieces as they arrive, then one "end" Delta with the full reply
+            (see unisonai.llms.streaming). The history is saved once the stream completes.
+        """
+        started = time.perf_counter()
         response: str = ""
-        for event in self.stream:
+        final = None
+        for event in self.client.chat_stream(**self._stream_request(prompt)):
             if event.event_type == "text-generation":
-                if self.verbose:
-                    print(event.text, end='')
                 response += event.text
-        if save_messages:
-            self.add_message(self.MODEL, response)
-        return response
+                yield Delta(Delta.TEXT, event.text)
+            elif event.event_type == "stream-end":
+                final = getattr(event, "response", None)  # carries meta.billed_units
+        yield self._finish_stream(prompt, response, final, started, save_messages)
+
+    @resilient("cohere")
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """
+        Async variant of stream() using cohere.AsyncClient on the caller's event loop.
+        """
+        self._async_client = clients.get("cohere", self.api_key, asynchronous=True)
+        started = time.perf_counter()
+        response: str = ""
+        final = None
+        async for event in self._async_client.chat_stream(**self._stream_request(prompt)):
+            if event.event_type == "text-generation":
+                response += event.text
+                yield Delta(Delta.TEXT, event.text)
+            elif event.event_type == "stream-end":
+                final = getattr(event, "response", None)
+        yield self._finish_stream(prompt, response, final, started, save_messages)
+
+    def _record_usage(self, response, completion, started: float) -> None:
+        """Reports one call to the usage ledger; tokens are estimated when the response has no usage."""
+        ledger.record("cohere", self.model, response=response, prompt=self.messages,
+                      completion=completion, latency=time.perf_counter() - started)
 
     def add_message(self, role: str, content: str) -> None:
         """
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import atexit
+import asyncio
+import hashlib
+import datetime
+import threading
+from typing import Any, Dict, Optional
+
+from unisonai.llms.ratelimit import estimate_tokens
+from unisonai.llms.usage import extract_usage, extract_cached_tokens
+
+
+class CacheHandle:
+    """A static prompt prefix registered with a provider, referenced by `name` in later calls."""
+
+    __slots__ = ("provider", "model", "key", "name", "tokens", "created", "expires", "uses", "resource", "models")
+
+    def __init__(self, provider: str, model: str, key: str, name: str, tokens: int, expires: float, resource: Any = None):
+        self.provider = provider
+        self.model = model
+        self.key = key
+        self.name = name
+        self.tokens = tokens
+        self.created = time.time()
+        self.expires = expires
+        self.uses = 0
+        self.resource = resource  # the provider's own object (e.g. google.generativeai CachedContent)
+        self.models: Dict[str, Any] = {}  # provider model objects bound to this cache, per generation config
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "name": self.name,
+            "tokens": self.tokens,
+            "uses": self.uses,
+            "expires_in": round(self.expires - time.time(), 1),
+        }
+
+
+class GeminiCacheBackend:
+    """Explicit context caching through google.generativeai's CachedContent."""
+
+    def create(self, model: str, system_prompt: str, tools: Any, ttl: float):
+        from google.generativeai import caching
+        cache = caching.CachedContent.create(
+            model=model if model.startswith("models/") else f"models/{model}",
+            system_instruction=system_prompt,
+            tools=tools,
+            ttl=datetime.timedelta(seconds=ttl),
+        )
+        tokens = getattr(getattr(cache, "usage_metadata", None), "total_token_count", None)
+        return cache.name, tokens, cache
+
+    def refresh(self, handle: CacheHandle, ttl: float) -> None:
+        handle.resource.update(ttl=datetime.timedelta(seconds=ttl))
+
+    def delete(self, handle: CacheHandle) -> None:
+        handle.resource.delete()
+
+    def model(self, handle: CacheHandle, generation_config: Optional[Dict[str, Any]] = None, safety_settings: Any = None):
+        """A GenerativeModel that sends only the conversation and references the cached prefix."""
+        key = repr((sorted((generation_config or {}).items()), safety_settings))
+        model = handle.models.get(key)
+        if model is None:
+            import google.generativeai as genai
+            model = handle.models[key] = genai.GenerativeModel.from_cached_content(
+                cached_content=handle.resource, generation_config=generation_config, safety_settings=safety_settings)
+        return model
+
+
+class AnthropicCacheBackend:
+    """
+    Anthropic prompt caching. The prefix is registered implicitly by the first request that
+    marks it with cache_control and stays warm for 5 minutes after each use, so there is
+    nothing to create, refresh or delete; the handle only tells the wrapper to mark it.
+    """
+
+    ttl = 300.0
+
+    def create(self, model: str, system_prompt: str, tools: Any, ttl: float):
+        return "ephemeral", None, None
+
+    def refresh(self, handle: CacheHandle, ttl: float) -> None:
+        pass
+
+    def delete(self, handle: CacheHandle) -> None:
+        pass
+
+
+class ContextCache:
+    """
+    Opt-in provider-side caching of large static prompt prefixes (system prompt + tool schemas).
+
+    - handle() returns a CacheHandle for a prefix once it has been seen `min_uses` times and is
+      at least `min_tokens` long; the prefix is registered with the provider once, kept alive by
+      refreshing it when a call comes within `refresh_before` seconds of its `ttl` expiring,
+      and later calls reference it instead of resending it
+    - providers without a backend, small or one-off prefixes and failed registrations get None
+      and the caller sends the full prompt as before; the reason is counted in stats()
+    - handles whose cache the provider no longer has are dropped by expired(); the call
+      that noticed retries without it
+    - tokens served from cache are counted per provider; the usage ledger also records the
+      cached tokens every provider reports (including OpenAI's automatic prefix caching)
+    - registered caches are deleted at interpreter exit, since providers bill their storage
+
+    Disabled until enable() is called or UNISONAI_CONTEXT_CACHE=1 is set.
+    """
+
+    def __init__(self, ttl: float = 600.0, refresh_before: float = 60.0, min_tokens: int = 1024,
+                 min_uses: int = 2, retry_after: float = 600.0, enabled: bool = False):
+        self.ttl = ttl
+        self.refresh_before = refresh_before
+        self.min_tokens = min_tokens
+        self.min_uses = min_uses
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._backends: Dict[str, Any] = {
+            "gemini": GeminiCacheBackend(),
+            "anthropic": AnthropicCacheBackend(),
+        }
+        self._handles: Dict[str, CacheHandle] = {}
+        self._seen: Dict[str, int] = {}
+        self._failed: Dict[str, float] = {}
+        self.registrations = 0
+        self.refreshes = 0
+        self.expirations = 0
+        self.cached_calls = 0
+        self.cached_tokens: Dict[str, int] = {}
+        self.fallbacks: Dict[str, int] = {}
+        atexit.register(self.close)
+
+    def enable(self, **settings) -> None:
+        """Turns caching on; keyword arguments override ttl, min_tokens, min_uses, ..."""
+        for name, value in settings.items():
+            if not hasattr(self, name) or name.startswith("_"):
+                raise ValueError(f"Unknown context cache setting: {name}")
+            setattr(self, name, value)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def register_backend(self, provider: str, backend: Any) -> None:
+        """backend.create(model, system_prompt, tools, ttl) -> (name, tokens or None, resource); refresh(); delete()."""
+        self._backends[provider] = backend
+
+    @staticmethod
+    def make_key(provider: str, model: str, system_prompt: str, tools: Any = None) -> str:
+        payload = json.dumps([provider, model, system_prompt, tools], sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _fallback(self, reason: str) -> None:
+        with self._lock:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def handle(self, provider: str, model: str, system_prompt: Optional[str], tools: Any = None) -> Optional[CacheHandle]:
+        """The live cache handle for this prefix, registering or refreshing it as needed; None to send it in full."""
+        if not self.enabled or not system_prompt:
+            return None
+        backend = self._backends.get(provider)
+        if backend is None:
+            self._fallback("unsupported")
+            return None
+        tokens = estimate_tokens(system_prompt) + (estimate_tokens(json.dumps(tools, default=repr)) if tools else 0)
+        if tokens < self.min_tokens:
+            self._fallback("too_small")
+            return None
+        key = self.make_key(provider, model, system_prompt, tools)
+        now = time.time()
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                if now < self._failed.get(key, 0.0):
+                    self.fallbacks["failed"] = self.fallbacks.get("failed", 0) + 1
+                    return None
+                self._seen[key] = self._seen.get(key, 0) + 1
+                if self._seen[key] < self.min_uses:
+                    self.fallbacks["warming"] = self.fallbacks.get("warming", 0) + 1
+                    return None
+            elif handle.expires - now > self.refresh_before:
+                handle.uses += 1
+                return handle
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have registered or refreshed it while we waited
+            with self._lock:
+                handle = self._handles.get(key)
+            ttl = getattr(backend, "ttl", self.ttl)
+            try:
+                if handle is not None and handle.expires - time.time() <= self.refresh_before:
+                    try:
+                        backend.refresh(handle, ttl)
+                        handle.expires = time.time() + ttl
+                        with self._lock:
+                            self.refreshes += 1
+                    except Exception as e:
+                        if not self.is_cache_miss(e):
+                            raise
+                        # Already gone on the provider side: register it again
+                        with self._lock:
+                            self._handles.pop(key, None)
+                            self.expirations += 1
+                        handle = None
+                if handle is None:
+                    name, reported, resource = backend.create(model, system_prompt, tools, ttl)
+                    handle = CacheHandle(provider, model, key, name, reported or tokens, time.time() + ttl, resource)
+                    with self._lock:
+                        self._handles[key] = handle
+                        self._seen.pop(key, None)
+                        self.registrations += 1
+            except Exception as e:
+                print(f"Context cache for {provider}:{model} unavailable, sending the full prompt: {e}")
+                with self._lock:
+                    self._handles.pop(key, None)
+                    self._failed[key] = time.time() + self.retry_after
+                    self.fallbacks["failed"] = self.fallbacks.get("failed", 0) + 1
+                return None
+        handle.uses += 1
+        return handle
+
+    async def ahandle(self, provider: str, model: str, system_prompt: Optional[str], tools: Any = None) -> Optional[CacheHandle]:
+        """handle() for async callers: registering or refreshing a cache is a blocking provider call, run in a thread."""
+        if not self.enabled or not system_prompt:
+            return None
+        return await asyncio.to_thread(self.handle, provider, model, system_prompt, tools)
+
+    def served(self, handle: Optional[CacheHandle], response: Any = None) -> None:
+        """Counts a call made through `handle`, with the cached tokens the response reports (else the prefix size)."""
+        if handle is None:
+            return
+        tokens = extract_cached_tokens(response) if extract_usage(response) is not None else handle.tokens
+        with self._lock:
+            self.cached_calls += 1
+            self.cached_tokens[handle.provider] = self.cached_tokens.get(handle.provider, 0) + tokens
+
+    @staticmethod
+    def is_cache_miss(error: BaseException) -> bool:
+        """True when a provider rejected a call because the referenced cache no longer exists."""
+        text = str(error).lower()
+        return "cache" in text and any(word in text for word in ("not found", "expired", "does not exist", "404"))
+
+    def expired(self, handle: Optional[CacheHandle], error: BaseException) -> bool:
+        """Drops `handle` if `error` says its cache is gone. True means: retry the call without it."""
+        if handle is None or not self.is_cache_miss(error):
+            return False
+        with self._lock:
+            if self._handles.get(handle.key) is handle:
+                del self._handles[handle.key]
+                self.expirations += 1
+        return True
+
+    def gemini_generate(self, fallback_model, model: str, system_prompt: str, contents: Any, tools: Any = None,
+                        generation_config: Optional[Dict[str, Any]] = None, safety_settings: Any = None):
+        """
+        generate_content for direct Gemini call sites: through the cached system prompt and
+        tools when there is a handle, else (or if the cache is gone) on `fallback_model`.
+        """
+        handle = self.handle("gemini", model, system_prompt, tools)
+        if handle is not None:
+            try:
+                response = self._backends["gemini"].model(handle, generation_config, safety_settings).generate_content(contents)
+                self.served(handle, response)
+                return response
+            except Exception as e:
+                if not self.expired(handle, e):
+                    raise
+        return fallback_model.generate_content(contents, tools=tools) if tools else fallback_model.generate_content(contents)
+
+    def model_for(self, handle: CacheHandle, generation_config: Optional[Dict[str, Any]] = None, safety_settings: Any = None):
+        """The provider model object bound to `handle` (backends that have one, e.g. Gemini)."""
+        return self._backends[handle.provider].model(handle, generation_config, safety_settings)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "registrations": self.registrations,
+                "refreshes": self.refreshes,
+                "expirations": self.expirations,
+                "cached_calls": self.cached_calls,
+                "cached_tokens": dict(self.cached_tokens),
+                "fallbacks": dict(self.fallbacks),
+                "handles": [handle.as_dict() for handle in self._handles.values()],
+            }
+
+    def close(self) -> None:
+        """Deletes every registered cache from its provider."""
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for handle in handles:
+            try:
+                self._backends[handle.provider].delete(handle)
+            except Exception as e:
+                print(f"Could not delete context cache {handle.name}: {e}")
+
+
+# Shared by every wrapper and direct SDK call site in the process
+context_cache = ContextCache(enabled=os.getenv("UNISONAI_CONTEXT_CACHE", "").lower() in ("1", "true", "yes"))
@@ -1,16 +1,43 @@
 import os
+import time
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Iterator, AsyncIterator
 import google.generativeai as genaii
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from unisonai.config import config
+from unisonai.llms.ratelimit import limiter, estimate_tokens, Priority
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.response_cache import cached_completion, cached_tool_completion
+from unisonai.llms.resilience import resilient
+from unisonai.llms.context_cache import context_cache
+from unisonai.llms.streaming import Delta
+from unisonai.tools.schema import to_plain, describe_calls
 
 load_dotenv()
 
 
+def _generation_config(temperature: float, max_tokens: int) -> dict:
+    return {
+        "temperature": temperature,
+        "max_output_tokens": max_tokens,
+        "response_mime_type": "text/plain",
+    }
+
+
+def _get_model(model: str, system_prompt: str | None, temperature: float, max_tokens: int,
+               safety_settings: list) -> "genaii.GenerativeModel":
+    """Shared GenerativeModel for this configuration (see ClientRegistry.gemini_model)."""
+    return clients.gemini_model(model, system_prompt, _generation_config(temperature, max_tokens), safety_settings)
+
+
 class Gemini:
     USER = "user"
     MODEL = "model"
+    # Limiter priority class; set to Priority.BACKGROUND on instances nobody waits on
+    priority = Priority.INTERACTIVE
+    # Schema flavour for native function calling (see unisonai.tools.schema.compile_tools)
+    tool_format = "gemini"
 
     def __init__(self,
                  messages: list[dict[str, str]] = [],
@@ -51,7 +78,7 @@ class Gemini:
                     "3. GEMINI_API_KEY environment variable"
                 )
 
-        genaii.configure(api_key=os.environ["GOOGLE_API_KEY"])
+        clients.configure_gemini(os.environ["GOOGLE_API_KEY"])
 
         self.messages = messages
         self.model = model
@@ -60,39 +87,243 @@ class Gemini:
         self.max_tokens = max_tokens
         self.connectors = connectors
         self.verbose = verbose
-        self.client = genaii.GenerativeModel(
-            model_name=self.model,
-            safety_settings=self.safety_settings,
-            generation_config={
-                "temperature": self.temperature,
-                "max_output_tokens": self.max_tokens,
-                "response_mime_type": "text/plain",
-            }
-        )
-        if self.system_prompt:
-            self.client = genaii.GenerativeModel(
-                model_name=self.model,
-                system_instruction=system_prompt,
-                safety_settings=safety_settings,
-                generation_config={
-                    "temperature": self.temperature,
-                    "max_output_tokens": self.max_tokens,
-                    "response_mime_type": "text/plain",
-                }
-            )
+        self.client = _get_model(self.model, self.system_prompt, self.temperature,
+                                 self.max_tokens, self.safety_settings)
+        self.chat_session = None
+        self._session_source = None  # the messages list the live session mirrors
+        self._session_len = 0
+        self._cache_handle = None  # context cache the last request referenced (see unisonai.llms.context_cache)
 
-    def run(self, prompt: str, save_messages: bool = True) -> str:
+    def _model_for(self, tools: list | None = None):
+        """
+        The model to send through: one bound to the context-cached system prompt (and tools)
+        when context caching is on and the prefix qualifies, else self.client.
+        """
+        return self._bound_model(context_cache.handle("gemini", self.model, self.system_prompt, tools))
+
+    async def _amodel_for(self, tools: list | None = None):
+        """Async variant of _model_for(); registering or refreshing the cache happens off the event loop."""
+        return self._bound_model(await context_cache.ahandle("gemini", self.model, self.system_prompt, tools))
+
+    def _bound_model(self, handle):
+        self._cache_handle = handle
+        if handle is None:
+            return self.client
+        return context_cache.model_for(handle, _generation_config(self.temperature, self.max_tokens),
+                                       self.safety_settings)
+
+    def _session(self, model=None):
+        """
+        Returns the live chat session, rebuilding it only when the model changed or
+        self.messages no longer matches what the session has seen.
+        """
+        model = model or self._model_for()
+        if (self.chat_session is None
+                or self.chat_session.model is not model
+                or self._session_source is not self.messages
+                or self._session_len != len(self.messages)):
+            self.chat_session = model.start_chat(history=self.messages)
+            self._session_source = self.messages
+            self._session_len = len(self.messages)
+        return self.chat_session
+
+    async def _asession(self):
+        return self._session(await self._amodel_for())
+
+    def _send(self, session, prompt: str, **kwargs):
+        """session.send_message, resending the full system prompt if the provider dropped its cache."""
+        try:
+            return session.send_message(prompt, **kwargs)
+        except Exception as e:
+            if not context_cache.expired(self._cache_handle, e):
+                raise
+        return self._session().send_message(prompt, **kwargs)
+
+    async def _asend(self, session, prompt: str, **kwargs):
+        try:
+            return await session.send_message_async(prompt, **kwargs)
+        except Exception as e:
+            if not context_cache.expired(self._cache_handle, e):
+                raise
+        return await (await self._asession()).send_message_async(prompt, **kwargs)
+
+    def _after_send(self, prompt: str, r: str, save_messages: bool) -> None:
         if save_messages:
             self.add_message(self.USER, prompt)
-        self.chat_session = self.client.start_chat(history=self.messages)
-        response = self.chat_session.send_message(prompt)
-        r = response.text
-        if save_messages:
             self.add_message(self.MODEL, r)
+            self._session_len = len(self.messages)
+        else:
+            # Keep the live session in step with self.messages by dropping the unsaved turn
+            self.chat_session.rewind()
+
+    @cached_completion("gemini")
+    @resilient("gemini")
+    def run(self, prompt: str, save_messages: bool = True) -> str:
+        session = self._session()
+        with limiter.acquire(self.model, tokens=self._reserved_tokens(), priority=self.priority) as lease:
+            started = time.perf_counter()
+            response = self._send(session, prompt)
+            self._commit_usage(lease, response, prompt, started)
+        r = response.text
+        self._after_send(prompt, r, save_messages)
         if self.verbose:
             print(r)
         return r
 
+    @cached_completion("gemini")
+    @resilient("gemini")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """Async variant of run() that awaits the SDK on the caller's event loop."""
+        session = await self._asession()
+        async with limiter.acquire_async(self.model, tokens=self._reserved_tokens(), priority=self.priority) as lease:
+            started = time.perf_counter()
+            response = await self._asend(session, prompt)
+            self._commit_usage(lease, response, prompt, started)
+        r = response.text
+        self._after_send(prompt, r, save_messages)
+        if self.verbose:
+            print(r)
+        return r
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        try:
+            return chunk.text
+        except ValueError:  # a chunk without text parts (e.g. only a finish reason)
+            return ""
+
+    @resilient("gemini")
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """
+        Streams the reply as Deltas (see unisonai.llms.streaming) through the live chat session.
+        The history is saved once the stream completes; a stream abandoned midway drops the
+        session so it is rebuilt from self.messages on the next call.
+        """
+        session = self._session()
+        finished = False
+        try:
+            with limiter.acquire(self.model, tokens=self._reserved_tokens(), priority=self.priority) as lease:
+                started = time.perf_counter()
+                response = self._send(session, prompt, stream=True)
+                pieces = []
+                for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        pieces.append(text)
+                        yield Delta(Delta.TEXT, text)
+                self._commit_usage(lease, response, prompt, started)
+            r = "".join(pieces)
+            self._after_send(prompt, r, save_messages)
+            finished = True
+            yield Delta(Delta.END, r, response)
+        finally:
+            if not finished:
+                self.chat_session = None
+
+    @resilient("gemini")
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """Async variant of stream() that awaits the SDK on the caller's event loop."""
+        session = await self._asession()
+        finished = False
+        try:
+            async with limiter.acquire_async(self.model, tokens=self._reserved_tokens(), priority=self.priority) as lease:
+                started = time.perf_counter()
+                response = await self._asend(session, prompt, stream=True)
+                pieces = []
+                async for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        pieces.append(text)
+                        yield Delta(Delta.TEXT, text)
+                self._commit_usage(lease, response, prompt, started)
+            r = "".join(pieces)
+            self._after_send(prompt, r, save_messages)
+            finished = True
+            yield Delta(Delta.END, r, response)
+        finally:
+            if not finished:
+                self.chat_session = None
+
+    def _tool_contents(self, prompt: str) -> list:
+        return list(self.messages) + [{"role": self.USER, "parts": [prompt]}]
+
+    def _generate(self, contents: list, tools: list):
+        """generate_content with the tool declarations, referencing them from the context cache when cached."""
+        model = self._model_for(tools)
+        if self._cache_handle is not None:
+            try:
+                return model.generate_content(contents)
+            except Exception as e:
+                if not context_cache.expired(self._cache_handle, e):
+                    raise
+                self._cache_handle = None
+        return self.client.generate_content(contents, tools=tools)
+
+    async def _agenerate(self, contents: list, tools: list):
+        model = await self._amodel_for(tools)
+        if self._cache_handle is not None:
+            try:
+                return await model.generate_content_async(contents)
+            except Exception as e:
+                if not context_cache.expired(self._cache_handle, e):
+                    raise
+                self._cache_handle = None
+        return await self.client.generate_content_async(contents, tools=tools)
+
+    def _after_tools(self, prompt: str, response, save_messages: bool):
+        text, calls = [], []
+        candidates = getattr(response, "candidates", None) or []
+        for part in (candidates[0].content.parts if candidates else []):
+            function_call = getattr(part, "function_call", None)
+            if function_call is not None and function_call.name:
+                calls.append((function_call.name, to_plain(function_call.args)))
+            elif getattr(part, "text", None):
+                text.append(part.text)
+        r = "".join(text)
+        if save_messages:
+            # Calls are stored as text so the history stays replayable without the tool declarations
+            self.add_message(self.USER, prompt)
+            self.add_message(self.MODEL, r or describe_calls(calls))
+        if self.verbose:
+            print(r or describe_calls(calls))
+        return r, calls
+
+    @cached_tool_completion("gemini")
+    @resilient("gemini")
+    def run_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """
+        Runs one turn with native function declarations (built by compile_tools).
+        Returns (text, calls) where calls is a list of (function_name, args) tuples.
+        """
+        with limiter.acquire(self.model, tokens=self._reserved_tokens(), priority=self.priority) as lease:
+            started = time.perf_counter()
+            response = self._generate(self._tool_contents(prompt), tools)
+            self._commit_usage(lease, response, prompt, started)
+        return self._after_tools(prompt, response, save_messages)
+
+    @cached_tool_completion("gemini")
+    @resilient("gemini")
+    async def arun_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """Async variant of run_tools()."""
+        async with limiter.acquire_async(self.model, tokens=self._reserved_tokens(), priority=self.priority) as lease:
+            started = time.perf_counter()
+            response = await self._agenerate(self._tool_contents(prompt), tools)
+            self._commit_usage(lease, response, prompt, started)
+        return self._after_tools(prompt, response, save_messages)
+
+    def _reserved_tokens(self) -> int:
+        return estimate_tokens(self.system_prompt) + estimate_tokens(self.messages) + self.max_tokens
+
+    def _commit_usage(self, lease, response, prompt: str, started: float) -> None:
+        """Settles the limiter reservation and records the call in the usage ledger."""
+        latency = time.perf_counter() - started
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and getattr(usage, "total_token_count", None):
+            lease.commit(usage.total_token_count)
+        context_cache.served(self._cache_handle, response)
+        ledger.record("gemini", self.model, response=response,
+                      prompt=[self.system_prompt, self.messages, prompt], latency=latency)
+
     def add_message(self, role: str, content: str) -> None:
         # Adjusting message structure for Gemini
         self.messages.append({"role": role, "parts": [content]})
@@ -106,6 +337,7 @@ class Gemini:
             raise TypeError("Invalid argument type")
 
     def __setitem__(self, index, value) -> None:
+        self.chat_session = None  # history edited in place; rebuild the session on next run
         if isinstance(index, slice):
             self.messages[index] = value
         elif isinstance(index, int):
@@ -123,15 +355,8 @@ class Gemini:
         """
         self.messages = []
         self.system_prompt = None
-        self.client = genaii.GenerativeModel(
-            model_name=self.model,
-            safety_settings=self.safety_settings,
-            generation_config={
-                "temperature": self.temperature,
-                "max_output_tokens": self.max_tokens,
-                "response_mime_type": "text/plain",
-            }
-        )
+        self.client = _get_model(self.model, None, self.temperature, self.max_tokens, self.safety_settings)
+        self.chat_session = None
 
 
 if __name__ == "__main__":
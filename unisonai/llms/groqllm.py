@@ -1,7 +1,14 @@
 from dotenv import load_dotenv
-from groq import Groq
 import os
+import time
+from typing import Iterator, AsyncIterator
 from unisonai.config import config
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.response_cache import cached_completion, cached_tool_completion
+from unisonai.llms.resilience import resilient
+from unisonai.llms.streaming import Delta, collect, openai_deltas, aopenai_deltas
+from unisonai.tools.schema import parse_openai_tool_calls, describe_calls
 
 load_dotenv()
 
@@ -10,6 +17,8 @@ class GroqLLM:
     USER = "user"
     ASSISTANT = "assistant"
     SYSTEM = "system"
+    # Schema flavour for native function calling (see unisonai.tools.schema.compile_tools)
+    tool_format = "openai"
     MODEL = "model"
 
     def __init__(self,
@@ -25,14 +34,14 @@ class GroqLLM:
         # Configure API key
         if api_key:
             config.set_api_key('groq', api_key)
-            self.client = Groq(api_key=api_key)
+            self.client = clients.get("groq", api_key)
         else:
             stored_key = config.get_api_key('groq')
             if stored_key:
-                self.client = Groq(api_key=stored_key)
+                self.client = clients.get("groq", stored_key)
             elif os.getenv("GROQ_API_KEY"):
                 config.set_api_key('groq', os.getenv("GROQ_API_KEY"))
-                self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+                self.client = clients.get("groq", os.getenv("GROQ_API_KEY"))
             else:
                 raise ValueError(
                     "No API key provided. Please provide an API key either through:\n"
@@ -48,30 +57,129 @@ class GroqLLM:
         self.max_tokens = max_tokens
         self.connectors = connectors
         self.verbose = verbose
+        self._async_client = None
         if self.system_prompt is not None:
             self.add_message(self.SYSTEM, self.system_prompt)
 
+    @cached_completion("groq")
+    @resilient("groq")
     def run(self, prompt: str, save_messages: bool = True) -> str:
+        return collect(self.stream(prompt, save_messages), echo=self.verbose)
+
+    @cached_completion("groq")
+    @resilient("groq")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """Async variant of run() using the AsyncGroq client on the caller's event loop."""
+        self._async_client = clients.get("groq", self.client.api_key, asynchronous=True)
         if save_messages:
             self.add_message(self.USER, prompt)
-        self.stream = self.client.chat.completions.create(
+        started = time.perf_counter()
+        response = await self._async_client.chat.completions.create(
             model=self.model,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             messages=self.messages,
-            stream=True,
-            stop=None
+            stream=False,
         )
-        r = ""
-        for chunk in self.stream:
-            if chunk.choices[0].delta.content:
-                r += chunk.choices[0].delta.content
-            if self.verbose:
-                print(chunk.choices[0].delta.content or "", end="")
+        r = response.choices[0].message.content or ""
+        self._record_usage(response, r, started)
+        if self.verbose:
+            print(r)
         if save_messages:
             self.add_message(self.ASSISTANT, r)
         return r
 
+    def _stream_request(self, prompt: str) -> dict:
+        return dict(
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            messages=self.messages + [{"role": self.USER, "content": prompt}],
+            stream=True,
+            stop=None
+        )
+
+    def _finish_stream(self, prompt: str, delta: Delta, started: float, save_messages: bool) -> None:
+        # Groq reports usage on the final chunk under x_groq
+        self._record_usage(delta.response, delta.text, started)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+            self.add_message(self.ASSISTANT, delta.text)
+
+    @resilient("groq")
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """Streams the reply as Deltas (see unisonai.llms.streaming); history is saved once it completes."""
+        started = time.perf_counter()
+        chunks = self.client.chat.completions.create(**self._stream_request(prompt))
+        for delta in openai_deltas(chunks):
+            if delta.kind == Delta.END:
+                self._finish_stream(prompt, delta, started, save_messages)
+            yield delta
+
+    @resilient("groq")
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """Async variant of stream()."""
+        self._async_client = clients.get("groq", self.client.api_key, asynchronous=True)
+        started = time.perf_counter()
+        chunks = await self._async_client.chat.completions.create(**self._stream_request(prompt))
+        async for delta in aopenai_deltas(chunks):
+            if delta.kind == Delta.END:
+                self._finish_stream(prompt, delta, started, save_messages)
+            yield delta
+
+    def _record_usage(self, response, completion, started: float) -> None:
+        """Reports one call to the usage ledger; tokens are estimated when the response has no usage."""
+        ledger.record("groq", self.model, response=response, prompt=self.messages,
+                      completion=completion, latency=time.perf_counter() - started)
+
+    def _tool_messages(self, prompt: str) -> list:
+        return self.messages + [{"role": self.USER, "content": prompt}]
+
+    def _after_tools(self, prompt: str, message, save_messages: bool):
+        r = message.content or ""
+        calls = parse_openai_tool_calls(message)
+        if save_messages:
+            # Calls are stored as text so the history stays replayable without the tool definitions
+            self.add_message(self.USER, prompt)
+            self.add_message(self.ASSISTANT, r or describe_calls(calls))
+        if self.verbose:
+            print(r or describe_calls(calls))
+        return r, calls
+
+    @cached_tool_completion("groq")
+    @resilient("groq")
+    def run_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """
+        Runs one turn with native tool definitions (built by compile_tools).
+        Returns (text, calls) where calls is a list of (function_name, args) tuples.
+        """
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._tool_messages(prompt),
+            tools=tools,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        self._record_usage(response, response.choices[0].message.content, started)
+        return self._after_tools(prompt, response.choices[0].message, save_messages)
+
+    @cached_tool_completion("groq")
+    @resilient("groq")
+    async def arun_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """Async variant of run_tools()."""
+        self._async_client = clients.get("groq", self.client.api_key, asynchronous=True)
+        started = time.perf_counter()
+        response = await self._async_client.chat.completions.create(
+            model=self.model,
+            messages=self._tool_messages(prompt),
+            tools=tools,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        self._record_usage(response, response.choices[0].message.content, started)
+        return self._after_tools(prompt, response.choices[0].message, save_messages)
+
     def add_message(self, role: str, content: str) -> None:
         self.messages.append({"role": role, "content": content})
 
@@ -1,10 +1,15 @@
 import os
-from mistralai import Mistral
+import time
 from dotenv import load_dotenv
 from rich import print
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator, AsyncIterator
 import requests
 from unisonai.config import config
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.response_cache import cached_completion
+from unisonai.llms.resilience import resilient
+from unisonai.llms.streaming import Delta, openai_deltas, aopenai_deltas
 
 load_dotenv()
 
@@ -44,7 +49,7 @@ class Mixtral:
                     "3. MISTRAL_API_KEY environment variable"
                 )
 
-        self.client = Mistral(api_key=self.api_key)
+        self.client = clients.get("mistral", self.api_key)
         self.messages = messages
         self.model = model
         self.temperature = temperature
@@ -56,11 +61,14 @@ class Mixtral:
         if self.system_prompt is not None:
             self.add_message(self.SYSTEM, self.system_prompt)
 
+    @cached_completion("mistral")
+    @resilient("mistral")
     def run(self, prompt: str, save_messages: bool = True) -> str:
         if save_messages:
             self.add_message(self.USER, prompt)
 
         response_content = ""
+        started = time.perf_counter()
         response = self.client.chat.complete(
             model=self.model,
             messages=self.messages,
@@ -70,6 +78,7 @@ class Mixtral:
         )
 
         response_content = response.choices[0].message.content
+        self._record_usage(response, response_content, started)
         # print(response_content)
 
         if save_messages:
@@ -77,6 +86,69 @@ class Mixtral:
 
         return response_content
 
+    @cached_completion("mistral")
+    @resilient("mistral")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """Async variant of run() using the Mistral SDK's native async endpoint."""
+        if save_messages:
+            self.add_message(self.USER, prompt)
+
+        started = time.perf_counter()
+        response = await self.client.chat.complete_async(
+            model=self.model,
+            messages=self.messages,
+            temperature=self.temperature,
+            stream=False,
+            max_tokens=self.max_tokens,
+        )
+        response_content = response.choices[0].message.content
+        self._record_usage(response, response_content, started)
+
+        if save_messages:
+            self.add_message(self.MODEL, response_content)
+
+        return response_content
+
+    def _stream_request(self, prompt: str) -> dict:
+        return dict(
+            model=self.model,
+            messages=self.messages + [{"role": self.USER, "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+
+    def _finish_stream(self, prompt: str, delta: Delta, started: float, save_messages: bool) -> None:
+        self._record_usage(delta.response, delta.text, started)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+            self.add_message(self.MODEL, delta.text)
+
+    @resilient("mistral")
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """Streams the reply as Deltas (see unisonai.llms.streaming); history is saved once it completes."""
+        started = time.perf_counter()
+        events = self.client.chat.stream(**self._stream_request(prompt))
+        # Each Mistral stream event wraps an OpenAI-shaped chunk in .data
+        for delta in openai_deltas(event.data for event in events):
+            if delta.kind == Delta.END:
+                self._finish_stream(prompt, delta, started, save_messages)
+            yield delta
+
+    @resilient("mistral")
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """Async variant of stream() using the Mistral SDK's native async endpoint."""
+        started = time.perf_counter()
+        events = await self.client.chat.stream_async(**self._stream_request(prompt))
+        async for delta in aopenai_deltas(event.data async for event in events):
+            if delta.kind == Delta.END:
+                self._finish_stream(prompt, delta, started, save_messages)
+            yield delta
+
+    def _record_usage(self, response, completion, started: float) -> None:
+        """Reports one call to the usage ledger; tokens are estimated when the response has no usage."""
+        ledger.record("mistral", self.model, response=response, prompt=self.messages,
+                      completion=completion, latency=time.perf_counter() - started)
+
     def add_message(self, role: str, content: str) -> None:
         self.messages.append({"role": role, "content": content})
 
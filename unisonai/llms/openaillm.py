@@ -1,10 +1,16 @@
-from openai import OpenAI as OpenAIClient
 import os
+import time
 from dotenv import load_dotenv
 from rich import print
-from typing import Type, Optional, List, Dict
+from typing import Type, Optional, List, Dict, Iterator, AsyncIterator
 import openai
 from unisonai.config import config
+from unisonai.llms.usage import ledger
+from unisonai.llms.clients import clients
+from unisonai.llms.response_cache import cached_completion, cached_tool_completion
+from unisonai.llms.resilience import resilient
+from unisonai.llms.streaming import Delta, openai_deltas, aopenai_deltas
+from unisonai.tools.schema import parse_openai_tool_calls, describe_calls
 
 load_dotenv()
 
@@ -12,6 +18,8 @@ load_dotenv()
 class Openai:
     USER = "user"
     MODEL = "model"
+    # Schema flavour for native function calling (see unisonai.tools.schema.compile_tools)
+    tool_format = "openai"
 
     def __init__(self,
                  messages: list[dict[str, str]] = [],
@@ -42,7 +50,7 @@ class Openai:
                     "3. OPENAI_API_KEY environment variable"
                 )
 
-        self.client = OpenAIClient(api_key=openai.api_key)
+        self.client = clients.get("openai", openai.api_key)
         self.messages = messages
         self.model = model
         self.temperature = temperature
@@ -50,29 +58,145 @@ class Openai:
         self.max_tokens = max_tokens
         self.connectors = connectors
         self.verbose = verbose
+        self._async_client = None
 
         if self.system_prompt is not None:
             self.add_message(self.USER, self.system_prompt)
 
+    @cached_completion("openai")
+    @resilient("openai")
     def run(self, prompt: str, save_messages: bool = True) -> str:
         if save_messages:
             self.add_message(self.USER, prompt)
-        response_content = ""
-        self.stream = self.client.chat.completions.create(
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(
             model=self.model,
             messages=self.messages,
             stream=False,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
         )
-        for chunk in self.stream:
-            if chunk.choices[0].delta.content is not None:
-                response_content += chunk.choices[0].delta.content
-                print(chunk.choices[0].delta.content, end="")
+        response_content = response.choices[0].message.content or ""
+        self._record_usage(response, response_content, started)
+        if self.verbose:
+            print(response_content)
         if save_messages:
             self.add_message(self.MODEL, response_content)
         return response_content
 
+    @cached_completion("openai")
+    @resilient("openai")
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        """Async variant of run() using the AsyncOpenAI client on the caller's event loop."""
+        self._async_client = clients.get("openai", self.client.api_key, asynchronous=True)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+        started = time.perf_counter()
+        response = await self._async_client.chat.completions.create(
+            model=self.model,
+            messages=self.messages,
+            stream=False,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        response_content = response.choices[0].message.content or ""
+        self._record_usage(response, response_content, started)
+        if self.verbose:
+            print(response_content)
+        if save_messages:
+            self.add_message(self.MODEL, response_content)
+        return response_content
+
+    def _stream_request(self, prompt: str) -> dict:
+        return dict(
+            model=self.model,
+            messages=self.messages + [{"role": self.USER, "content": prompt}],
+            stream=True,
+            stream_options={"include_usage": True},
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+
+    def _finish_stream(self, prompt: str, delta: Delta, started: float, save_messages: bool) -> None:
+        self._record_usage(delta.response, delta.text, started)
+        if save_messages:
+            self.add_message(self.USER, prompt)
+            self.add_message(self.MODEL, delta.text)
+
+    @resilient("openai")
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """Streams the reply as Deltas (see unisonai.llms.streaming); history is saved once it completes."""
+        started = time.perf_counter()
+        chunks = self.client.chat.completions.create(**self._stream_request(prompt))
+        for delta in openai_deltas(chunks):
+            if delta.kind == Delta.END:
+                self._finish_stream(prompt, delta, started, save_messages)
+            yield delta
+
+    @resilient("openai")
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """Async variant of stream()."""
+        self._async_client = clients.get("openai", self.client.api_key, asynchronous=True)
+        started = time.perf_counter()
+        chunks = await self._async_client.chat.completions.create(**self._stream_request(prompt))
+        async for delta in aopenai_deltas(chunks):
+            if delta.kind == Delta.END:
+                self._finish_stream(prompt, delta, started, save_messages)
+            yield delta
+
+    def _record_usage(self, response, completion, started: float) -> None:
+        """Reports one call to the usage ledger; tokens are estimated when the response has no usage."""
+        ledger.record("openai", self.model, response=response, prompt=self.messages,
+                      completion=completion, latency=time.perf_counter() - started)
+
+    def _tool_messages(self, prompt: str) -> list:
+        return self.messages + [{"role": self.USER, "content": prompt}]
+
+    def _after_tools(self, prompt: str, message, save_messages: bool):
+        r = message.content or ""
+        calls = parse_openai_tool_calls(message)
+        if save_messages:
+            # Calls are stored as text so the history stays replayable without the tool definitions
+            self.add_message(self.USER, prompt)
+            self.add_message(self.MODEL, r or describe_calls(calls))
+        if self.verbose:
+            print(r or describe_calls(calls))
+        return r, calls
+
+    @cached_tool_completion("openai")
+    @resilient("openai")
+    def run_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """
+        Runs one turn with native tool definitions (built by compile_tools).
+        Returns (text, calls) where calls is a list of (function_name, args) tuples.
+        """
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._tool_messages(prompt),
+            tools=tools,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        self._record_usage(response, response.choices[0].message.content, started)
+        return self._after_tools(prompt, response.choices[0].message, save_messages)
+
+    @cached_tool_completion("openai")
+    @resilient("openai")
+    async def arun_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """Async variant of run_tools()."""
+        self._async_client = clients.get("openai", self.client.api_key, asynchronous=True)
+        started = time.perf_counter()
+        response = await self._async_client.chat.completions.create(
+            model=self.model,
+            messages=self._tool_messages(prompt),
+            tools=tools,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        self._record_usage(response, response.choices[0].message.content, started)
+        return self._after_tools(prompt, response.choices[0].message, save_messages)
+
     def add_message(self, role: str, content: str) -> None:
         self.messages.append({"role": role, "content": content})
 
@@ -98,7 +222,7 @@ class Openai:
 
 
 if __name__ == "__main__":
-    llm = OpenAIClient(model="gpt-3.5-turbo")
+    llm = Openai(model="gpt-3.5-turbo")
     llm.add_message("User", "Hello, how are you?")
     llm.add_message("Chatbot", "I'm doing well, thank you!")
     print(llm.run("Say this is a test"))
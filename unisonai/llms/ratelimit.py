@@ -0,0 +1,243 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Optional
+
+
+class Priority:
+    """Priority classes for queued LLM calls. Lower values are served first."""
+    INTERACTIVE = 0  # A live user turn (brain, agents answering the user)
+    BACKGROUND = 1   # Summaries, planning and other work nobody is waiting on
+
+
+# Per-model (rpm, tpm) budgets. Unknown models fall back to DEFAULT_BUDGET.
+DEFAULT_BUDGETS: Dict[str, tuple] = {
+    "gemini-2.5-flash-lite": (15, 250_000),
+    "gemini-2.5-flash": (10, 250_000),
+    "gemini-2.0-flash": (15, 1_000_000),
+    "gemini-1.5-flash-latest": (15, 250_000),
+}
+DEFAULT_BUDGET = (15, 250_000)
+
+
+def estimate_tokens(text) -> int:
+    """Cheap offline token estimate (~4 characters per token) used to reserve TPM budget."""
+    if not text:
+        return 0
+    return max(1, len(str(text)) // 4)
+
+
+class _Bucket:
+    """Token bucket holding up to `burst` units that refills at `rate_per_minute / 60` per second."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None):
+        self.capacity = float(burst if burst is not None else rate_per_minute)
+        self.refill_rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_rate
+
+    def take(self, amount: float) -> None:
+        # May go negative when a lease reports more tokens than it reserved
+        self.level -= amount
+
+
+class _ModelBudget:
+    def __init__(self, rpm: float, tpm: float, burst: Optional[float] = None):
+        self.requests = _Bucket(rpm, burst)
+        self.tokens = _Bucket(tpm)
+
+    def delay(self, tokens: int, now: float) -> float:
+        return max(self.requests.delay(1, now), self.tokens.delay(tokens, now))
+
+
+class Lease:
+    """Handed out by RateLimiter.acquire; lets the caller report the real token usage."""
+
+    def __init__(self, limiter: "RateLimiter", model: str, tokens: int, waited: float):
+        self.limiter = limiter
+        self.model = model
+        self.tokens = tokens
+        self.waited = waited
+
+    def commit(self, actual_tokens: int) -> None:
+        """Debits (or refunds) the difference between the reserved and the actual token count."""
+        self.limiter._adjust_tokens(self.model, actual_tokens - self.tokens)
+        self.tokens = actual_tokens
+
+
+class RateLimiter:
+    """
+    Process-wide token-bucket limiter and concurrency governor for LLM calls.
+
+    Every call reserves one request plus an estimated token count against its model's
+    RPM/TPM budget and one of `max_concurrency` in-flight slots. Waiters are served by
+    priority class, then FIFO. Queue-wait time is recorded per model and priority and
+    exposed through `stats()`.
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._budgets: Dict[str, _ModelBudget] = {}
+        self._waiting: list = []  # heap of (priority, seq, model, tokens)
+        self._seq = itertools.count()
+        self._active = 0
+        self._metrics: Dict[tuple, Dict[str, float]] = {}
+
+    def set_budget(self, model: str, rpm: float = None, tpm: float = None, burst: float = None) -> None:
+        """Sets the RPM/TPM budget for a model. `burst=1` enforces an even spacing of 60/rpm seconds."""
+        default_rpm, default_tpm = DEFAULT_BUDGETS.get(model, DEFAULT_BUDGET)
+        with self._cond:
+            self._budgets[model] = _ModelBudget(rpm or default_rpm, tpm or default_tpm, burst)
+            self._cond.notify_all()
+
+    def _budget(self, model: str) -> _ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, tpm = DEFAULT_BUDGETS.get(model, DEFAULT_BUDGET)
+            budget = self._budgets[model] = _ModelBudget(rpm, tpm)
+        return budget
+
+    def _try_acquire(self, ticket: tuple) -> float:
+        """
+        Attempts to grant `ticket`. Must be called with the lock held.
+
+        Returns 0 when granted, otherwise the number of seconds worth waiting before retrying
+        (-1 means "wait for a release notification").
+        """
+        priority, _, model, tokens = ticket
+        now = time.monotonic()
+        if self._active >= self.max_concurrency:
+            return -1
+        for other in self._waiting:
+            if other is ticket:
+                continue
+            # Earlier tickets for the same model keep FIFO order within the model's bucket;
+            # better-priority tickets for other models only block us when they could run now.
+            if other[:2] < ticket[:2] and (
+                other[2] == model or (other[0] < priority and self._budget(other[2]).delay(other[3], now) == 0)
+            ):
+                return -1
+        budget = self._budget(model)
+        delay = budget.delay(tokens, now)
+        if delay > 0:
+            return delay
+        budget.requests.take(1)
+        budget.tokens.take(min(tokens, budget.tokens.capacity))
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._active += 1
+        # Wake waiters that were blocked behind this ticket
+        self._cond.notify_all()
+        return 0
+
+    def _enqueue(self, model: str, tokens: int, priority: int) -> tuple:
+        ticket = (priority, next(self._seq), model, tokens)
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _abandon(self, ticket: tuple) -> None:
+        with self._cond:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def _release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _adjust_tokens(self, model: str, delta: int) -> None:
+        with self._cond:
+            self._budget(model).tokens.take(delta)
+            self._cond.notify_all()
+
+    def _record_wait(self, model: str, priority: int, waited: float) -> None:
+        with self._cond:
+            entry = self._metrics.setdefault((model, priority), {"calls": 0, "total_wait": 0.0, "max_wait": 0.0})
+            entry["calls"] += 1
+            entry["total_wait"] += waited
+            entry["max_wait"] = max(entry["max_wait"], waited)
+
+    @contextmanager
+    def acquire(self, model: str, tokens: int = 0, priority: int = Priority.INTERACTIVE):
+        """Blocks until `model` has budget and a concurrency slot is free, then yields a Lease."""
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(model, tokens, priority)
+            try:
+                while True:
+                    delay = self._try_acquire(ticket)
+                    if delay == 0:
+                        break
+                    self._cond.wait(timeout=None if delay < 0 else delay)
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+        waited = time.monotonic() - start
+        self._record_wait(model, priority, waited)
+        try:
+            yield Lease(self, model, tokens, waited)
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def acquire_async(self, model: str, tokens: int = 0, priority: int = Priority.INTERACTIVE):
+        """Async variant of `acquire` that waits on the event loop instead of blocking a thread."""
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(model, tokens, priority)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_acquire(ticket)
+                if delay == 0:
+                    break
+                await asyncio.sleep(0.05 if delay < 0 else min(delay, 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        waited = time.monotonic() - start
+        self._record_wait(model, priority, waited)
+        try:
+            yield Lease(self, model, tokens, waited)
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Queue-wait metrics keyed by "model/priority", plus current queue depth and in-flight calls."""
+        with self._cond:
+            result = {
+                f"{model}/{'interactive' if priority == Priority.INTERACTIVE else 'background'}": {
+                    "calls": entry["calls"],
+                    "avg_wait": entry["total_wait"] / entry["calls"] if entry["calls"] else 0.0,
+                    "max_wait": entry["max_wait"],
+                    "total_wait": entry["total_wait"],
+                }
+                for (model, priority), entry in self._metrics.items()
+            }
+            result["_queue"] = {"waiting": len(self._waiting), "in_flight": self._active}
+            return result
+
+
+# Shared by every Gemini call site in the process
+limiter = RateLimiter(max_concurrency=int(os.getenv("UNISONAI_MAX_CONCURRENCY", "4")))
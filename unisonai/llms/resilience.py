@@ -0,0 +1,489 @@
+import os
+import time
+import random
+import asyncio
+import inspect
+import functools
+import threading
+import contextvars
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from unisonai.llms.circuit import CircuitBreaker, CircuitOpenError
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors, Anthropic's "overloaded"
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Transient errors of the provider SDKs and their HTTP stacks, matched by class name so none
+# of them has to be imported (openai/groq/anthropic, httpx, google.api_core, mistral, cohere)
+TRANSIENT_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError", "OverloadedError",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "WriteError", "PoolTimeout",
+    "RemoteProtocolError", "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "Aborted",
+    "TooManyRequestsError", "ServiceUnavailableError", "GatewayTimeoutError",
+}
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """The HTTP status an SDK exception carries, if any."""
+    for name in ("status_code", "code", "status", "http_status"):
+        value = getattr(error, name, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _headers(error: BaseException):
+    for holder in (getattr(error, "response", None), error, getattr(error, "raw_response", None)):
+        headers = getattr(holder, "headers", None)
+        if headers:
+            return headers
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms), if it said."""
+    headers = _headers(error)
+    if headers is None:
+        return None
+    try:
+        lowered = {str(k).lower(): v for k, v in headers.items()}
+    except Exception:
+        return None
+    try:
+        if lowered.get("retry-after-ms") is not None:
+            return max(0.0, float(lowered["retry-after-ms"]) / 1000.0)
+        value = lowered.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for errors a later attempt can succeed on: rate limits, 5xx, timeouts, dropped connections."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def is_outage(error: BaseException) -> bool:
+    """Transient errors that count against an endpoint's circuit breaker. Rate limits do not."""
+    return is_transient(error) and status_of(error) != 429 and "RateLimit" not in type(error).__name__ \
+        and type(error).__name__ != "ResourceExhausted"
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff: attempt n (from 0) waits a random time up to
+    min(max_delay, base_delay * 2**n) ("full jitter"). A Retry-After from the provider is honoured
+    instead, unless it is longer than `max_retry_after`, in which case the call gives up.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 20.0,
+                 max_retry_after: float = 60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Seconds to wait before retrying after failed attempt `attempt` (from 0)."""
+        hinted = retry_after(error) if error is not None else None
+        if hinted is not None:
+            return hinted + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when the call should give up."""
+        if attempt + 1 >= self.max_attempts or not is_transient(error):
+            return None
+        hinted = retry_after(error)
+        if hinted is not None and hinted > self.max_retry_after:
+            return None
+        return self.backoff(attempt, error)
+
+
+# For callers that do their own failover (RoutedLLM): one attempt, breakers still apply
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+# Set while a resilient call runs, so the wrapper methods it calls (run() -> stream()) do not retry again
+_active: contextvars.ContextVar = contextvars.ContextVar("unisonai_resilient_call", default=False)
+
+
+class _Endpoint:
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.calls = 0
+        self.retries = 0
+        self.recovered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retry_wait = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "recovered": self.recovered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retry_wait": round(self.retry_wait, 3),
+            **self.breaker.stats(),
+        }
+
+
+class Resilience:
+    """
+    Shared retry and circuit-breaking layer for every LLM call in the process.
+
+    - transient errors (429, 5xx, timeouts, dropped connections) are retried with jittered
+      exponential backoff that honours the provider's Retry-After (see RetryPolicy)
+    - streams are retried only while nothing has been delivered; once the first piece is out,
+      an error reaches the caller
+    - each endpoint ("provider:model") has a circuit breaker: `failure_threshold` consecutive
+      outage errors open it and calls fail fast with CircuitOpenError for `reset_timeout`
+      seconds, then one trial call decides whether it closes again. Rate limits and client
+      errors (400, 401, ...) do not trip it
+    - per-endpoint retries, recoveries, failures and fast-failed calls are in stats()
+
+    The wrappers use it through the @resilient decorator; direct SDK call sites use call(),
+    acall() and stream().
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.policy = policy or RetryPolicy(max_attempts=int(os.getenv("UNISONAI_LLM_ATTEMPTS", "4")))
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _Endpoint] = {}
+
+    def _endpoint(self, endpoint: str) -> _Endpoint:
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = _Endpoint(
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout))
+            return entry
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        return self._endpoint(endpoint).breaker
+
+    def _admit(self, endpoint: str) -> _Endpoint:
+        entry = self._endpoint(endpoint)
+        if not entry.breaker.allow():
+            with self._lock:
+                entry.rejected += 1
+            raise CircuitOpenError(f"{endpoint} is failing; not calling it for another "
+                                   f"{entry.breaker.retry_in():.0f}s")
+        return entry
+
+    def _succeeded(self, entry: _Endpoint, attempt: int) -> None:
+        entry.breaker.record_success()
+        with self._lock:
+            entry.calls += 1
+            entry.recovered += attempt > 0
+
+    def _failed(self, entry: _Endpoint, attempt: int, error: BaseException,
+                policy: RetryPolicy, retry: bool = True) -> Optional[float]:
+        """Settles a failed attempt; returns the backoff before the next one, or None to give up."""
+        if is_outage(error):
+            entry.breaker.record_failure()
+        elif is_transient(error):
+            entry.breaker.release()
+        else:
+            entry.breaker.record_success()  # the endpoint answered; the request itself was refused
+        delay = policy.delay(attempt, error) if retry else None
+        if delay is not None and entry.breaker.state == CircuitBreaker.OPEN:
+            delay = None
+        with self._lock:
+            if delay is None:
+                entry.calls += 1
+                entry.failed += 1
+            else:
+                entry.retries += 1
+                entry.retry_wait += delay
+        return delay
+
+    def _abandoned(self, entry: _Endpoint) -> None:
+        """An attempt ended without an outcome (cancelled or interrupted)."""
+        entry.breaker.release()
+
+    def call(self, endpoint: str, fn: Callable, *args, policy: Optional[RetryPolicy] = None, **kwargs):
+        """Calls fn(*args, **kwargs) with retries and the endpoint's breaker."""
+        policy = policy or self.policy
+        attempt = 0
+        while True:
+            entry = self._admit(endpoint)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._failed(entry, attempt, e, policy)
+                if delay is None:
+                    raise
+                print(f"{endpoint}: {type(e).__name__}: {e} - retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self._abandoned(entry)
+                raise
+            self._succeeded(entry, attempt)
+            return result
+
+    async def acall(self, endpoint: str, fn: Callable[..., Awaitable], *args,
+                    policy: Optional[RetryPolicy] = None, **kwargs):
+        """Async variant of call(): awaits fn(*args, **kwargs) for each attempt."""
+        policy = policy or self.policy
+        attempt = 0
+        while True:
+            entry = self._admit(endpoint)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._failed(entry, attempt, e, policy)
+                if delay is None:
+                    raise
+                print(f"{endpoint}: {type(e).__name__}: {e} - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self._abandoned(entry)
+                raise
+            self._succeeded(entry, attempt)
+            return result
+
+    def stream(self, endpoint: str, start: Callable[[], Any], policy: Optional[RetryPolicy] = None) -> Iterator:
+        """
+        Iterates start() and retries it from scratch while it fails before yielding anything.
+        An error after the first item is raised to the consumer, which has already seen output.
+        """
+        policy = policy or self.policy
+        attempt = 0
+        while True:
+            entry = self._admit(endpoint)
+            try:
+                iterator = iter(start())
+                first = next(iterator)
+            except StopIteration:
+                self._succeeded(entry, attempt)
+                return
+            except Exception as e:
+                delay = self._failed(entry, attempt, e, policy)
+                if delay is None:
+                    raise
+                print(f"{endpoint}: {type(e).__name__}: {e} - retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self._abandoned(entry)
+                raise
+            self._succeeded(entry, attempt)
+            break
+        try:
+            yield first
+            while True:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    self._failed(entry, 0, e, policy, retry=False)
+                    raise
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    async def astream(self, endpoint: str, start: Callable[[], Any],
+                      policy: Optional[RetryPolicy] = None) -> AsyncIterator:
+        """Async variant of stream(); start() returns an async iterator or an awaitable of one."""
+        policy = policy or self.policy
+        attempt = 0
+        while True:
+            entry = self._admit(endpoint)
+            try:
+                iterator = start()
+                if inspect.isawaitable(iterator):
+                    iterator = await iterator
+                iterator = iterator.__aiter__()
+                first = await iterator.__anext__()
+            except StopAsyncIteration:
+                self._succeeded(entry, attempt)
+                return
+            except Exception as e:
+                delay = self._failed(entry, attempt, e, policy)
+                if delay is None:
+                    raise
+                print(f"{endpoint}: {type(e).__name__}: {e} - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self._abandoned(entry)
+                raise
+            self._succeeded(entry, attempt)
+            break
+        try:
+            yield first
+            while True:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    self._failed(entry, 0, e, policy, retry=False)
+                    raise
+                yield item
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint call, retry and failure counts plus breaker state."""
+        with self._lock:
+            entries = dict(self._endpoints)
+        return {endpoint: entry.as_dict() for endpoint, entry in entries.items()}
+
+    def reset(self) -> None:
+        """Forgets every endpoint's breaker and counters."""
+        with self._lock:
+            self._endpoints.clear()
+
+
+# Shared by every wrapper and direct SDK call site in the process
+resilience = Resilience()
+
+
+def _restore(llm, messages, before: int) -> None:
+    """Drops what a failed attempt appended to the history, so the retry starts from the same state."""
+    if messages is not None and getattr(llm, "messages", None) is messages and len(messages) > before:
+        del messages[before:]
+
+
+def resilient(provider: str):
+    """
+    Decorates a wrapper's run/arun, run_tools/arun_tools or stream/astream with the shared
+    Resilience layer, on the endpoint "provider:model". A failed attempt's history changes are
+    rolled back before the retry (and when the call finally fails). Wrapper methods called from
+    inside a decorated one (run() draining stream()) pass straight through. An instance can set
+    `retry_policy` (for example NO_RETRY) to override the shared policy.
+    """
+
+    def decorate(method):
+        def endpoint(self) -> str:
+            return f"{provider}:{getattr(self, 'model', '?')}"
+
+        if inspect.isasyncgenfunction(method):
+            @functools.wraps(method)
+            async def wrapped(self, *args, **kwargs):
+                if _active.get():
+                    async for item in method(self, *args, **kwargs):
+                        yield item
+                    return
+                messages = getattr(self, "messages", None)
+                before = len(messages) if messages is not None else 0
+
+                def start():
+                    _restore(self, messages, before)
+                    return method(self, *args, **kwargs)
+
+                iterator = resilience.astream(endpoint(self), start, getattr(self, "retry_policy", None))
+                try:
+                    while True:
+                        token = _active.set(True)
+                        try:
+                            item = await iterator.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            _active.reset(token)
+                        yield item
+                finally:
+                    await iterator.aclose()
+        elif inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def wrapped(self, *args, **kwargs):
+                if _active.get():
+                    yield from method(self, *args, **kwargs)
+                    return
+                messages = getattr(self, "messages", None)
+                before = len(messages) if messages is not None else 0
+
+                def start():
+                    _restore(self, messages, before)
+                    return method(self, *args, **kwargs)
+
+                iterator = resilience.stream(endpoint(self), start, getattr(self, "retry_policy", None))
+                try:
+                    while True:
+                        token = _active.set(True)
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            _active.reset(token)
+                        yield item
+                finally:
+                    iterator.close()
+        elif inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def wrapped(self, *args, **kwargs):
+                if _active.get():
+                    return await method(self, *args, **kwargs)
+                messages = getattr(self, "messages", None)
+                before = len(messages) if messages is not None else 0
+
+                async def attempt():
+                    _restore(self, messages, before)
+                    return await method(self, *args, **kwargs)
+
+                token = _active.set(True)
+                try:
+                    return await resilience.acall(endpoint(self), attempt,
+                                                  policy=getattr(self, "retry_policy", None))
+                except Exception:
+                    _restore(self, messages, before)
+                    raise
+                finally:
+                    _active.reset(token)
+        else:
+            @functools.wraps(method)
+            def wrapped(self, *args, **kwargs):
+                if _active.get():
+                    return method(self, *args, **kwargs)
+                messages = getattr(self, "messages", None)
+                before = len(messages) if messages is not None else 0
+
+                def attempt():
+                    _restore(self, messages, before)
+                    return method(self, *args, **kwargs)
+
+                token = _active.set(True)
+                try:
+                    return resilience.call(endpoint(self), attempt, policy=getattr(self, "retry_policy", None))
+                except Exception:
+                    _restore(self, messages, before)
+                    raise
+                finally:
+                    _active.reset(token)
+        return wrapped
+
+    return decorate
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import inspect
+import functools
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class ResponseCache:
+    """
+    Opt-in exact-match cache of LLM replies, stored in a local sqlite database.
+
+    - keyed by (provider, model, temperature, max_tokens, system prompt, hash of the message
+      history, prompt), plus the tool schema for native function-calling turns (run_tools/arun_tools)
+    - async wrappers read and write the database on a worker thread, off the event loop
+    - only deterministic calls are cached: anything with temperature > 0 bypasses the cache
+    - the database is kept under `max_bytes` of cached text by evicting least recently used rows
+    - hit ratio and the latency saved by hits (the original call's latency) are in stats()
+
+    Disabled until enable() is called or UNISONAI_LLM_CACHE=1 is set. A wrapper instance can
+    opt out with `llm.use_cache = False`.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024, enabled: bool = False):
+        self.path = path or os.getenv("UNISONAI_LLM_CACHE_PATH", os.path.join("data", "llm_cache.sqlite3"))
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def enable(self, path: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        with self._lock:
+            if path and path != self.path:
+                self._close()
+                self.path = path
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    # --- Storage ---
+    def _connect(self) -> sqlite3.Connection:
+        """Must be called with the lock held."""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "latency REAL NOT NULL, last_used REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._db
+
+    def _close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Drops least recently used rows until the cache is back under 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if self._size <= target:
+                break
+            victims.append((key,))
+            self._size -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    # --- Access ---
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: Any, system_prompt: Optional[str],
+                 messages: List[Any], prompt: str, tools: Any = None, max_tokens: Any = None) -> str:
+        history = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        fields = [provider, model, temperature, max_tokens, system_prompt, history, prompt]
+        if tools is not None:
+            fields.append(hashlib.sha256(json.dumps(tools, sort_keys=True, default=str).encode("utf-8")).hexdigest())
+        payload = json.dumps(fields, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def key_for(self, provider: str, llm, prompt: str, tools: Any = None) -> Optional[str]:
+        """Cache key for a call on `llm`, or None when the call must not be cached."""
+        if not self.enabled or not getattr(llm, "use_cache", True):
+            return None
+        temperature = getattr(llm, "temperature", None)
+        if temperature is None or temperature > 0:
+            with self._lock:
+                self.bypassed += 1
+            return None
+        return self.make_key(provider, getattr(llm, "model", ""), temperature,
+                             getattr(llm, "system_prompt", None), getattr(llm, "messages", []), prompt, tools,
+                             getattr(llm, "max_tokens", None))
+
+    def get(self, key: str, need_turn: bool = False) -> Optional[Dict[str, Any]]:
+        """The cached entry, or None. need_turn skips entries stored without the history turn."""
+        with self._lock:
+            try:
+                db = self._connect()
+                row = db.execute("SELECT value, latency FROM responses WHERE key = ?", (key,)).fetchone()
+                value = json.loads(row[0]) if row is not None else None
+                if value is None or (need_turn and value.get("turn") is None):
+                    self.misses += 1
+                    return None
+                db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"LLM response cache unavailable: {e}")
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1]
+            return value
+
+    def put(self, key: str, value: Dict[str, Any], latency: float) -> None:
+        data = json.dumps(value, default=str)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                db = self._connect()
+                old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                db.execute("INSERT OR REPLACE INTO responses (key, value, size, latency, last_used) VALUES (?, ?, ?, ?, ?)",
+                           (key, data, size, latency, time.time()))
+                self._size += size - (old[0] if old else 0)
+                if self._size > self.max_bytes:
+                    self._evict(db)
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"LLM response cache unavailable: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM responses")
+            db.commit()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "evictions": self.evictions,
+                "bytes": self._size,
+            }
+
+
+# Shared by every wrapper in the process
+response_cache = ResponseCache(enabled=os.getenv("UNISONAI_LLM_CACHE", "").lower() in ("1", "true", "yes"))
+
+
+def _replay(llm, entry: Optional[Dict[str, Any]], save_messages: bool) -> Optional[Dict[str, Any]]:
+    if entry is not None and save_messages:
+        llm.messages.extend(entry["turn"])
+    return entry
+
+
+def _lookup(llm, key: Optional[str], save_messages: bool) -> Optional[Dict[str, Any]]:
+    if key is None:
+        return None
+    return _replay(llm, response_cache.get(key, need_turn=save_messages), save_messages)
+
+
+async def _alookup(llm, key: Optional[str], save_messages: bool) -> Optional[Dict[str, Any]]:
+    """_lookup() for async wrappers: the sqlite read (and last-used update) runs in a thread."""
+    if key is None:
+        return None
+    return _replay(llm, await asyncio.to_thread(response_cache.get, key, save_messages), save_messages)
+
+
+def _entry(llm, before: int, value: Dict[str, Any], save_messages: bool) -> Dict[str, Any]:
+    value["turn"] = llm.messages[before:] if save_messages else None
+    return value
+
+
+def _store(llm, key: Optional[str], before: int, value: Dict[str, Any], save_messages: bool, started: float) -> None:
+    if key is None:
+        return
+    response_cache.put(key, _entry(llm, before, value, save_messages), time.perf_counter() - started)
+
+
+async def _astore(llm, key: Optional[str], before: int, value: Dict[str, Any], save_messages: bool, started: float) -> None:
+    """_store() for async wrappers: the sqlite write runs in a thread."""
+    if key is None:
+        return
+    await asyncio.to_thread(response_cache.put, key, _entry(llm, before, value, save_messages),
+                            time.perf_counter() - started)
+
+
+def cached_completion(provider: str):
+    """
+    Decorates a wrapper's run(prompt, save_messages) or arun(...) with the response cache. On a
+    hit the messages the original call appended to the history are replayed, so every wrapper
+    keeps its own message format.
+    """
+
+    def decorate(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def cached(self, prompt: str, save_messages: bool = True):
+                key = response_cache.key_for(provider, self, prompt)
+                hit = await _alookup(self, key, save_messages)
+                if hit is not None:
+                    return hit["text"]
+                before, started = len(self.messages), time.perf_counter()
+                text = await method(self, prompt, save_messages)
+                if isinstance(text, str):
+                    await _astore(self, key, before, {"text": text}, save_messages, started)
+                return text
+        else:
+            @functools.wraps(method)
+            def cached(self, prompt: str, save_messages: bool = True):
+                key = response_cache.key_for(provider, self, prompt)
+                hit = _lookup(self, key, save_messages)
+                if hit is not None:
+                    return hit["text"]
+                before, started = len(self.messages), time.perf_counter()
+                text = method(self, prompt, save_messages)
+                if isinstance(text, str):
+                    _store(self, key, before, {"text": text}, save_messages, started)
+                return text
+        return cached
+
+    return decorate
+
+
+def _tool_reply(entry: Dict[str, Any]):
+    return entry["text"], [(name, args) for name, args in entry["calls"]]
+
+
+def cached_tool_completion(provider: str):
+    """
+    Decorates a wrapper's run_tools(prompt, tools, save_messages) or arun_tools(...) with the
+    response cache, keyed on the history and the tool schema. Stores the text and the calls.
+    """
+
+    def decorate(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def cached(self, prompt: str, tools: list, save_messages: bool = True):
+                key = response_cache.key_for(provider, self, prompt, tools)
+                hit = await _alookup(self, key, save_messages)
+                if hit is not None:
+                    return _tool_reply(hit)
+                before, started = len(self.messages), time.perf_counter()
+                text, calls = await method(self, prompt, tools, save_messages)
+                await _astore(self, key, before, {"text": text, "calls": calls}, save_messages, started)
+                return text, calls
+        else:
+            @functools.wraps(method)
+            def cached(self, prompt: str, tools: list, save_messages: bool = True):
+                key = response_cache.key_for(provider, self, prompt, tools)
+                hit = _lookup(self, key, save_messages)
+                if hit is not None:
+                    return _tool_reply(hit)
+                before, started = len(self.messages), time.perf_counter()
+                text, calls = method(self, prompt, tools, save_messages)
+                _store(self, key, before, {"text": text, "calls": calls}, save_messages, started)
+                return text, calls
+        return cached
+
+    return decorate
@@ -0,0 +1,451 @@
+import copy
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from unisonai.llms.circuit import CircuitBreaker, CircuitOpenError
+from unisonai.llms.resilience import NO_RETRY
+from unisonai.llms.streaming import Delta
+from unisonai.tools.schema import describe_calls
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class _Route:
+    """Rolling latency/error statistics and the circuit breaker of one provider/model."""
+
+    def __init__(self, name: str, window: int, breaker: CircuitBreaker):
+        self.name = name
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        self._outcomes: deque = deque(maxlen=window)  # True for errors
+        self.calls = 0
+        self.errors = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds: float, error: bool, counted: bool = True) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            if counted:
+                self._outcomes.append(error)
+                self.calls += 1
+                self.errors += error
+        if not counted:
+            self.breaker.release()
+        elif error:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            return _percentile(list(self._latencies), q) if self._latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def score(self) -> float:
+        """Lower is better: rolling p95 latency inflated by the error rate. Unmeasured routes score 0."""
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return 0.0
+        return p95 / max(0.1, 1.0 - self.error_rate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate,
+            "calls": self.calls,
+            "errors": self.errors,
+            "hedge_wins": self.hedge_wins,
+            **self.breaker.stats(),
+        }
+
+
+class RoutedLLM:
+    """
+    An LLM that spreads calls over several provider wrappers (Gemini, Openai, GroqLLM, ...).
+
+    - each call goes to the provider/model with the best rolling p95 latency and error rate;
+      providers without measurements yet are tried first, in the order given
+    - on an error the call fails over to the next provider; `failure_threshold` consecutive
+      errors open a provider's circuit breaker so it is skipped for `reset_timeout` seconds
+    - with `hedge=True` a second provider is asked when the first has not answered after
+      `hedge_after` seconds (default: the first provider's rolling p95) and the first answer wins
+    - streams fail over only while no token has been delivered yet
+    - with several providers each is switched to a single attempt (NO_RETRY), since failing
+      over to the next one is faster than backing off; their shared per-endpoint breakers still apply
+
+    It exposes the wrapper interface (run/arun, stream/astream, run_tools/arun_tools, messages,
+    reset, add_message) so Agent and Single_Agent can use it like any single provider. The
+    conversation is kept here and replayed into each provider's own message format.
+    """
+
+    USER = "user"
+    MODEL = "assistant"
+
+    def __init__(self,
+                 providers: Optional[list] = None,
+                 messages: list = [],
+                 temperature: Optional[float] = None,
+                 system_prompt: Optional[str] = None,
+                 max_tokens: Optional[int] = None,
+                 hedge: bool = False,
+                 hedge_after: Optional[float] = None,
+                 window: int = 100,
+                 failure_threshold: int = 3,
+                 reset_timeout: float = 30.0,
+                 verbose: bool = False,
+                 **kwargs):
+        # Agents re-initialize their LLM with only history and prompt: keep providers and stats then
+        if providers is not None or not hasattr(self, "providers"):
+            if not providers:
+                raise ValueError("RoutedLLM needs at least one provider")
+            self.providers = list(providers)
+            if len(self.providers) > 1:
+                for llm in self.providers:
+                    llm.retry_policy = NO_RETRY  # failing over beats retrying the same provider
+            self._routes = [
+                _Route(f"{type(llm).__name__}:{getattr(llm, 'model', '?')}", window,
+                       CircuitBreaker(failure_threshold, reset_timeout))
+                for llm in self.providers
+            ]
+            self.hedge = hedge
+            self.hedge_after = hedge_after
+            self.verbose = verbose
+            self._pool = ThreadPoolExecutor(max_workers=max(2, 2 * len(self.providers)), thread_name_prefix="RoutedLLM")
+            self._stats_lock = threading.Lock()
+            self.hedges = 0
+        formats = {getattr(llm, "tool_format", None) for llm in self.providers}
+        self.tool_format = formats.pop() if len(formats) == 1 else None
+        self.messages = messages
+        self.model = "+".join(route.name for route in self._routes)
+        # Explicit values apply to every provider; otherwise each keeps its own
+        self._temperature, self._max_tokens = temperature, max_tokens
+        self.temperature = temperature if temperature is not None else getattr(self.providers[0], "temperature", 0.0)
+        self.max_tokens = max_tokens if max_tokens is not None else getattr(self.providers[0], "max_tokens", 2048)
+        self.system_prompt = system_prompt
+        self._loaded = set()  # indexes of providers whose history matches self.messages
+
+    def __copy__(self):
+        # Concurrent agent contexts get their own provider instances but share the statistics
+        clone = object.__new__(RoutedLLM)
+        clone.__dict__.update(self.__dict__)
+        clone.providers = [copy.copy(llm) for llm in self.providers]
+        clone._loaded = set()
+        return clone
+
+    # --- History ---
+    @staticmethod
+    def _assistant_role(llm) -> str:
+        return getattr(llm, "ASSISTANT", None) or llm.MODEL
+
+    @staticmethod
+    def _content(message: dict) -> str:
+        if "content" in message:
+            return message["content"]
+        parts = message.get("parts") or [""]
+        return parts[0] if isinstance(parts[0], str) else str(parts[0])
+
+    def _load(self, index: int):
+        """Re-initializes provider `index` with the routed system prompt and history, once."""
+        llm = self.providers[index]
+        if index in self._loaded:
+            return llm
+        client = getattr(llm, "client", None)
+        api_key = getattr(client, "api_key", None) or getattr(llm, "api_key", None)
+        temperature = self._temperature if self._temperature is not None else getattr(llm, "temperature", self.temperature)
+        max_tokens = self._max_tokens if self._max_tokens is not None else getattr(llm, "max_tokens", self.max_tokens)
+        llm.reset()
+        llm.__init__(messages=[], model=llm.model, temperature=temperature,
+                     system_prompt=self.system_prompt, max_tokens=max_tokens, api_key=api_key)
+        for message in self.messages:
+            role = message.get("role")
+            if role == "system":
+                continue
+            llm.add_message(llm.USER if role == self.USER else self._assistant_role(llm), self._content(message))
+        self._loaded.add(index)
+        return llm
+
+    def _remember(self, prompt: str, reply: str) -> None:
+        self.add_message(self.USER, prompt)
+        self.add_message(self.MODEL, reply)
+
+    def add_message(self, role: str, content: str) -> None:
+        self.messages.append({"role": role, "content": content})
+        for index in self._loaded:
+            llm = self.providers[index]
+            llm.add_message(llm.USER if role == self.USER else self._assistant_role(llm), content)
+
+    def reset(self) -> None:
+        self.messages = []
+        self.system_prompt = None
+        self._loaded = set()
+
+    # --- Routing ---
+    def _ranked(self, tool_format: Optional[str] = None) -> List[int]:
+        """Provider indexes by preference, skipping open circuits (and other tool formats)."""
+        candidates = [
+            i for i, llm in enumerate(self.providers)
+            if tool_format is None or getattr(llm, "tool_format", None) == tool_format
+        ]
+        ranked = sorted(candidates, key=lambda i: (self._routes[i].samples > 0, self._routes[i].score()))
+        allowed = [i for i in ranked if self._routes[i].breaker.state != CircuitBreaker.OPEN]
+        if not allowed:
+            wait = min(self._routes[i].breaker.retry_in() for i in candidates) if candidates else 0.0
+            raise CircuitOpenError(f"All providers are failing; next retry in {wait:.0f}s")
+        return allowed
+
+    def _hedge_delay(self, index: int) -> float:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        p95 = self._routes[index].percentile(0.95)
+        return p95 if p95 is not None and self._routes[index].samples >= 5 else 2.0
+
+    def _claim(self, index: int) -> None:
+        if not self._routes[index].breaker.allow():
+            raise CircuitOpenError(f"{self._routes[index].name}: circuit open")
+
+    @staticmethod
+    def _detached(llm):
+        """
+        A copy of a loaded provider with its own history list and chat session. Hedged calls
+        run on one, so a losing call still running on a pool thread never shares state with
+        the provider instance the next call uses.
+        """
+        clone = copy.copy(llm)
+        clone.messages = list(llm.messages)
+        if hasattr(clone, "chat_session"):
+            clone.chat_session = None
+        return clone
+
+    def _attempt(self, index: int, call: Callable, detached: bool = False):
+        route = self._routes[index]
+        self._claim(index)
+        started = time.perf_counter()
+        try:
+            llm = self._load(index)
+            result = call(self._detached(llm) if detached else llm)
+        except Exception:
+            route.record(time.perf_counter() - started, True)
+            raise
+        route.record(time.perf_counter() - started, False)
+        return result
+
+    async def _aattempt(self, index: int, call: Callable):
+        route = self._routes[index]
+        self._claim(index)
+        started = time.perf_counter()
+        try:
+            result = await call(self._load(index))
+        except asyncio.CancelledError:
+            # A hedged loser: its elapsed time is still a useful (lower-bound) latency sample
+            route.record(time.perf_counter() - started, False, counted=False)
+            raise
+        except Exception:
+            route.record(time.perf_counter() - started, True)
+            raise
+        route.record(time.perf_counter() - started, False)
+        return result
+
+    def _note_failover(self, index: int, error: Exception) -> None:
+        if self.verbose:
+            print(f"RoutedLLM: {self._routes[index].name} failed ({error}); failing over")
+
+    def _submit(self, index: int, call: Callable):
+        context = contextvars.copy_context()  # keeps usage tags on the pool thread
+        return self._pool.submit(context.run, self._attempt, index, call, True)
+
+    def _hedged(self, primary: int, backup: int, call: Callable):
+        first = self._submit(primary, call)
+        try:
+            return first.result(timeout=self._hedge_delay(primary))
+        except FutureTimeout:
+            pass
+        except Exception as e:
+            self._note_failover(primary, e)
+            return self._attempt(backup, call)
+        with self._stats_lock:
+            self.hedges += 1
+        second = self._submit(backup, call)
+        error = None
+        for future in as_completed([first, second]):
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if future is second:
+                self._routes[backup].hedge_wins += 1
+            return result
+        raise error
+
+    async def _ahedged(self, primary: int, backup: int, call: Callable):
+        first = asyncio.ensure_future(self._aattempt(primary, call))
+        done, _ = await asyncio.wait({first}, timeout=self._hedge_delay(primary))
+        if done:
+            try:
+                return first.result()
+            except Exception as e:
+                self._note_failover(primary, e)
+                return await self._aattempt(backup, call)
+        with self._stats_lock:
+            self.hedges += 1
+        second = asyncio.ensure_future(self._aattempt(backup, call))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._routes[backup].hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _call(self, call: Callable, tool_format: Optional[str] = None):
+        order = self._ranked(tool_format)
+        error = None
+        i = 0
+        while i < len(order):
+            hedged = self.hedge and i + 1 < len(order)
+            try:
+                if hedged:
+                    return self._hedged(order[i], order[i + 1], call)
+                return self._attempt(order[i], call)
+            except Exception as e:
+                error = e
+                self._note_failover(order[i], e)
+                i += 2 if hedged else 1
+        raise error
+
+    async def _acall(self, call: Callable, tool_format: Optional[str] = None):
+        order = self._ranked(tool_format)
+        error = None
+        i = 0
+        while i < len(order):
+            hedged = self.hedge and i + 1 < len(order)
+            try:
+                if hedged:
+                    return await self._ahedged(order[i], order[i + 1], call)
+                return await self._aattempt(order[i], call)
+            except Exception as e:
+                error = e
+                self._note_failover(order[i], e)
+                i += 2 if hedged else 1
+        raise error
+
+    # --- Wrapper interface ---
+    def run(self, prompt: str, save_messages: bool = True) -> str:
+        reply = self._call(lambda llm: llm.run(prompt, save_messages=False))
+        if save_messages:
+            self._remember(prompt, reply)
+        return reply
+
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        reply = await self._acall(lambda llm: llm.arun(prompt, save_messages=False))
+        if save_messages:
+            self._remember(prompt, reply)
+        return reply
+
+    def run_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        """Routes a native tool call among providers sharing this router's tool_format."""
+        text, calls = self._call(lambda llm: llm.run_tools(prompt, tools, save_messages=False), self.tool_format)
+        if save_messages:
+            self._remember(prompt, text or describe_calls(calls))
+        return text, calls
+
+    async def arun_tools(self, prompt: str, tools: list, save_messages: bool = True):
+        text, calls = await self._acall(lambda llm: llm.arun_tools(prompt, tools, save_messages=False), self.tool_format)
+        if save_messages:
+            self._remember(prompt, text or describe_calls(calls))
+        return text, calls
+
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        """Streams from the best provider, failing over while no token has been delivered."""
+        error = None
+        for index in self._ranked():
+            route = self._routes[index]
+            if not route.breaker.allow():
+                continue
+            started = time.perf_counter()
+            delivered = recorded = False
+            try:
+                for delta in self._load(index).stream(prompt, save_messages=False):
+                    if delta.kind == Delta.END:
+                        route.record(time.perf_counter() - started, False)
+                        recorded = True
+                        if save_messages:
+                            self._remember(prompt, delta.text)
+                    delivered = True
+                    yield delta
+                return
+            except Exception as e:
+                route.record(time.perf_counter() - started, True)
+                recorded = True
+                if delivered:
+                    raise
+                error = e
+                self._note_failover(index, e)
+            finally:
+                if not recorded:
+                    # Abandoned by the consumer (close/aclose, cancellation): give back a half-open trial
+                    route.record(time.perf_counter() - started, False, counted=False)
+        raise error or CircuitOpenError("All providers are failing")
+
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        """Async variant of stream()."""
+        error = None
+        for index in self._ranked():
+            route = self._routes[index]
+            if not route.breaker.allow():
+                continue
+            started = time.perf_counter()
+            delivered = recorded = False
+            try:
+                async for delta in self._load(index).astream(prompt, save_messages=False):
+                    if delta.kind == Delta.END:
+                        route.record(time.perf_counter() - started, False)
+                        recorded = True
+                        if save_messages:
+                            self._remember(prompt, delta.text)
+                    delivered = True
+                    yield delta
+                return
+            except Exception as e:
+                route.record(time.perf_counter() - started, True)
+                recorded = True
+                if delivered:
+                    raise
+                error = e
+                self._note_failover(index, e)
+            finally:
+                if not recorded:
+                    # Abandoned by the consumer (close/aclose, cancellation): give back a half-open trial
+                    route.record(time.perf_counter() - started, False, counted=False)
+        raise error or CircuitOpenError("All providers are failing")
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-provider rolling p50/p95 latency, error rate, breaker state and hedge wins."""
+        return {"hedges": self.hedges, "routes": {route.name: route.stats() for route in self._routes}}
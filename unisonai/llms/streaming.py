@@ -0,0 +1,104 @@
+from typing import Any, AsyncIterator, Iterable, Iterator, Protocol, runtime_checkable
+
+
+class Delta:
+    """
+    One event of a streamed reply.
+
+    kind "text": `text` is the next piece of the reply, as soon as the provider sends it
+    kind "end":  `text` is the complete reply and `response` the provider object that carried
+                 usage (or None); always the last event of a finished stream
+    """
+
+    TEXT = "text"
+    END = "end"
+    __slots__ = ("kind", "text", "response")
+
+    def __init__(self, kind: str, text: str = "", response: Any = None):
+        self.kind = kind
+        self.text = text
+        self.response = response
+
+    def __repr__(self) -> str:
+        return f"Delta({self.kind!r}, {self.text!r})"
+
+
+@runtime_checkable
+class StreamingLLM(Protocol):
+    """
+    What every unisonai.llms wrapper implements on top of run()/arun().
+
+    stream() and astream() yield "text" Deltas followed by one "end" Delta. The prompt and the
+    full reply are added to the history only once the stream has finished, so a consumer that
+    stops early leaves the history untouched.
+    """
+
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]: ...
+
+    def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]: ...
+
+
+def collect(deltas: Iterable[Delta], echo: bool = False) -> str:
+    """Drains a stream and returns the full reply; echo prints the pieces as they arrive."""
+    for delta in deltas:
+        if delta.kind == Delta.END:
+            if echo:
+                print()
+            return delta.text
+        if echo:
+            print(delta.text, end="", flush=True)
+    return ""
+
+
+async def acollect(deltas: AsyncIterator[Delta], echo: bool = False) -> str:
+    """Async variant of collect()."""
+    async for delta in deltas:
+        if delta.kind == Delta.END:
+            if echo:
+                print()
+            return delta.text
+        if echo:
+            print(delta.text, end="", flush=True)
+    return ""
+
+
+def _chunk_text(chunk) -> str:
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    content = getattr(choices[0].delta, "content", None)
+    return content if isinstance(content, str) else ""
+
+
+def _usage_carrier(chunk, current):
+    """The chunk that reports usage: `usage` on OpenAI/xAI/Mistral, `x_groq.usage` on Groq."""
+    if getattr(chunk, "usage", None):
+        return chunk
+    groq = getattr(chunk, "x_groq", None)
+    if groq is not None and getattr(groq, "usage", None):
+        return groq
+    return current
+
+
+def openai_deltas(chunks: Iterable[Any]) -> Iterator[Delta]:
+    """Turns OpenAI-compatible chat completion chunks into Deltas."""
+    pieces, final = [], None
+    for chunk in chunks:
+        final = _usage_carrier(chunk, final)
+        text = _chunk_text(chunk)
+        if text:
+            pieces.append(text)
+            yield Delta(Delta.TEXT, text)
+    yield Delta(Delta.END, "".join(pieces), final)
+
+
+async def aopenai_deltas(chunks: AsyncIterator[Any]) -> AsyncIterator[Delta]:
+    """Async variant of openai_deltas()."""
+    pieces, final = [], None
+    async for chunk in chunks:
+        final = _usage_carrier(chunk, final)
+        text = _chunk_text(chunk)
+        if text:
+            pieces.append(text)
+            yield Delta(Delta.TEXT, text)
+    yield Delta(Delta.END, "".join(pieces), final)
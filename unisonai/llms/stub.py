@@ -0,0 +1,157 @@
+import re
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Union
+
+from unisonai.llms.streaming import Delta
+from unisonai.llms.context_cache import context_cache
+
+
+class StubProviderError(RuntimeError):
+    """Simulated provider failure; `status_code` mimics the HTTP status of a real outage."""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StubCacheBackend:
+    """
+    In-memory context cache for the "stub" provider, so caching can be exercised offline once
+    registered with context_cache.register_backend("stub", stub_cache). drop() forgets a cache
+    the way a provider does when it expires or is deleted server-side.
+    """
+
+    def __init__(self):
+        self.caches = {}
+        self.created = self.refreshed = self.deleted = 0
+
+    def create(self, model: str, system_prompt: str, tools: Any, ttl: float):
+        self.created += 1
+        name = f"cachedContents/stub-{self.created}"
+        self.caches[name] = system_prompt
+        return name, None, None
+
+    def refresh(self, handle, ttl: float) -> None:
+        if handle.name not in self.caches:
+            raise StubProviderError(f"Cached content {handle.name} not found", 404)
+        self.refreshed += 1
+
+    def delete(self, handle) -> None:
+        if self.caches.pop(handle.name, None) is not None:
+            self.deleted += 1
+
+    def drop(self, name: Optional[str] = None) -> None:
+        """Forgets one cache (or all of them) without telling the client."""
+        if name is None:
+            self.caches.clear()
+        else:
+            self.caches.pop(name, None)
+
+
+stub_cache = StubCacheBackend()
+
+
+class StubLLM:
+    """
+    Local stand-in for a provider wrapper, with no network and no API key.
+
+    Replies with `reply` (a string, or a callable taking the prompt) after `latency` seconds
+    (plus up to `jitter` more), and fails with StubProviderError for a fraction `error_rate` of
+    calls or for the next calls queued with fail_next(). Useful for exercising RoutedLLM,
+    agents and benchmarks offline. With context caching enabled and a "stub" backend registered,
+    the system prompt goes through it and `cache_handle` is the handle the last call referenced.
+    """
+
+    USER = "user"
+    MODEL = "assistant"
+
+    def __init__(self,
+                 messages: list = [],
+                 model: str = "stub",
+                 temperature: float = 0.0,
+                 system_prompt: Optional[str] = None,
+                 max_tokens: int = 2048,
+                 verbose: bool = False,
+                 api_key: Optional[str] = None,
+                 reply: Union[str, Callable[[str], str], None] = None,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.messages = messages
+        self.model = model
+        self.temperature = temperature
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.verbose = verbose
+        # Behaviour survives re-initialization (agents call __init__ again with only history/prompt)
+        self.reply = reply if reply is not None else getattr(self, "reply", None)
+        self.latency = latency if latency else getattr(self, "latency", 0.0)
+        self.jitter = jitter if jitter else getattr(self, "jitter", 0.0)
+        self.error_rate = error_rate if error_rate else getattr(self, "error_rate", 0.0)
+        if not hasattr(self, "_random"):
+            self._random = random.Random(seed)
+            self._fail_next = 0
+            self.calls = 0
+            self.cache_handle = None
+
+    def fail_next(self, count: int = 1, status_code: int = 503) -> None:
+        self._fail_next += count
+        self._fail_status = status_code
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        if self._fail_next:
+            self._fail_next -= 1
+            raise StubProviderError(f"{self.model}: simulated outage", getattr(self, "_fail_status", 503))
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise StubProviderError(f"{self.model}: simulated error")
+        self.cache_handle = context_cache.handle("stub", self.model, self.system_prompt)
+        if self.cache_handle is not None and self.cache_handle.name not in stub_cache.caches:
+            # What a real wrapper does on a cache-miss error: drop the handle, send the full prompt
+            context_cache.expired(self.cache_handle, StubProviderError(f"Cached content {self.cache_handle.name} not found", 404))
+            self.cache_handle = None
+        context_cache.served(self.cache_handle)
+        if callable(self.reply):
+            return self.reply(prompt)
+        return self.reply if self.reply is not None else f"{self.model}: {prompt}"
+
+    def _delay(self) -> float:
+        return self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+
+    def _save(self, prompt: str, text: str, save_messages: bool) -> str:
+        if save_messages:
+            self.add_message(self.USER, prompt)
+            self.add_message(self.MODEL, text)
+        return text
+
+    def run(self, prompt: str, save_messages: bool = True) -> str:
+        time.sleep(self._delay())
+        return self._save(prompt, self._answer(prompt), save_messages)
+
+    async def arun(self, prompt: str, save_messages: bool = True) -> str:
+        await asyncio.sleep(self._delay())
+        return self._save(prompt, self._answer(prompt), save_messages)
+
+    def stream(self, prompt: str, save_messages: bool = True) -> Iterator[Delta]:
+        time.sleep(self._delay())
+        text = self._answer(prompt)
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            yield Delta(Delta.TEXT, piece)
+        yield Delta(Delta.END, self._save(prompt, text, save_messages))
+
+    async def astream(self, prompt: str, save_messages: bool = True) -> AsyncIterator[Delta]:
+        await asyncio.sleep(self._delay())
+        text = self._answer(prompt)
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            yield Delta(Delta.TEXT, piece)
+        yield Delta(Delta.END, self._save(prompt, text, save_messages))
+
+    def add_message(self, role: str, content: str) -> None:
+        self.messages.append({"role": role, "content": content})
+
+    def reset(self) -> None:
+        self.messages = []
+        self.system_prompt = None
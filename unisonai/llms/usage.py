@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from unisonai.llms.ratelimit import estimate_tokens
+
+# List prices in USD per 1M (input, output) tokens at the time of writing; override with ledger.set_price().
+# Models without a price are still counted, their cost is reported as None.
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-flash-latest": (0.075, 0.30),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "grok-2-latest": (2.0, 10.0),
+    "mistral-large-latest": (2.0, 6.0),
+}
+
+# Fraction of the input price providers charge for prompt tokens served from their context cache
+CACHED_INPUT_RATES: Dict[str, float] = {"gemini": 0.25, "anthropic": 0.1, "openai": 0.5, "xai": 0.25}
+
+# Tags of the code currently calling an LLM. Context variables follow asyncio tasks and
+# asyncio.to_thread; thread pools must run work through contextvars.copy_context().run.
+_agent: contextvars.ContextVar = contextvars.ContextVar("unisonai_usage_agent", default=None)
+_tool: contextvars.ContextVar = contextvars.ContextVar("unisonai_usage_tool", default=None)
+_turn: contextvars.ContextVar = contextvars.ContextVar("unisonai_usage_turn", default=None)
+
+
+def new_turn_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def current_turn() -> Optional[str]:
+    return _turn.get()
+
+
+@contextmanager
+def usage_scope(agent: Optional[str] = None, tool: Optional[str] = None, turn_id: Optional[str] = None):
+    """Tags every LLM call made inside the block; unset arguments keep the enclosing tags."""
+    tokens = []
+    for var, value in ((_agent, agent), (_tool, tool), (_turn, turn_id)):
+        if value is not None:
+            tokens.append((var, var.set(value)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def extract_usage(response: Any) -> Optional[Tuple[int, int]]:
+    """(prompt_tokens, completion_tokens) from a provider response, or None if it carries no usage."""
+    if response is None:
+        return None
+    usage = getattr(response, "usage_metadata", None)  # Gemini
+    if usage is not None and isinstance(getattr(usage, "prompt_token_count", None), int):
+        return usage.prompt_token_count, getattr(usage, "candidates_token_count", 0) or 0
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        if isinstance(getattr(usage, "prompt_tokens", None), int):  # OpenAI, xAI, Groq, Mistral
+            return usage.prompt_tokens, getattr(usage, "completion_tokens", 0) or 0
+        if isinstance(getattr(usage, "input_tokens", None), int):  # Anthropic (cache reads/writes are counted apart)
+            cached = sum(getattr(usage, name, 0) or 0 for name in ("cache_read_input_tokens", "cache_creation_input_tokens"))
+            return usage.input_tokens + cached, getattr(usage, "output_tokens", 0) or 0
+    billed = getattr(getattr(response, "meta", None), "billed_units", None)  # Cohere
+    if billed is not None and isinstance(getattr(billed, "input_tokens", None), (int, float)):
+        return int(billed.input_tokens), int(getattr(billed, "output_tokens", 0) or 0)
+    return None
+
+
+def extract_cached_tokens(response: Any) -> int:
+    """Prompt tokens the provider served from its context cache, 0 if none or not reported."""
+    if response is None:
+        return 0
+    cached = getattr(getattr(response, "usage_metadata", None), "cached_content_token_count", None)  # Gemini
+    if isinstance(cached, int):
+        return cached
+    usage = getattr(response, "usage", None)
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)  # OpenAI, xAI
+    if isinstance(cached, int):
+        return cached
+    cached = getattr(usage, "cache_read_input_tokens", None)  # Anthropic
+    return cached if isinstance(cached, int) else 0
+
+
+class UsageRecord:
+    """Token usage of one LLM call and the agent/tool/turn that made it."""
+
+    def __init__(self, provider: str, model: str, prompt_tokens: int, completion_tokens: int,
+                 estimated: bool, latency: float, cost: Optional[float],
+                 agent: Optional[str], tool: Optional[str], turn_id: Optional[str], cached_tokens: int = 0):
+        self.timestamp = time.time()
+        self.provider = provider
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+        self.estimated = estimated
+        self.latency = latency
+        self.cost = cost
+        self.agent = agent
+        self.tool = tool
+        self.turn_id = turn_id
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": round(self.timestamp, 3),
+            "provider": self.provider,
+            "model": self.model,
+            "agent": self.agent,
+            "tool": self.tool,
+            "turn_id": self.turn_id,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.total_tokens,
+            "estimated": self.estimated,
+            "latency": round(self.latency, 3),
+            "cost": self.cost,
+        }
+
+
+class UsageLedger:
+    """
+    Process-wide record of LLM token usage and cost.
+
+    Every wrapper reports its calls through `record()`, using provider usage metadata when the
+    response has it and the offline estimate otherwise. Records are tagged with the agent, tool
+    and turn id of the current usage_scope(), can be queried with `query()`/`totals()`, and are
+    appended to a JSONL file by `dump()`. A turn budget fires an alarm callback once per turn
+    when that turn's tokens or cost cross the threshold.
+
+    Memory stays bounded without dump(): the newest `max_records` records (dumped or not) and
+    the totals of the newest `max_turns` turns are kept.
+    """
+
+    def __init__(self, max_records: int = 10_000, path: Optional[str] = None, max_turns: int = 1_000):
+        self.path = path or os.getenv("UNISONAI_USAGE_FILE", os.path.join("data", "usage.jsonl"))
+        self.prices: Dict[str, Tuple[float, float]] = dict(PRICES)
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._records: deque = deque(maxlen=max_records)
+        self._undumped: deque = deque(maxlen=max_records)
+        self._turns: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._alarmed: set = set()
+        self.turn_max_tokens: Optional[int] = None
+        self.turn_max_cost: Optional[float] = None
+        self.on_alarm: Callable[[str, Dict[str, float]], None] = self._default_alarm
+
+    def set_price(self, model: str, input_per_million: float, output_per_million: float) -> None:
+        with self._lock:
+            self.prices[model] = (input_per_million, output_per_million)
+
+    def set_turn_budget(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None,
+                        on_alarm: Optional[Callable[[str, Dict[str, float]], None]] = None) -> None:
+        """Alarms when one turn (all agents and tools under one turn id) exceeds these limits."""
+        self.turn_max_tokens = max_tokens
+        self.turn_max_cost = max_cost
+        if on_alarm is not None:
+            self.on_alarm = on_alarm
+
+    @staticmethod
+    def _default_alarm(turn_id: str, totals: Dict[str, float]) -> None:
+        cost = f", ${totals['cost']:.4f}" if totals.get("cost") else ""
+        print(f"[usage] Turn {turn_id} crossed its budget: {int(totals['tokens'])} tokens{cost} "
+              f"over {int(totals['calls'])} LLM calls")
+
+    def _cost(self, provider: str, model: str, prompt_tokens: int, completion_tokens: int,
+              cached_tokens: int = 0) -> Optional[float]:
+        price = self.prices.get(model)
+        if price is None:
+            return None
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        rate = CACHED_INPUT_RATES.get(provider, 1.0)
+        return ((prompt_tokens - cached_tokens + cached_tokens * rate) * price[0]
+                + completion_tokens * price[1]) / 1_000_000
+
+    def record(self, provider: str, model: str, response: Any = None, prompt: Any = None,
+               completion: Any = None, latency: float = 0.0) -> UsageRecord:
+        """Records one call. `prompt`/`completion` are only used to estimate usage the response lacks."""
+        usage = extract_usage(response)
+        estimated = usage is None
+        if estimated:
+            usage = (estimate_tokens(prompt), estimate_tokens(completion))
+        prompt_tokens, completion_tokens = usage
+        cached_tokens = extract_cached_tokens(response)
+        entry = UsageRecord(provider, model, prompt_tokens, completion_tokens, estimated, latency,
+                            self._cost(provider, model, prompt_tokens, completion_tokens, cached_tokens),
+                            _agent.get(), _tool.get(), _turn.get(), cached_tokens)
+        alarm = None
+        with self._lock:
+            self._records.append(entry)
+            self._undumped.append(entry)
+            if entry.turn_id is not None:
+                turn = self._turns.get(entry.turn_id)
+                if turn is None:
+                    turn = self._turns[entry.turn_id] = {"tokens": 0, "cost": 0.0, "calls": 0}
+                    while len(self._turns) > self.max_turns:
+                        self._alarmed.discard(self._turns.popitem(last=False)[0])
+                turn["tokens"] += entry.total_tokens
+                turn["cost"] += entry.cost or 0.0
+                turn["calls"] += 1
+                over = ((self.turn_max_tokens is not None and turn["tokens"] > self.turn_max_tokens)
+                        or (self.turn_max_cost is not None and turn["cost"] > self.turn_max_cost))
+                if over and entry.turn_id not in self._alarmed:
+                    self._alarmed.add(entry.turn_id)
+                    alarm = (entry.turn_id, dict(turn))
+        if alarm:
+            try:
+                self.on_alarm(*alarm)
+            except Exception as e:
+                print(f"[usage] Budget alarm callback failed: {e}")
+        return entry
+
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        """Records matching every given field, e.g. query(agent="Web Crawler", turn_id=...)."""
+        with self._lock:
+            records = list(self._records)
+        return [r.as_dict() for r in records if all(getattr(r, k) == v for k, v in filters.items())]
+
+    def totals(self, by: str = "agent", **filters) -> Dict[Any, Dict[str, float]]:
+        """Tokens (and cached prompt tokens), cost, calls and latency summed per value of `by` (agent, tool, turn_id, model, provider)."""
+        result: Dict[Any, Dict[str, float]] = {}
+        for r in self.query(**filters):
+            entry = result.setdefault(r[by], {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                              "cached_tokens": 0, "total_tokens": 0, "cost": 0.0, "latency": 0.0, "estimated_calls": 0})
+            entry["calls"] += 1
+            entry["prompt_tokens"] += r["prompt_tokens"]
+            entry["completion_tokens"] += r["completion_tokens"]
+            entry["cached_tokens"] += r["cached_tokens"]
+            entry["total_tokens"] += r["total_tokens"]
+            entry["cost"] += r["cost"] or 0.0
+            entry["latency"] += r["latency"]
+            entry["estimated_calls"] += int(r["estimated"])
+        return result
+
+    def turn(self, turn_id: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._turns.get(turn_id, {"tokens": 0, "cost": 0.0, "calls": 0}))
+
+    def dump(self, path: Optional[str] = None) -> int:
+        """Appends records not yet written to the JSONL usage file. Returns how many were written."""
+        with self._lock:
+            pending = list(self._undumped)
+            self._undumped.clear()
+        if not pending:
+            return 0
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r.as_dict()) + "\n" for r in pending))
+        return len(pending)
+
+
+# Shared by every LLM wrapper and call site in the process
+ledger = UsageLedger()
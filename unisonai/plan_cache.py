@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class PlanCache:
+    """
+    On-disk store of clan plans, so rerunning the same goal with the same members skips the
+    planning LLM call.
+
+    - entries are keyed by a hash of (goal, formatted members, shared instruction, model)
+    - an entry is fresh for `ttl` seconds; get() reports whether it is fresh or expired, so the
+      caller can serve an expired plan while a new one is generated in the background
+    - invalidate() drops one entry or all of them
+    - the store is a single JSON file (UNISONAI_PLAN_CACHE, default data/plan_cache.json),
+      rewritten atomically on every change
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 24 * 3600, max_entries: int = 256):
+        self.path = path or os.getenv("UNISONAI_PLAN_CACHE", os.path.join("data", "plan_cache.json"))
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def make_key(goal: str, members: str, shared_instruction: str, model: str) -> str:
+        payload = json.dumps([goal, members, shared_instruction, model], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Storage ---
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Must be called with the lock held."""
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        """Must be called with the lock held."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving plan cache: {e}")
+
+    # --- Access ---
+    def get(self, key: str, ttl: Optional[float] = None) -> Tuple[Optional[str], bool]:
+        """Returns (plan, fresh). plan is None on a miss; fresh is False once the entry is older than ttl."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            fresh = time.time() - entry["created"] < ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry["plan"], fresh
+
+    def put(self, key: str, plan: str, refresh: bool = False) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[key] = {"plan": plan, "created": time.time()}
+            if len(entries) > self.max_entries:
+                for old_key in sorted(entries, key=lambda k: entries[k]["created"])[:len(entries) - self.max_entries]:
+                    del entries[old_key]
+            if refresh:
+                self.refreshes += 1
+            self._save()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drops the plan stored under `key`, or every plan when key is None."""
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+            elif entries.pop(key, None) is None:
+                return
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._load()),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+            }
+
+
+# Shared by every Clan in the process
+plan_cache = PlanCache()
@@ -12,6 +12,7 @@ AGENT_PROMPT="""<purpose>
         <instruction> Collaborate with other agents by executing assigned tasks and delegating subtasks if necessary. </instruction>
         <instruction> Utilize only the inbuilt 'send_message' tool for communication with other agents. </instruction>
         <instruction> Always ensure the recipient of any message is a different agent, not yourself. </instruction>
+        <instruction> To hand independent subtasks to several agents at once, use one 'send_message' call whose params hold a "messages" list with an agent_name, message and additional_resource per agent; their replies reach you together. </instruction>
         <instruction> Use the provided Team Members list and ensure all members are utilized. </instruction>
         <instruction> Refer to the Available Tools list. </instruction>
         <instruction> Provide clear, step-by-step reasoning in the "thoughts" section for all actions. </instruction>
@@ -80,4 +81,12 @@ params: >
     <tools>
         {tools}
     </tools>
-"""
\ No newline at end of file
+"""
+# Appended to the manager/agent prompt when the LLM receives the tools as native function declarations
+NATIVE_TOOLS_NOTE = """
+    <tool_calling>
+        The tools above, plus send_message, ask_user and pass_result, are available to you as functions.
+        Call them directly as functions instead of writing YAML. State your reasoning briefly before each call.
+        Several send_message calls in one response are delivered together and their replies are gathered for you.
+    </tool_calling>
+"""
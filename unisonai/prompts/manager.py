@@ -8,6 +8,7 @@ MANAGER_PROMPT = """<purpose>
     <instruction>Utilize the provided information about team members {members} and available tools {tools}.</instruction>
     <instruction>Always include clear, factual reasoning in the "thoughts" section.</instruction>
     <instruction>Ensure the recipient of a message is a different agent (not yourself).</instruction>
+    <instruction>When subtasks are independent, delegate them together in one `send_message` call with a "messages" list; the members work in parallel and their replies are gathered into one message for you.</instruction>
     <instruction>Use the specified YAML format for tool calls and responses, including all required parameters.</instruction>
     <instruction>Never leave the 'name' field empty in your YAML response; use `pass_result` if no other tool is applicable.</instruction>
     <instruction>Use `pass_result` to submit the final result to the user.</instruction>
@@ -31,6 +32,17 @@ MANAGER_PROMPT = """<purpose>
               "additional_resource": "Access to the sales database"}}
         ```
     </example>
+    <example>
+        ```yaml
+        thoughts: >
+            The market research and the competitor review do not depend on each other, so both members can start now.
+        name: send_message
+        params: >
+            {{"messages": [
+                {{"agent_name": "Researcher", "message": "Collect market size figures for 2024.", "additional_resource": ""}},
+                {{"agent_name": "Analyst", "message": "Summarise the top three competitors' pricing.", "additional_resource": ""}}]}}
+        ```
+    </example>
     <example>
         ```yaml
         thoughts: >
@@ -0,0 +1,182 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, Dict, FrozenSet, List, Tuple, Union
+
+# "format": str.format rules ({name}, {name!r:>10}, {{ and }} for literal braces)
+# "placeholders": only {WORD} is a field and every other brace is literal text, for prompt files
+# that contain JSON or code examples (backend/prompts/*.md)
+_PLACEHOLDER = re.compile(r"{(\w+)}")
+_formatter = Formatter()
+
+
+class PromptTemplate:
+    """
+    A prompt parsed once into literal text and fields, rendered by joining pieces.
+
+    partial(**static) binds the values that stay fixed for an agent (identity, description,
+    tools, ...) and returns a template in which they are already baked into the literal text;
+    those are cached per set of values, so for each task only the per-task fields are rendered
+    and one join is done. `static_prefix` is the text before the first unbound field.
+
+    render()/format() accept the same arguments as str.format on the original text.
+    """
+
+    def __init__(self, text: str, syntax: str = "format", max_partials: int = 32):
+        self.text = text
+        self.syntax = syntax
+        self.max_partials = max_partials
+        self._pieces = self._parse(text, syntax)  # str for literal text, tuple for a field
+        self._partials: "OrderedDict[tuple, PromptTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.partial_hits = 0
+        self.partial_misses = 0
+
+    @classmethod
+    def _compiled(cls, pieces: List[Union[str, tuple]], syntax: str, max_partials: int) -> "PromptTemplate":
+        template = cls.__new__(cls)
+        template.text = None
+        template.syntax = syntax
+        template.max_partials = max_partials
+        template._pieces = pieces
+        template._partials = OrderedDict()
+        template._lock = threading.Lock()
+        template.renders = template.partial_hits = template.partial_misses = 0
+        return template
+
+    # --- Parsing ---
+    @staticmethod
+    def _parse(text: str, syntax: str) -> List[Union[str, tuple]]:
+        pieces: List[Union[str, tuple]] = []
+        if syntax == "placeholders":
+            position = 0
+            for match in _PLACEHOLDER.finditer(text):
+                pieces.append(text[position:match.start()])
+                pieces.append((match.group(1), match.group(1), None, ""))
+                position = match.end()
+            pieces.append(text[position:])
+        elif syntax == "format":
+            for literal, field, spec, conversion in _formatter.parse(text):
+                pieces.append(literal)
+                if field is not None:
+                    if field == "" or field.isdigit():
+                        raise ValueError("PromptTemplate fields must be named")
+                    root = re.match(r"[^.\[]*", field).group(0)
+                    pieces.append((root, field, conversion, spec or ""))
+        else:
+            raise ValueError(f"Unknown template syntax: {syntax}")
+        return PromptTemplate._merge(pieces)
+
+    @staticmethod
+    def _merge(pieces: List[Union[str, tuple]]) -> List[Union[str, tuple]]:
+        """Joins adjacent literal pieces and drops empty ones."""
+        merged: List[Union[str, tuple]] = []
+        for piece in pieces:
+            if isinstance(piece, str):
+                if not piece:
+                    continue
+                if merged and isinstance(merged[-1], str):
+                    merged[-1] += piece
+                    continue
+            merged.append(piece)
+        return merged
+
+    @property
+    def fields(self) -> FrozenSet[str]:
+        """Names of the fields still to be filled in."""
+        return frozenset(piece[0] for piece in self._pieces if isinstance(piece, tuple))
+
+    @property
+    def static_prefix(self) -> str:
+        """The literal text before the first unbound field."""
+        return self._pieces[0] if self._pieces and isinstance(self._pieces[0], str) else ""
+
+    # --- Rendering ---
+    @staticmethod
+    def _value(piece: tuple, values: Dict[str, Any]) -> str:
+        root, field, conversion, spec = piece
+        if field == root:
+            value = values[root]
+        else:
+            value, _ = _formatter.get_field(field, (), values)
+        if conversion:
+            value = _formatter.convert_field(value, conversion)
+        if spec or not isinstance(value, str):
+            value = format(value, spec)
+        return value
+
+    def partial(self, **static: Any) -> "PromptTemplate":
+        """
+        A template with the given fields bound. Cached per set of values (when they are
+        hashable), so binding the same agent's values again costs one dictionary lookup.
+        """
+        try:
+            key = tuple(sorted(static.items()))
+            hash(key)
+        except TypeError:
+            key = None
+        if key is not None:
+            with self._lock:
+                template = self._partials.get(key)
+                if template is not None:
+                    self._partials.move_to_end(key)
+                    self.partial_hits += 1
+                    return template
+        pieces = [
+            self._value(piece, static) if isinstance(piece, tuple) and piece[0] in static else piece
+            for piece in self._pieces
+        ]
+        template = self._compiled(self._merge(pieces), self.syntax, self.max_partials)
+        if key is not None:
+            with self._lock:
+                self.partial_misses += 1
+                self._partials[key] = template
+                while len(self._partials) > self.max_partials:
+                    self._partials.popitem(last=False)
+        return template
+
+    def render(self, **values: Any) -> str:
+        """Fills in every remaining field. Raises KeyError for a missing one, like str.format."""
+        self.renders += 1
+        return "".join(piece if isinstance(piece, str) else self._value(piece, values) for piece in self._pieces)
+
+    def format(self, **values: Any) -> str:
+        """str.format-compatible alias of render()."""
+        return self.render(**values)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fields": sorted(self.fields),
+            "pieces": len(self._pieces),
+            "static_prefix_chars": len(self.static_prefix),
+            "renders": self.renders,
+            "partials_cached": len(self._partials),
+            "partial_hits": self.partial_hits,
+            "partial_misses": self.partial_misses,
+        }
+
+
+_file_templates: Dict[Tuple[str, str], Tuple[Tuple[int, int], PromptTemplate]] = {}
+_file_lock = threading.Lock()
+
+
+def load_template(path: str, syntax: str = "placeholders") -> PromptTemplate:
+    """
+    The compiled template of a prompt file. Parsed on first use and again only when the
+    file changes on disk.
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(path), syntax)
+    with _file_lock:
+        cached = _file_templates.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        template = PromptTemplate(f.read(), syntax=syntax)
+    with _file_lock:
+        _file_templates[key] = (signature, template)
+    return template
@@ -1,10 +1,13 @@
 import sys
 import re
+import copy
 import yaml
 import json
 import os
 import asyncio
 import inspect
+import contextvars
+import time
 from typing import Any, List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor
 import threading
@@ -14,11 +17,26 @@ from colorama import Fore, Style
 
 # Assuming these are from your library, otherwise define them
 from unisonai.llms import Gemini
-from unisonai.prompts.individual import INDIVIDUAL_PROMPT
+from unisonai.prompts.individual import INDIVIDUAL_PROMPT, INDIVIDUAL_TOOLS_PROMPT
+from unisonai.prompts.template import PromptTemplate
+from unisonai.tools.schema import compile_tools, describe_calls
+from unisonai.tools.runtime import tool_runtime
+from unisonai.llms.usage import usage_scope, current_turn, new_turn_id
+from unisonai.budget import TaskBudget, TaskRun
+from unisonai.context_window import ContextWindow
+from unisonai.history import HistoryJournal
+from unisonai.context import AgentContext, ContextPool
 
 colorama.init(autoreset=True)
 
+# Parsed once; each agent binds its identity, description and tools via partial()
+INDIVIDUAL_TEMPLATE = PromptTemplate(INDIVIDUAL_PROMPT)
+INDIVIDUAL_TOOLS_TEMPLATE = PromptTemplate(INDIVIDUAL_TOOLS_PROMPT)
+
 class Single_Agent:
+    # Built-in actions handled by the loop itself; they never run alongside other tool calls
+    CONTROL_TOOLS = ("ask_user", "pass_result")
+
     def __init__(self,
                  llm: Gemini,
                  identity: str,
@@ -26,7 +44,13 @@ class Single_Agent:
                  verbose: bool = True,
                  tools: list[Any] = [],
                  output_file: str = None,
-                 history_folder: str = "history"):
+                 history_folder: str = "history",
+                 budget: Optional[TaskBudget] = None,
+                 history_tail: Optional[int] = None,
+                 native_tools: bool = True,
+                 max_parallel_tools: int = 4,
+                 max_concurrency: int = 2,
+                 context_window: Optional[ContextWindow] = None):
         
         self.llm = llm
         self.identity = identity
@@ -34,10 +58,18 @@ class Single_Agent:
         self.verbose = verbose
         self.output_file = output_file
         self.history_folder = history_folder
+        self.history_tail = history_tail  # Load only the last N messages per task (None = all)
         self.rawtools = tools
+        # Per-task limits; the TaskRun of the latest task (steps, timings, tokens) is kept in last_run
+        self.budget = budget or TaskBudget()
+        self.last_run: Optional[TaskRun] = None
+        # Token budget of the history sent on each step; older turns are summarized once it is exceeded
+        self.context_window = context_window or ContextWindow()
+        # Upper bound on tool calls from one step that run at the same time
+        self.max_parallel_tools = max(1, max_parallel_tools)
         
         # --- Performance Optimizations ---
-        # 1. Pre-compile regex for faster matching inside the recursive loop
+        # 1. Pre-compile regex for faster matching inside the agent loop
         self.yaml_pattern = re.compile(r"```(?:yaml|yml)(.*?)```", re.DOTALL)
         
         # 2. Instantiate tools once and create a dictionary for O(1) lookup
@@ -50,15 +82,31 @@ class Single_Agent:
         # 3. Use a more efficient method to build the tool string
         self.tools_string = self._create_tools_string()
 
-        # Set up history file path for later use
+        # 4. Compile tools into provider-native schemas when the LLM supports function calling;
+        #    otherwise (or with native_tools=False) the YAML protocol is used
+        self.tool_format = getattr(llm, "tool_format", None) if native_tools else None
+        self.tool_schemas, self.tool_names = None, {}
+        if self.tool_format:
+            self.tool_schemas, self.tool_names = compile_tools(
+                list(self.tool_map.values()), self.tool_format, builtins=("pass_result", "ask_user"))
+
+        # Set up the append-only history journal for later use
         if self.history_folder:
             os.makedirs(self.history_folder, exist_ok=True)
-            self.history_file_path = os.path.join(self.history_folder, f"{self.identity}.json")
+            self.history_file_path = os.path.join(self.history_folder, f"{self.identity}.jsonl")
+            HistoryJournal.migrate_legacy(os.path.join(self.history_folder, f"{self.identity}.json"), self.history_file_path)
+            self.journal: Optional[HistoryJournal] = HistoryJournal(self.history_file_path)
         else:
             self.history_file_path = None
+            self.journal = None
             
-        # This will hold our background task manager
-        self.executor: Optional[ThreadPoolExecutor] = None
+        # The agent above is only a definition; each unleash/aunleash call runs in its own
+        # AgentContext (LLM instance, messages, history offset, I/O executor) leased from this pool
+        self.contexts = ContextPool(self._new_context, max_concurrency)
+
+    def _new_context(self) -> AgentContext:
+        # A shallow copy shares nothing that matters: _prepare re-initializes it with its own messages
+        return AgentContext(copy.copy(self.llm))
 
     def _create_tools_string(self) -> str:
         """Efficiently creates the formatted string for tools."""
@@ -78,17 +126,33 @@ class Single_Agent:
         return "\n".join(tool_parts)
 
     # --- Background I/O Functions ---
-    def _save_history_in_background(self):
-        """Task to save history file in a separate thread."""
-        if self.history_file_path and self.llm.messages:
+    def _save_history_in_background(self, ctx: AgentContext):
+        """Task to append the context's new messages to the history journal in a separate thread."""
+        if self.journal and ctx.llm.messages:
             try:
-                # Make a thread-safe copy of messages
-                messages_to_save = list(self.llm.messages)
-                with open(self.history_file_path, "w", encoding="utf-8") as f:
-                    json.dump(messages_to_save, f, indent=4)
+                # Only this invocation's new tail is written; other runs append their own
+                with ctx.history_lock:
+                    messages = ctx.llm.messages
+                    new = list(messages[ctx.history_offset:])
+                    ctx.history_offset = len(messages)
+                self.journal.append(new)
             except Exception as e:
                 print(f"{Fore.RED}Background history save failed: {e}")
 
+    def _fit_context(self, ctx: AgentContext) -> None:
+        """
+        Trims the context's history to the context window before an LLM call. Messages not yet
+        in the journal are appended first, so trimming only ever shortens what is sent.
+        """
+        if not self.context_window.needs_trim(ctx.llm):
+            return
+        with ctx.history_lock:
+            pending = list(ctx.llm.messages[ctx.history_offset:])
+            if self.journal and pending:
+                self.journal.append(pending)
+            self.context_window.fit(ctx.llm, agent=self.identity)
+            ctx.history_offset = len(ctx.llm.messages)
+
     def _write_output_in_background(self, content: str):
         """Task to write final result in a separate thread."""
         if self.output_file:
@@ -112,7 +176,8 @@ class Single_Agent:
                     return {"raw_input": params_data}
         return params_data if params_data is not None else {}
 
-    def _execute_tool(self, name: str, params: dict):
+    def _bind_tool(self, name: str, params: dict):
+        """Resolves a tool and binds params to its _run signature. Returns (tool, kwargs)."""
         tool = self.tool_map.get(name.lower())
         if not tool:
             raise ValueError(f"Tool '{name}' not found.")
@@ -128,112 +193,383 @@ class Single_Agent:
         if self.verbose:
             kind = 'ASYNC' if inspect.iscoroutinefunction(method) else 'SYNC'
             print(Fore.CYAN + f"Status: Executing {kind} Tool ({name}) with params {filtered}...")
+        return tool, dict(filtered)
 
-        if inspect.iscoroutinefunction(method):
-            return asyncio.run(method(**filtered))
-        else:
-            return method(**filtered)
+    def _execute_tool(self, name: str, params: dict):
+        """Runs a tool under its declared policy (cache, timeout, concurrency cap, retries)."""
+        tool, filtered = self._bind_tool(name, params)
+        with usage_scope(tool=tool.name):
+            return tool_runtime.call(tool, filtered)
 
+    async def _aexecute_tool(self, name: str, params: dict):
+        """Async counterpart of _execute_tool: awaits async tools on the running loop, threads sync ones."""
+        tool, filtered = self._bind_tool(name, params)
+        with usage_scope(tool=tool.name):
+            return await tool_runtime.acall(tool, filtered)
 
-    def _recursive_unleash(self, task: str) -> str:
+    def _parse_actions(self, response: str) -> list:
         """
-        This is the core recursive logic from your original code, but without
-        the slow file I/O and re-initialization.
+        Extracts the tool calls from a model response as a list of (name, params).
+        A YAML block holds either one call (name/params) or several independent ones (calls: [...]).
+        Returns [] when the response is a plain answer or the YAML block is malformed.
         """
-        # --- LLM Call (The main blocking operation) ---
-        response = self.llm.run(task, save_messages=True)
-        
-        # --- PARALLEL I/O ---
-        # Submit the history save task to the background and continue immediately
-        if self.executor:
-            self.executor.submit(self._save_history_in_background)
-
-        if self.verbose:
-            print("Response:")
-            print(response)
-
-        # --- Parse and Act (Your original logic) ---
         yaml_match = self.yaml_pattern.search(response)
         if not yaml_match:
-            return response
+            return []
 
         try:
             data = yaml.safe_load(yaml_match.group(1).strip())
-            assert "thoughts" in data and "name" in data and "params" in data
-        except (yaml.YAMLError, AssertionError):
+            assert "thoughts" in data and ("calls" in data or ("name" in data and "params" in data))
+            entries = data["calls"] if "calls" in data else [data]
+            assert isinstance(entries, list) and entries and all(isinstance(e, dict) and "name" in e for e in entries)
+        except (yaml.YAMLError, AssertionError, TypeError):
             print(Fore.RED + "YAML block found, but it doesn't match the expected format.")
-            return response
+            return []
 
-        thoughts, name, params_raw = data["thoughts"], data["name"], data["params"]
-        params = self._ensure_dict_params(params_raw)
-        
+        actions = [(entry["name"], self._ensure_dict_params(entry.get("params"))) for entry in entries]
+        if self.verbose:
+            print(f"{Fore.MAGENTA}Thoughts: {str(data['thoughts'])[:120]}...")
+            self._print_actions(actions)
+        return actions
+
+    def _print_actions(self, actions: list) -> None:
+        for name, params in actions:
+            print(f"{Fore.GREEN}Using Tool ({name})\n{Fore.LIGHTYELLOW_EX}Params: {params}")
+
+    def _resolve_actions(self, response: str, calls: list) -> list:
+        """
+        Returns the (name, params) calls to act on: the native tool calls if the model made any,
+        otherwise whatever the YAML fallback finds in the text.
+        """
+        if not calls:
+            return self._parse_actions(response)
+        actions = [(self.tool_names.get(name, name), self._ensure_dict_params(params)) for name, params in calls]
         if self.verbose:
-            print(f"{Fore.MAGENTA}Thoughts: {thoughts[:120]}...\n{Fore.GREEN}Using Tool ({name})\n{Fore.LIGHTYELLOW_EX}Params: {params}")
-
-        # --- Action Dispatch (Your original logic) ---
-        if name == "ask_user":
-            question = params.get("question", str(params))
-            print("QUESTION: " + question)
-            return self._recursive_unleash(input("You: "))
-
-        elif name == "pass_result":
-            result = str(params.get("result", params))
-            print("RESULT: " + result)
-            # Submit final output write to background
-            if self.executor:
-                self.executor.submit(self._write_output_in_background, result)
-            return result
-
-        else: # Tool call
+            self._print_actions(actions)
+        return actions
+
+    def _call_llm(self, ctx: AgentContext, message: str):
+        """One LLM call. Returns (response_text, native_calls); calls is empty in YAML mode."""
+        if self.tool_schemas is None:
+            return ctx.llm.run(message, save_messages=True), []
+        response, calls = ctx.llm.run_tools(message, self.tool_schemas, save_messages=True)
+        return response or describe_calls(calls), calls
+
+    async def _acall_llm(self, ctx: AgentContext, message: str):
+        llm = ctx.llm
+        if self.tool_schemas is None:
+            if hasattr(llm, "arun"):
+                return await llm.arun(message, save_messages=True), []
+            return await asyncio.to_thread(llm.run, message, True), []
+        if hasattr(llm, "arun_tools"):
+            response, calls = await llm.arun_tools(message, self.tool_schemas, save_messages=True)
+        else:
+            response, calls = await asyncio.to_thread(llm.run_tools, message, self.tool_schemas, True)
+        return response or describe_calls(calls), calls
+
+    def _check_repeat(self, run: TaskRun, name: str, params: dict) -> Optional[str]:
+        """
+        Registers a tool call with the run. Returns the follow-up message to send instead of
+        executing when the exact same call already succeeded (None means execute it). A call
+        that failed may be retried; it still counts towards the budget's max_repeats.
+        """
+        count = run.register_call(name, params)
+        if count < 2 or run.stop_reason or not run.has_result(name, params):
+            return None
+        print(f"{Fore.YELLOW}Repeated tool call ({name}) detected; reusing previous result.")
+        return (f"You already called '{name}' with these exact params. Do not repeat it. "
+                f"The previous result was:\n\n{run.previous_result(name, params)}\n\n"
+                "Use it, try something different, or finish with pass_result.")
+
+    @staticmethod
+    def _step_label(tool_calls: list) -> str:
+        return ",".join(name for name, _ in tool_calls)
+
+    @staticmethod
+    def _combine_results(tool_calls: list, results: list) -> str:
+        """One follow-up message for all of a step's tool calls; results are (ok, text) pairs."""
+        if len(results) == 1:
+            ok, text = results[0]
+            return f"Here is your tool response:\n\n{text}" if ok else text
+        parts = [f"### {i}. {name} {params}\n{text}" for i, ((name, params), (_, text)) in enumerate(zip(tool_calls, results), 1)]
+        return "Here are your tool responses, in the order you requested them:\n\n" + "\n\n".join(parts)
+
+    def _tool_outcome(self, run: TaskRun, name: str, params: dict, tool_response=None, error: Exception = None):
+        if error is not None:
+            print(f"{Fore.RED}Error executing tool '{name}': {error}")
+            # Provide feedback to the LLM about the error
+            return False, f"The tool '{name}' failed with error: {error}"
+        print(f"Tool Response ({name}):")
+        print(tool_response)
+        run.remember_result(name, params, tool_response)
+        return True, str(tool_response)
+
+    def _plan_tools(self, run: TaskRun, tool_calls: list):
+        """
+        Registers a step's calls with the run. Returns (results, pending, duplicates): results is
+        pre-filled for repeated calls, pending lists the indexes still to execute and duplicates
+        maps identical calls within the step to the index that runs. None if the run must stop.
+        """
+        results: list = [None] * len(tool_calls)
+        pending = []
+        duplicates: Dict[int, int] = {}
+        seen: Dict[str, int] = {}
+        for i, (name, params) in enumerate(tool_calls):
+            key = TaskRun._call_key(name, params)
+            if key in seen:
+                duplicates[i] = seen[key]
+                continue
+            seen[key] = i
+            repeat_message = self._check_repeat(run, name, params)
+            if run.stop_reason:
+                return None
+            if repeat_message:
+                results[i] = (False, repeat_message)
+            else:
+                pending.append(i)
+        return results, pending, duplicates
+
+    def _finish_tools(self, tool_calls: list, results: list, duplicates: Dict[int, int]) -> str:
+        for i, original in duplicates.items():
+            results[i] = results[original]
+        return self._combine_results(tool_calls, results)
+
+    def _run_tools(self, run: TaskRun, tool_calls: list) -> Optional[str]:
+        """
+        Executes a step's tool calls, concurrently on a bounded thread pool when there are
+        several. Returns the combined follow-up message, or None if the run must stop.
+        """
+        planned = self._plan_tools(run, tool_calls)
+        if planned is None:
+            return None
+        results, pending, duplicates = planned
+
+        def execute(i):
+            name, params = tool_calls[i]
             try:
-                tool_response = self._execute_tool(name, params)
-                print("Tool Response:")
-                print(tool_response)
-                return self._recursive_unleash(f"Here is your tool response:\n\n{str(tool_response)}")
+                return self._tool_outcome(run, name, params, self._execute_tool(name, params))
             except Exception as e:
-                print(f"{Fore.RED}Error executing tool '{name}': {e}")
-                # Provide feedback to the LLM about the error
-                return self._recursive_unleash(f"The tool '{name}' failed with error: {e}")
+                return self._tool_outcome(run, name, params, error=e)
 
-    def unleash(self, task: str) -> str:
+        if len(pending) == 1:
+            results[pending[0]] = execute(pending[0])
+        elif pending:
+            # Each call runs in a copy of this thread's context so usage tags follow it
+            contexts = [contextvars.copy_context() for _ in pending]
+            with ThreadPoolExecutor(max_workers=min(len(pending), self.max_parallel_tools),
+                                    thread_name_prefix='AgentTool') as pool:
+                for i, outcome in zip(pending, pool.map(lambda c, i: c.run(execute, i), contexts, pending)):
+                    results[i] = outcome
+        return self._finish_tools(tool_calls, results, duplicates)
+
+    async def _arun_tools(self, run: TaskRun, tool_calls: list) -> Optional[str]:
+        """Async counterpart of _run_tools: async tools share the loop, sync tools go to threads."""
+        planned = self._plan_tools(run, tool_calls)
+        if planned is None:
+            return None
+        results, pending, duplicates = planned
+        semaphore = asyncio.Semaphore(self.max_parallel_tools)
+
+        async def execute(i):
+            name, params = tool_calls[i]
+            async with semaphore:
+                try:
+                    return self._tool_outcome(run, name, params, await self._aexecute_tool(name, params))
+                except Exception as e:
+                    return self._tool_outcome(run, name, params, error=e)
+
+        for i, outcome in zip(pending, await asyncio.gather(*(execute(i) for i in pending))):
+            results[i] = outcome
+        return self._finish_tools(tool_calls, results, duplicates)
+
+    def _finish_run(self, run: TaskRun, result: str) -> str:
+        if run.stop_reason:
+            print(f"{Fore.RED}{run.stop_message()}")
+            result = f"{run.stop_message()} Last response:\n{result}"
+        if self.verbose:
+            for step in run.steps:
+                print(f"{Fore.LIGHTBLACK_EX}Step {step.index} [{step.action}]: "
+                      f"llm {step.llm_seconds:.2f}s, tool {step.tool_seconds:.2f}s, ~{step.tokens} tokens")
+        return result
+
+    def _run_loop(self, ctx: AgentContext, task: str) -> str:
         """
-        Public entry point. Sets up the environment ONCE, then starts the
-        fast, recursive loop.
+        Iterative agent loop: one LLM call per step until pass_result, a plain answer,
+        or the task budget (steps, wall-clock time, tokens, repeated calls) runs out.
         """
-        # --- 1. SETUP (Done ONCE per task) ---
-        messages = []
-        if self.history_file_path:
-            try:
-                with open(self.history_file_path, "r", encoding="utf-8") as f:
-                    messages = json.loads(f.read() or "[]")
-            except (FileNotFoundError, json.JSONDecodeError):
-                pass
+        run = ctx.run = self.last_run = TaskRun(self.budget)
+        message = task
+        response = ""
+        while not run.exceeded():
+            prompt = message
+            self._fit_context(ctx)
+            context_tokens = self.context_window.count(ctx.llm)  # resent with this step
+            # --- LLM Call (The main blocking operation) ---
+            started = time.perf_counter()
+            response, calls = self._call_llm(ctx, message)
+            llm_seconds = time.perf_counter() - started
+
+            # --- PARALLEL I/O ---
+            # Submit the history save task to the background and continue immediately
+            if ctx.executor:
+                ctx.executor.submit(self._save_history_in_background, ctx)
+
+            if self.verbose:
+                print("Response:")
+                print(response)
+
+            actions = self._resolve_actions(response, calls)
+            if not actions:
+                run.record_step("answer", prompt, response, llm_seconds, context_tokens=context_tokens)
+                return self._finish_run(run, response)
+            tool_calls = [a for a in actions if a[0] not in self.CONTROL_TOOLS]
+
+            if tool_calls:
+                started = time.perf_counter()
+                message = self._run_tools(run, tool_calls)
+                run.record_step(self._step_label(tool_calls), prompt, response, llm_seconds,
+                                time.perf_counter() - started, context_tokens=context_tokens)
+                if message is None:
+                    break
+                continue
+
+            name, params = actions[0]
+            if name == "ask_user":
+                run.record_step(name, prompt, response, llm_seconds, context_tokens=context_tokens)
+                question = params.get("question", str(params))
+                print("QUESTION: " + question)
+                message = input("You: ")
+
+            elif name == "pass_result":
+                run.record_step(name, prompt, response, llm_seconds, context_tokens=context_tokens)
+                result = str(params.get("result", params))
+                print("RESULT: " + result)
+                # Submit final output write to background
+                if ctx.executor:
+                    ctx.executor.submit(self._write_output_in_background, result)
+                return self._finish_run(run, result)
+
+        return self._finish_run(run, response)
+
+    async def _arun_loop(self, ctx: AgentContext, task: str, io_tasks: list) -> str:
+        """
+        Async version of _run_loop. LLM calls and async tools run on the
+        caller's event loop; only blocking work (sync tools, file I/O) goes to threads.
+        """
+        run = ctx.run = self.last_run = TaskRun(self.budget)
+        message = task
+        response = ""
+        while not run.exceeded():
+            prompt = message
+            if self.context_window.needs_trim(ctx.llm):
+                # Journal append and the optional summarizer call block: keep them off the event loop
+                await asyncio.to_thread(self._fit_context, ctx)
+            context_tokens = self.context_window.count(ctx.llm)  # resent with this step
+            started = time.perf_counter()
+            response, calls = await self._acall_llm(ctx, message)
+            llm_seconds = time.perf_counter() - started
+
+            io_tasks.append(asyncio.create_task(asyncio.to_thread(self._save_history_in_background, ctx)))
+
+            if self.verbose:
+                print("Response:")
+                print(response)
+
+            actions = self._resolve_actions(response, calls)
+            if not actions:
+                run.record_step("answer", prompt, response, llm_seconds, context_tokens=context_tokens)
+                return self._finish_run(run, response)
+            tool_calls = [a for a in actions if a[0] not in self.CONTROL_TOOLS]
+
+            if tool_calls:
+                started = time.perf_counter()
+                message = await self._arun_tools(run, tool_calls)
+                run.record_step(self._step_label(tool_calls), prompt, response, llm_seconds,
+                                time.perf_counter() - started, context_tokens=context_tokens)
+                if message is None:
+                    break
+                continue
+
+            name, params = actions[0]
+            if name == "ask_user":
+                run.record_step(name, prompt, response, llm_seconds, context_tokens=context_tokens)
+                question = params.get("question", str(params))
+                print("QUESTION: " + question)
+                message = await asyncio.to_thread(input, "You: ")
+
+            elif name == "pass_result":
+                run.record_step(name, prompt, response, llm_seconds, context_tokens=context_tokens)
+                result = str(params.get("result", params))
+                print("RESULT: " + result)
+                io_tasks.append(asyncio.create_task(asyncio.to_thread(self._write_output_in_background, result)))
+                return self._finish_run(run, result)
+
+        return self._finish_run(run, response)
+
+    def _prepare(self, ctx: AgentContext, task: str) -> None:
+        """Loads history and configures the context's LLM for a new task. Done ONCE per task."""
+        messages = self.journal.load(self.history_tail) if self.journal else []
+        ctx.history_offset = len(messages)
         
-        # Configure LLM state for the entire task
-        self.llm.reset()
-        self.llm.__init__(
+        # Configure LLM state for the entire task. The agent's own fields are bound once and
+        # cached by the template, so only the task is rendered here
+        template = (INDIVIDUAL_TOOLS_TEMPLATE if self.tool_schemas is not None else INDIVIDUAL_TEMPLATE).partial(
+            identity=self.identity,
+            description=self.description,
+            tools=self.tools_string,
+        )
+        llm = ctx.llm
+        llm.reset()
+        llm.__init__(
             messages=messages,
-            model=self.llm.model,
-            temperature=self.llm.temperature,
-            system_prompt=INDIVIDUAL_PROMPT.format(
-                identity=self.identity,
-                description=self.description,
-                user_task=task,
-                tools=self.tools_string,
-            ),
-            max_tokens=self.llm.max_tokens,
-            verbose=self.llm.verbose,
-            api_key=self.llm.client.api_key if hasattr(self.llm, 'client') and hasattr(self.llm.client, 'api_key') else None
+            model=llm.model,
+            temperature=llm.temperature,
+            system_prompt=template.render(user_task=task),
+            max_tokens=llm.max_tokens,
+            verbose=llm.verbose,
+            api_key=llm.client.api_key if hasattr(llm, 'client') and hasattr(llm.client, 'api_key') else None
         )
 
         print(Fore.LIGHTCYAN_EX + "Status: Evaluating Task...\n")
 
-        # --- 2. START RECURSION WITH PARALLEL I/O ---
-        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='AgentIO') as executor:
-            self.executor = executor
-            # Start the fast recursive loop
-            final_result = self._recursive_unleash(task)
-            # The 'with' block ensures background tasks are given time to complete
-            
-        self.executor = None # Clean up executor
-        return final_result
\ No newline at end of file
+    def unleash(self, task: str) -> str:
+        """
+        Public entry point. Leases an execution context, sets it up ONCE, then starts the
+        fast, iterative loop. Safe to call from several threads at once (up to max_concurrency
+        run side by side; further calls wait for a free context).
+        """
+        with self.contexts.lease() as ctx, usage_scope(agent=self.identity, turn_id=current_turn() or new_turn_id()):
+            # --- 1. SETUP (Done ONCE per task) ---
+            self._prepare(ctx, task)
+
+            # --- 2. START THE LOOP WITH PARALLEL I/O ---
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='AgentIO') as executor:
+                ctx.executor = executor
+                # Start the fast iterative loop
+                final_result = self._run_loop(ctx, task)
+                # The 'with' block ensures background tasks are given time to complete
+
+        if self.journal:
+            self.journal.flush()
+        return final_result
+
+    async def aunleash(self, task: str) -> str:
+        """
+        Coroutine entry point. Runs the agent on the caller's event loop so LLM calls,
+        async tools and other agents can interleave without a thread hop per step.
+        """
+        async with self.contexts.alease() as ctx:
+            with usage_scope(agent=self.identity, turn_id=current_turn() or new_turn_id()):
+                return await self._aunleash(ctx, task)
+
+    async def _aunleash(self, ctx: AgentContext, task: str) -> str:
+        await asyncio.to_thread(self._prepare, ctx, task)
+        io_tasks: list = []
+        try:
+            return await self._arun_loop(ctx, task, io_tasks)
+        finally:
+            # Let background history/output writes finish before returning
+            if io_tasks:
+                await asyncio.gather(*io_tasks, return_exceptions=True)
+            if self.journal:
+                await asyncio.to_thread(self.journal.flush)
\ No newline at end of file
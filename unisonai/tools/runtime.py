@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ToolTimeout(TimeoutError):
+    """Raised when a tool call runs past its `timeout`; `still_running` if its worker thread was abandoned."""
+
+    def __init__(self, message: str, still_running: bool = False):
+        super().__init__(message)
+        self.still_running = still_running
+
+
+class _ToolMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        executed = self.calls - self.cache_hits
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "hit_ratio": self.cache_hits / self.calls if self.calls else 0.0,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "avg_seconds": self.total_seconds / executed if executed else 0.0,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class _Slots:
+    """Concurrency cap for one tool, usable from threads (blocking) and coroutines (polling)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    async def acquire_async(self) -> None:
+        while True:
+            with self._cond:
+                if self.active < self.limit:
+                    self.active += 1
+                    return
+            await asyncio.sleep(0.05)
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class _Worker:
+    """
+    A sync tool call on its own daemon thread. Python threads cannot be killed: a worker
+    abandoned on timeout keeps running, so it takes over the caller's concurrency slot and
+    releases it itself when the call finally returns.
+    """
+
+    def __init__(self, tool, kwargs: dict, slots: Optional[_Slots]):
+        self.slots = slots
+        self.done = threading.Event()
+        self.result = self.error = None
+        self._lock = threading.Lock()
+        self._abandoned = False
+        context = contextvars.copy_context()  # keeps the caller's usage tags on the worker
+        threading.Thread(target=context.run, args=(self._target, tool._run, kwargs),
+                         name=f"Tool-{tool.name}", daemon=True).start()
+
+    def _target(self, method, kwargs: dict) -> None:
+        try:
+            self.result = method(**kwargs)
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._lock:
+                self.done.set()
+                abandoned = self._abandoned
+            if abandoned and self.slots:
+                self.slots.release()
+
+    def abandon(self) -> bool:
+        """Gives up on the call; True if it is still running (and now owns the slot)."""
+        with self._lock:
+            if self.done.is_set():
+                return False
+            self._abandoned = True
+            return True
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class ToolRuntime:
+    """
+    Runs tool calls under the policy declared on the tool class (see BaseTool):
+
+    - results cached per (tool, cache_key(params)) for `cache_ttl` seconds in an in-memory LRU,
+      and optionally on disk as JSON (`disk_cache`)
+    - `timeout` enforced for sync tools (run on a worker thread that is abandoned on expiry and
+      keeps its concurrency slot until it returns) and async tools (cancelled via asyncio.wait_for)
+    - at most `max_concurrency` calls of a tool in flight, `retries` extra attempts with backoff;
+      tools with `side_effects` are not retried after a timeout
+    - per-tool metrics exposed through `stats()`
+    """
+
+    def __init__(self, max_entries: int = 512, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or os.getenv("UNISONAI_TOOL_CACHE_DIR", os.path.join("data", "tool_cache"))
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._slots: Dict[str, _Slots] = {}
+        self._metrics: Dict[str, _ToolMetrics] = {}
+
+    # --- Cache ---
+    def _disk_path(self, tool_name: str, key: str) -> str:
+        digest = hashlib.sha256(f"{tool_name}\0{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _cache_get(self, tool, key: str):
+        """Returns (hit, value)."""
+        entry_key = (tool.name, key)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(entry_key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._cache.move_to_end(entry_key)
+                    return True, entry[1]
+                del self._cache[entry_key]
+        if tool.disk_cache:
+            try:
+                with open(self._disk_path(tool.name, key), "r", encoding="utf-8") as f:
+                    expires, value = json.load(f)
+            except (OSError, ValueError):
+                return False, None
+            if expires > now:
+                self._cache_put_memory(entry_key, expires, value)
+                return True, value
+        return False, None
+
+    def _cache_put_memory(self, entry_key: tuple, expires: float, value: Any) -> None:
+        with self._lock:
+            self._cache[entry_key] = (expires, value)
+            self._cache.move_to_end(entry_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _cache_put(self, tool, key: str, value: Any) -> None:
+        expires = time.time() + tool.cache_ttl
+        self._cache_put_memory((tool.name, key), expires, value)
+        if tool.disk_cache:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = self._disk_path(tool.name, key)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump([expires, value], f)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError, ValueError):
+                pass  # not JSON-serialisable or disk unavailable: the in-memory entry still applies
+
+    def invalidate(self, tool_name: Optional[str] = None) -> None:
+        """Drops cached results of one tool (or of all tools) from memory. Disk entries expire on their own."""
+        with self._lock:
+            for entry_key in [k for k in self._cache if tool_name is None or k[0] == tool_name]:
+                del self._cache[entry_key]
+
+    # --- Bookkeeping ---
+    def _metrics_for(self, tool_name: str) -> _ToolMetrics:
+        with self._lock:
+            return self._metrics.setdefault(tool_name, _ToolMetrics())
+
+    def _slots_for(self, tool) -> Optional[_Slots]:
+        if not tool.max_concurrency:
+            return None
+        with self._lock:
+            slots = self._slots.get(tool.name)
+            if slots is None:
+                slots = self._slots[tool.name] = _Slots(tool.max_concurrency)
+            return slots
+
+    def _lookup(self, tool, kwargs: dict):
+        """Counts the call and returns (key, hit, value); key is None when the tool is not cached."""
+        metrics = self._metrics_for(tool.name)
+        with self._lock:
+            metrics.calls += 1
+        if not tool.cache_ttl:
+            return None, False, None
+        key = tool.cache_key(kwargs)
+        hit, value = self._cache_get(tool, key)
+        if hit:
+            with self._lock:
+                metrics.cache_hits += 1
+        return key, hit, value
+
+    def _record(self, tool, key, result, elapsed: float, error: Optional[BaseException], attempts: int) -> None:
+        metrics = self._metrics_for(tool.name)
+        with self._lock:
+            metrics.total_seconds += elapsed
+            metrics.max_seconds = max(metrics.max_seconds, elapsed)
+            metrics.retries += attempts - 1
+            if error is not None:
+                metrics.errors += 1
+                if isinstance(error, ToolTimeout):
+                    metrics.timeouts += 1
+        if error is None and key is not None and tool.should_cache(result):
+            self._cache_put(tool, key, result)
+
+    # --- Execution ---
+    @staticmethod
+    def _timed_out(tool, still_running: bool = False) -> ToolTimeout:
+        return ToolTimeout(f"Tool '{tool.name}' timed out after {tool.timeout}s", still_running)
+
+    def _run_with_deadline(self, tool, kwargs: dict, slots: Optional[_Slots]):
+        method = tool._run
+        if inspect.iscoroutinefunction(method):
+            async def run():
+                try:
+                    return await asyncio.wait_for(method(**kwargs), timeout=tool.timeout)
+                except asyncio.TimeoutError:
+                    raise self._timed_out(tool)
+            return asyncio.run(run())
+        if not tool.timeout:
+            return method(**kwargs)
+        worker = _Worker(tool, kwargs, slots)
+        if not worker.done.wait(tool.timeout) and worker.abandon():
+            raise self._timed_out(tool, still_running=True)
+        return worker.outcome()
+
+    async def _arun_with_deadline(self, tool, kwargs: dict, slots: Optional[_Slots]):
+        method = tool._run
+        if inspect.iscoroutinefunction(method):
+            try:
+                return await asyncio.wait_for(method(**kwargs), timeout=tool.timeout)
+            except asyncio.TimeoutError:
+                raise self._timed_out(tool)
+        if not tool.timeout:
+            return await asyncio.to_thread(method, **kwargs)
+        worker = _Worker(tool, kwargs, slots)
+        if not await asyncio.to_thread(worker.done.wait, tool.timeout) and worker.abandon():
+            raise self._timed_out(tool, still_running=True)
+        return worker.outcome()
+
+    @staticmethod
+    def _retryable(tool, error: Exception, attempts: int) -> bool:
+        if attempts > tool.retries:
+            return False
+        # A timed-out call may still finish (sync workers cannot be stopped): repeating a tool
+        # with side effects could show its UI or apply its change twice
+        return not (tool.side_effects and isinstance(error, ToolTimeout))
+
+    def call(self, tool, kwargs: dict):
+        """Runs `tool._run(**kwargs)` from a thread under the tool's policy."""
+        key, hit, value = self._lookup(tool, kwargs)
+        if hit:
+            return value
+        slots = self._slots_for(tool)
+        started = time.perf_counter()
+        attempts, result, error = 0, None, None
+        while True:
+            attempts += 1
+            if slots:
+                slots.acquire()
+            held = bool(slots)
+            try:
+                result, error = self._run_with_deadline(tool, kwargs, slots), None
+            except Exception as e:
+                error = e
+                held = held and not (isinstance(e, ToolTimeout) and e.still_running)  # the worker releases it
+            finally:
+                if held:
+                    slots.release()
+            if error is None or not self._retryable(tool, error, attempts):
+                break
+            time.sleep(tool.retry_backoff * 2 ** (attempts - 1))
+        self._record(tool, key, result, time.perf_counter() - started, error, attempts)
+        if error is not None:
+            raise error
+        return result
+
+    async def acall(self, tool, kwargs: dict):
+        """Async variant of `call`: async tools run on the loop, sync tools on a worker thread."""
+        # Disk cache reads and writes are blocking file I/O: keep them off the event loop
+        if tool.disk_cache:
+            key, hit, value = await asyncio.to_thread(self._lookup, tool, kwargs)
+        else:
+            key, hit, value = self._lookup(tool, kwargs)
+        if hit:
+            return value
+        slots = self._slots_for(tool)
+        started = time.perf_counter()
+        attempts, result, error = 0, None, None
+        while True:
+            attempts += 1
+            if slots:
+                await slots.acquire_async()
+            held = bool(slots)
+            try:
+                result, error = await self._arun_with_deadline(tool, kwargs, slots), None
+            except Exception as e:
+                error = e
+                held = held and not (isinstance(e, ToolTimeout) and e.still_running)  # the worker releases it
+            finally:
+                if held:
+                    slots.release()
+            if error is None or not self._retryable(tool, error, attempts):
+                break
+            await asyncio.sleep(tool.retry_backoff * 2 ** (attempts - 1))
+        record = (tool, key, result, time.perf_counter() - started, error, attempts)
+        if tool.disk_cache:
+            await asyncio.to_thread(self._record, *record)
+        else:
+            self._record(*record)
+        if error is not None:
+            raise error
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool call counts, cache hit ratio, errors, timeouts, retries and latency."""
+        with self._lock:
+            return {name: metrics.as_dict() for name, metrics in self._metrics.items()}
+
+
+# Shared by every agent in the process, so cached results and concurrency caps are global per tool
+tool_runtime = ToolRuntime()
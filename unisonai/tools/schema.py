@@ -0,0 +1,133 @@
+import re
+import json
+from typing import Any, Dict, List, Tuple
+
+from unisonai.tools.tool import Field
+
+# Description prefixes such as "list : The apps to open" or "str: prompt" double as type hints
+_TYPE_HINT = re.compile(r"^\s*(str|string|list|array|int|integer|float|number|bool|boolean|dict|object)\s*:", re.IGNORECASE)
+_JSON_TYPES = {
+    "str": "string", "string": "string",
+    "list": "array", "array": "array",
+    "int": "integer", "integer": "integer",
+    "float": "number", "number": "number",
+    "bool": "boolean", "boolean": "boolean",
+    "dict": "object", "object": "object",
+}
+
+# Protocol tools the agents handle themselves, exposed as functions so the model can call them natively
+BUILTIN_TOOLS: Dict[str, Tuple[str, List[Field]]] = {
+    "pass_result": (
+        "Deliver the final result of the task. Use ONLY when the task is complete.",
+        [Field("result", "The complete final answer or result of the task.")],
+    ),
+    "ask_user": (
+        "Ask the user a question when information needed to continue is missing.",
+        [Field("question", "The question to ask the user.")],
+    ),
+    "send_message": (
+        "Send a message to another member of the clan.",
+        [
+            Field("agent_name", "The name of the agent to send the message to."),
+            Field("message", "The message or task for that agent."),
+            Field("additional_resource", "Any additional resource or context.", required=False),
+        ],
+    ),
+}
+
+
+def function_name(name: str) -> str:
+    """Provider-safe function name for a tool name ('Weather Tool' -> 'Weather_Tool')."""
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", name.strip())[:64]
+
+
+def field_type(field: Field) -> str:
+    """JSON-schema type of a Field: explicit field_type, else a description prefix hint, else string."""
+    explicit = getattr(field, "field_type", None)
+    if explicit:
+        return _JSON_TYPES.get(explicit.lower(), explicit.lower())
+    match = _TYPE_HINT.match(field.description or "")
+    return _JSON_TYPES[match.group(1).lower()] if match else "string"
+
+
+def parameters_schema(params: List[Field], upper: bool = False) -> Dict[str, Any]:
+    """JSON schema for a tool's params; `upper` emits the OBJECT/STRING spelling used by Gemini."""
+    case = str.upper if upper else str
+    properties = {}
+    required = []
+    for field in params:
+        kind = field_type(field)
+        prop: Dict[str, Any] = {"type": case(kind), "description": field.description}
+        if kind == "array":
+            prop["items"] = {"type": case("string")}
+        properties[field.name] = prop
+        if field.required and field.default_value is None:
+            required.append(field.name)
+    schema: Dict[str, Any] = {"type": case("object"), "properties": properties}
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def compile_tools(tools: list, tool_format: str, builtins: tuple = ("pass_result",)):
+    """
+    Compiles BaseTool instances (plus built-in protocol tools) into provider-native tool schemas.
+
+    tool_format is "gemini", "openai" or "anthropic". Returns (schemas, names) where `names`
+    maps the provider-safe function name back to the original tool name.
+    """
+    entries = [(tool.name, tool.description, tool.params) for tool in tools]
+    entries += [(name, *BUILTIN_TOOLS[name]) for name in builtins]
+
+    names: Dict[str, str] = {}
+    declarations = []
+    for name, description, params in entries:
+        safe = function_name(name)
+        names[safe] = name
+        if tool_format == "gemini":
+            declaration = {"name": safe, "description": description}
+            if params:
+                declaration["parameters"] = parameters_schema(params, upper=True)
+            declarations.append(declaration)
+        elif tool_format == "openai":
+            declarations.append({
+                "type": "function",
+                "function": {"name": safe, "description": description, "parameters": parameters_schema(params)},
+            })
+        elif tool_format == "anthropic":
+            declarations.append({"name": safe, "description": description, "input_schema": parameters_schema(params)})
+        else:
+            raise ValueError(f"Unknown tool format: {tool_format}")
+
+    if tool_format == "gemini":
+        return [{"function_declarations": declarations}], names
+    return declarations, names
+
+
+def to_plain(value: Any) -> Any:
+    """Converts SDK argument containers (proto maps/repeated fields) into plain dicts and lists."""
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "items"):
+        return {key: to_plain(item) for key, item in value.items()}
+    try:
+        return [to_plain(item) for item in value]
+    except TypeError:
+        return value
+
+
+def parse_openai_tool_calls(message) -> List[Tuple[str, Dict[str, Any]]]:
+    """Extracts (name, args) pairs from an OpenAI-compatible chat completion message."""
+    calls = []
+    for call in getattr(message, "tool_calls", None) or []:
+        try:
+            args = json.loads(call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            args = {"raw_input": call.function.arguments}
+        calls.append((call.function.name, args))
+    return calls
+
+
+def describe_calls(calls: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """Plain-text record of structured tool calls, stored in history in place of provider-specific parts."""
+    return "\n".join(f"Calling tool '{name}' with params {json.dumps(args, default=str)}" for name, args in calls)
@@ -1,10 +1,14 @@
+import json
 from abc import abstractmethod
+from typing import Any, Optional
+
 class Field:
-    def __init__(self, name: str, description: str, default_value=None, required: bool = True):
+    def __init__(self, name: str, description: str, default_value=None, required: bool = True, field_type: str = None):
         self.name = name
         self.description = description
         self.default_value = default_value
         self.required = required
+        self.field_type = field_type  # "string", "array", "integer", ...; inferred from the description when None
 
     def format(self):  # Method to convert Field to dictionary
         return f"""
@@ -19,6 +23,24 @@ class BaseTool:
     description: str
     params: list[Field] # Now a list of Field objects
 
+    # Execution policy, enforced by unisonai.tools.runtime when an agent calls the tool.
+    # Everything is off by default; tools opt in by overriding these class attributes.
+    cache_ttl: Optional[float] = None  # seconds a result is reused for identical params (None = no caching)
+    disk_cache: bool = False  # also keep cached results on disk, so they survive restarts
+    timeout: Optional[float] = None  # seconds before a call is abandoned
+    max_concurrency: Optional[int] = None  # calls of this tool allowed in flight at once
+    retries: int = 0  # extra attempts after an exception or timeout
+    retry_backoff: float = 0.5  # seconds before the first retry, doubled for each further one
+    side_effects: bool = False  # shows UI or changes state: no retry after a timeout, the first call may still finish
+
+    def cache_key(self, params: dict) -> str:
+        """Key identifying a call for caching. Override to normalise params (e.g. lower-case a city)."""
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def should_cache(self, result: Any) -> bool:
+        """Whether a result may be cached. Error payloads are not."""
+        return not (isinstance(result, dict) and "error" in result)
+
     @abstractmethod
     def _run(**kwargs):
         raise NotImplementedError("Please Implement the Logic in _run function")
\ No newline at end of file